@@ -29,7 +29,25 @@ def create_app(test_config=None):
         WTF_CSRF_ENABLED=True,
         REMEMBER_COOKIE_DURATION=86400,  # 1 day in seconds
         REMEMBER_COOKIE_SECURE=False,    # Set to True in production with HTTPS
-        REMEMBER_COOKIE_HTTPONLY=True
+        REMEMBER_COOKIE_HTTPONLY=True,
+        KPI_USE_ROLLUPS=False,           # Read dashboard/report aggregates from the rollup tables
+        KPI_CACHE_ENABLED=True,          # Cache dashboard panels until the next data write
+        KPI_CACHE_TTL=300,               # Seconds before a cached result expires
+        KPI_CACHE_MAX_ENTRIES=256,       # Entries kept in each worker's in-process cache
+        KPI_CACHE_SHARED_PATH=os.environ.get('KPI_CACHE_SHARED_PATH'),  # sqlite file shared by all workers
+        SLOW_QUERY_THRESHOLD_MS=200,     # Queries slower than this go to logs/slow_queries.log
+        SLOW_QUERY_LOG=True,
+        KPI_CATALOG_TTL=60,              # Seconds before a worker reloads the skill/tool catalog
+        KPI_SKILL_STATE_TTL=300,         # Seconds before a worker reloads the current skill rating matrix
+        KPI_ORJSON=True,                 # Encode JSON responses with orjson when it is installed
+        KPI_PROMOTION_THRESHOLDS=None,   # Next-tier requirements (None: app.utils.promotion defaults)
+        KPI_REPORT_WORKERS=2,            # Threads per process generating queued reports
+        KPI_REPORT_JOB_TIMEOUT=3600,     # Seconds before a queued/running report job is considered lost
+        KPI_PDF_WORKERS=2,               # PDF rendering processes (0: render in the calling thread)
+        KPI_PDF_QUEUE_SIZE=8,            # PDFs that may wait for a renderer before requests get 503
+        KPI_PDF_TIMEOUT=120,             # Seconds one PDF may take to render
+        KPI_PDF_MAX_JOBS_PER_WORKER=50,  # PDFs a rendering process renders before it is replaced
+        KPI_REPORT_CACHE_MAX_BYTES=256 * 1024 * 1024  # Size cap of instance/report_cache (0: no caching)
     )
     
     # Load test config if passed in
@@ -46,6 +64,22 @@ def create_app(test_config=None):
     db.init_app(app)
     csrf.init_app(app)
     
+    # Result cache (optionally shared between worker processes)
+    from app.utils.cache import init_cache
+    init_cache(app)
+    
+    # Request timing, query counting and slow query log
+    from app.utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # JSON responses (orjson when available)
+    from app.utils.serialization import init_serialization
+    init_serialization(app)
+    
+    # Skill/tool taxonomy catalog, reloaded when the taxonomy changes
+    from app.utils.catalog import init_catalog
+    init_catalog(app)
+    
     # Configure Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -67,6 +101,10 @@ def create_app(test_config=None):
     app.register_blueprint(reports.bp)
     app.register_blueprint(auth.auth_bp)
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Make url_for('index') work for the main index page
     app.add_url_rule('/', endpoint='index')
     
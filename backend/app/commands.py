@@ -0,0 +1,83 @@
+"""
+Flask CLI commands for the KPI system
+"""
+import click
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    """Register all CLI commands with the application"""
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(import_evaluations_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(score_promotions_command)
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Rebuild the KPI rollup tables from the raw evaluation data."""
+    from app.utils.rollups import latest_ratings_available, rebuild_rollups, rollups_available
+
+    if not (rollups_available() and latest_ratings_available()):
+        raise click.ClickException('The rollup tables do not exist, run the migrations first.')
+
+    result = rebuild_rollups()
+    click.echo(
+        f"Rebuilt {result['skill_rollups']} skill rollups, "
+        f"{result['tool_rollups']} tool rollups and "
+        f"{result['latest_ratings']} latest skill ratings."
+    )
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Create (if needed) and repopulate the employee search index."""
+    from app.utils.employee_search import rebuild_search_index
+
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} employees.")
+
+
+@click.command('score-promotions')
+@click.option('--notify', is_flag=True, help='Notify managers about employees who became ready.')
+@with_appcontext
+def score_promotions_command(notify):
+    """Re-score the promotion readiness of every active employee."""
+    from app import db
+    from app.utils.cache import bump_data_version
+    from app.utils.promotion import promotion_readiness_available, refresh_promotion_readiness
+
+    if not promotion_readiness_available():
+        raise click.ClickException('The promotion_readiness table does not exist, run the migrations first.')
+
+    results = refresh_promotion_readiness(notify=notify)
+    db.session.commit()
+    bump_data_version()
+    ready = sum(1 for result in results if result.ready)
+    click.echo(f"Scored {len(results)} employees, {ready} ready for promotion.")
+
+
+@click.command('import-evaluations')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json']),
+              help='File format (detected from the extension by default).')
+@click.option('--chunk-size', default=2000, show_default=True, help='Rows written per transaction.')
+@with_appcontext
+def import_evaluations_command(path, file_format, chunk_size):
+    """Import evaluations from a CSV or JSON file (one row per rating)."""
+    from app.utils.evaluation_import import detect_format, import_evaluations
+
+    file_format = file_format or detect_format(path)
+    if file_format is None:
+        raise click.UsageError('Cannot detect the file format, use --format.')
+
+    with open(path, encoding='utf-8-sig', newline='') as import_file:
+        result = import_evaluations(import_file, file_format, chunk_size)
+
+    click.echo(result['message'])
+    for error in result['errors']:
+        click.echo(f"Row {error['row']}: {error['error']}", err=True)
+    if result['error_count'] > len(result['errors']):
+        click.echo(f"... {result['error_count'] - len(result['errors'])} more errors", err=True)
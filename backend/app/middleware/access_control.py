@@ -2,8 +2,10 @@
 Access control middleware for the KPI system
 """
 from functools import wraps
-from flask import current_app, flash, redirect, url_for
+from flask import current_app, flash, jsonify, redirect, request, url_for
 from flask_login import current_user
+from app import csrf
+from app.models.user import User
 
 def admin_required(f):
     """
@@ -62,3 +64,36 @@ def employee_owner_required(f):
         return redirect(url_for('dashboard.index'))
     
     return decorated_function
+
+def api_manager_required(f):
+    """
+    Decorator for JSON endpoints called by scripts as well as by the browser.
+
+    Scripts send the username and password of a manager or admin account with
+    HTTP Basic authentication. Requests without credentials use the session
+    of the logged in user and then have to pass the CSRF check, so exempt
+    the view itself with csrf.exempt.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        credentials = request.authorization
+        if credentials is not None:
+            user = User.query.filter_by(username=credentials.username).first()
+            if user is None or not user.active or not user.verify_password(credentials.password or ''):
+                response = jsonify({'success': False, 'message': 'Invalid credentials'})
+                response.headers['WWW-Authenticate'] = 'Basic realm="KPI System"'
+                return response, 401
+        else:
+            user = current_user
+            if not user.is_authenticated:
+                response = jsonify({'success': False, 'message': 'Authentication required'})
+                response.headers['WWW-Authenticate'] = 'Basic realm="KPI System"'
+                return response, 401
+            if current_app.config.get('WTF_CSRF_ENABLED', True):
+                csrf.protect()
+
+        if not user.role in ['admin', 'manager']:
+            return jsonify({'success': False, 'message': 'Manager access required'}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
@@ -3,6 +3,7 @@ Employee Model
 """
 from datetime import datetime
 from app import db
+from app.utils.serialization import serialize
 
 class Employee(db.Model):
     """
@@ -25,17 +26,11 @@ class Employee(db.Model):
     def __repr__(self):
         return f"<Employee {self.name} ({self.tier})>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert employee object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'employee_id': self.employee_id,
-            'name': self.name,
-            'phone': self.phone,
-            'tier': self.tier,
-            'hire_date': self.hire_date.strftime('%Y-%m-%d') if self.hire_date else None,
-            'active': self.active,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        return serialize(self, fields)
@@ -3,6 +3,7 @@ Evaluation Models
 """
 from datetime import datetime
 from app import db
+from app.utils.serialization import serialize
 
 class Evaluation(db.Model):
     """
@@ -25,22 +26,22 @@ class Evaluation(db.Model):
     tool_evaluations = db.relationship('ToolEvaluation', back_populates='evaluation', cascade='all, delete-orphan')
     special_skills = db.relationship('SpecialSkill', back_populates='evaluation', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Keyset pagination of the evaluation listing
+        db.Index('idx_evaluations_date_id', 'evaluation_date', 'evaluation_id'),
+    )
+
     def __repr__(self):
         return f"<Evaluation {self.evaluation_id} for {self.employee_id} on {self.evaluation_date}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert evaluation object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'evaluation_id': self.evaluation_id,
-            'employee_id': self.employee_id,
-            'evaluator_id': self.evaluator_id,
-            'evaluation_date': self.evaluation_date.strftime('%Y-%m-%d'),
-            'notes': self.notes,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return serialize(self, fields)
 
 
 class SkillEvaluation(db.Model):
@@ -50,7 +51,7 @@ class SkillEvaluation(db.Model):
     __tablename__ = 'skill_evaluations'
 
     skill_evaluation_id = db.Column(db.Integer, primary_key=True)
-    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.evaluation_id'))
+    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.evaluation_id'), index=True)
     skill_id = db.Column(db.Integer, db.ForeignKey('skills.skill_id'))
     rating = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
@@ -64,19 +65,14 @@ class SkillEvaluation(db.Model):
     def __repr__(self):
         return f"<SkillEvaluation {self.skill_id} ({self.rating}/5)>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert skill evaluation object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'skill_evaluation_id': self.skill_evaluation_id,
-            'evaluation_id': self.evaluation_id,
-            'skill_id': self.skill_id,
-            'rating': self.rating,
-            'notes': self.notes,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return serialize(self, fields)
 
 
 class ToolEvaluation(db.Model):
@@ -86,7 +82,7 @@ class ToolEvaluation(db.Model):
     __tablename__ = 'tool_evaluations'
 
     tool_evaluation_id = db.Column(db.Integer, primary_key=True)
-    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.evaluation_id'))
+    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluations.evaluation_id'), index=True)
     tool_id = db.Column(db.Integer, db.ForeignKey('tools.tool_id'))
     can_operate = db.Column(db.Boolean, default=False)
     owns_tool = db.Column(db.Boolean, default=False)
@@ -100,19 +96,14 @@ class ToolEvaluation(db.Model):
     def __repr__(self):
         return f"<ToolEvaluation {self.tool_id} (operate:{self.can_operate}, own:{self.owns_tool})>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert tool evaluation object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'tool_evaluation_id': self.tool_evaluation_id,
-            'evaluation_id': self.evaluation_id,
-            'tool_id': self.tool_id,
-            'can_operate': self.can_operate,
-            'owns_tool': self.owns_tool,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return serialize(self, fields)
 
 
 class SpecialSkill(db.Model):
@@ -134,15 +125,11 @@ class SpecialSkill(db.Model):
     def __repr__(self):
         return f"<SpecialSkill {self.skill_name}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert special skill object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'special_skill_id': self.special_skill_id,
-            'evaluation_id': self.evaluation_id,
-            'skill_name': self.skill_name,
-            'description': self.description,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        return serialize(self, fields)
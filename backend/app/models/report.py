@@ -0,0 +1,100 @@
+"""
+Report Models
+"""
+import json
+from datetime import datetime
+from app import db
+
+class ReportTemplate(db.Model):
+    """
+    Report template (one system template per report type, migration v1.5.0)
+    """
+    __tablename__ = 'report_templates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    description = db.Column(db.Text)
+    template_type = db.Column(db.Text, nullable=False)  # EMPLOYEE, TEAM, SKILL, TOOL
+    config = db.Column(db.Text, nullable=False, default='{}')
+    is_system = db.Column(db.Boolean, nullable=False, default=False)
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ReportTemplate {self.name} ({self.template_type})>"
+
+
+class SavedReport(db.Model):
+    """
+    Generated report (migration v1.1.0).
+
+    Reports generated by the background job queue go through the statuses
+    queued, running, done and failed; the file is stored under
+    instance/reports.
+    """
+    __tablename__ = 'saved_reports'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    description = db.Column(db.Text)
+    report_type = db.Column(db.Text, nullable=False)
+    parameters = db.Column(db.Text)  # JSON parameters used to generate the report
+    data = db.Column(db.Text)
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    file_path = db.Column(db.Text)
+    status = db.Column(db.Text)
+    file_format = db.Column(db.Text)
+    file_size = db.Column(db.Integer)
+    error_message = db.Column(db.Text)
+    completed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_saved_reports_status', 'status'),
+    )
+
+    def __repr__(self):
+        return f"<SavedReport {self.id} {self.report_type} ({self.status})>"
+
+    def to_dict(self):
+        """
+        Convert saved report object to dictionary for API responses
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'report_type': self.report_type,
+            'parameters': json.loads(self.parameters) if self.parameters else {},
+            'status': self.status,
+            'file_format': self.file_format,
+            'file_size': self.file_size,
+            'error_message': self.error_message,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'completed_at': self.completed_at.strftime('%Y-%m-%d %H:%M:%S') if self.completed_at else None
+        }
+
+
+class ExportHistory(db.Model):
+    """
+    One produced (or failed) report file (migration v1.5.0)
+    """
+    __tablename__ = 'export_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scheduled_export_id = db.Column(db.Integer)
+    report_template_id = db.Column(db.Integer, nullable=False)
+    file_name = db.Column(db.Text, nullable=False)
+    file_path = db.Column(db.Text, nullable=False)
+    file_size = db.Column(db.Integer)
+    export_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    status = db.Column(db.Text, nullable=False)  # SUCCESS, FAILED
+    error_message = db.Column(db.Text)
+    user_id = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('idx_export_history_time', 'export_time'),
+    )
+
+    def __repr__(self):
+        return f"<ExportHistory {self.file_name} ({self.status})>"
@@ -0,0 +1,163 @@
+"""
+KPI Rollup Models
+"""
+import json
+from datetime import datetime
+from app import db
+
+class SkillRatingRollup(db.Model):
+    """
+    Monthly skill rating totals per employee and skill category.
+
+    Maintained incrementally by app.utils.rollups whenever evaluations are
+    written, so readers never have to scan the raw skill_evaluations table.
+    """
+    __tablename__ = 'skill_rating_rollups'
+
+    employee_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    latest_rating = db.Column(db.Float)
+    latest_date = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_skill_rating_rollups_month', 'month', 'category_id'),
+    )
+
+    def __repr__(self):
+        return f"<SkillRatingRollup {self.employee_id}/{self.category_id} {self.month}>"
+
+    @property
+    def avg_rating(self):
+        """
+        Average rating for this employee, category and month
+        """
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+    def to_dict(self):
+        """
+        Convert rollup object to dictionary for API responses
+        """
+        return {
+            'employee_id': self.employee_id,
+            'category_id': self.category_id,
+            'month': self.month,
+            'rating_sum': self.rating_sum,
+            'rating_count': self.rating_count,
+            'avg_rating': self.avg_rating,
+            'latest_rating': self.latest_rating,
+            'latest_date': self.latest_date.strftime('%Y-%m-%d') if self.latest_date else None
+        }
+
+
+class ToolRatingRollup(db.Model):
+    """
+    Monthly tool proficiency totals per employee and tool category
+    """
+    __tablename__ = 'tool_rating_rollups'
+
+    employee_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    tool_count = db.Column(db.Integer, nullable=False, default=0)
+    can_operate_count = db.Column(db.Integer, nullable=False, default=0)
+    owns_tool_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_tool_rating_rollups_month', 'month', 'category_id'),
+    )
+
+    def __repr__(self):
+        return f"<ToolRatingRollup {self.employee_id}/{self.category_id} {self.month}>"
+
+    def to_dict(self):
+        """
+        Convert rollup object to dictionary for API responses
+        """
+        return {
+            'employee_id': self.employee_id,
+            'category_id': self.category_id,
+            'month': self.month,
+            'tool_count': self.tool_count,
+            'can_operate_count': self.can_operate_count,
+            'owns_tool_count': self.owns_tool_count
+        }
+
+
+class LatestSkillRating(db.Model):
+    """
+    Current (most recent) rating of every skill per employee.
+
+    Maintained together with the rollups, so "current state" questions never
+    have to scan the evaluation history.
+    """
+    __tablename__ = 'latest_skill_ratings'
+
+    employee_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    skill_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rating = db.Column(db.Integer, nullable=False)
+    evaluation_id = db.Column(db.Integer, nullable=False)
+    evaluation_date = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_latest_skill_ratings_skill', 'skill_id', 'rating'),
+    )
+
+    def __repr__(self):
+        return f"<LatestSkillRating {self.employee_id}/{self.skill_id} ({self.rating}/5)>"
+
+    def to_dict(self):
+        """
+        Convert latest rating object to dictionary for API responses
+        """
+        return {
+            'employee_id': self.employee_id,
+            'skill_id': self.skill_id,
+            'rating': self.rating,
+            'evaluation_id': self.evaluation_id,
+            'evaluation_date': self.evaluation_date.strftime('%Y-%m-%d')
+        }
+
+
+class PromotionReadiness(db.Model):
+    """
+    Promotion readiness score of every active employee for the next tier.
+
+    Re-scored by app.utils.promotion whenever an employee's evaluations
+    change; ``gaps`` holds the unmet requirements as JSON.
+    """
+    __tablename__ = 'promotion_readiness'
+
+    employee_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    current_tier = db.Column(db.String(20), nullable=False)
+    target_tier = db.Column(db.String(20), nullable=False)
+    score = db.Column(db.Float, nullable=False, default=0)
+    ready = db.Column(db.Boolean, nullable=False, default=False)
+    gaps = db.Column(db.Text)
+    scored_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_promotion_readiness_score', 'ready', 'score'),
+    )
+
+    def __repr__(self):
+        return f"<PromotionReadiness {self.employee_id} -> {self.target_tier} ({self.score:.2f})>"
+
+    def to_dict(self):
+        """
+        Convert readiness object to dictionary for API responses
+        """
+        return {
+            'employee_id': self.employee_id,
+            'current_tier': self.current_tier,
+            'target_tier': self.target_tier,
+            'score': self.score,
+            'ready': self.ready,
+            'gaps': json.loads(self.gaps) if self.gaps else [],
+            'scored_at': self.scored_at.strftime('%Y-%m-%d %H:%M:%S') if self.scored_at else None
+        }
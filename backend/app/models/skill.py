@@ -3,6 +3,7 @@ Skill Models
 """
 from datetime import datetime
 from app import db
+from app.utils.serialization import serialize
 
 class SkillCategory(db.Model):
     """
@@ -23,18 +24,14 @@ class SkillCategory(db.Model):
     def __repr__(self):
         return f"<SkillCategory {self.name}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert skill category object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'category_id': self.category_id,
-            'name': self.name,
-            'description': self.description,
-            'display_order': self.display_order,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return serialize(self, fields)
 
 
 class Skill(db.Model):
@@ -58,16 +55,11 @@ class Skill(db.Model):
     def __repr__(self):
         return f"<Skill {self.name}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """
         Convert skill object to dictionary for API responses
+
+        Args:
+            fields (iterable): Names of the fields to include (all when None)
         """
-        return {
-            'skill_id': self.skill_id,
-            'category_id': self.category_id,
-            'name': self.name,
-            'description': self.description,
-            'display_order': self.display_order,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        return serialize(self, fields)
@@ -0,0 +1,226 @@
+"""
+Content-addressed cache of generated report files.
+
+Managers download the same report for the same period over and over. A
+generated file is stored under instance/report_cache with a name hashed
+from the report type, its normalized collect_data arguments, the output
+format and the data version stamp, so a repeat request is answered from
+disk without collecting data or rendering anything. Any evaluation,
+employee or catalog write bumps the data version and with it every key, so
+entries never have to be invalidated; unused files are evicted least
+recently used first once the directory exceeds KPI_REPORT_CACHE_MAX_BYTES.
+
+The key doubles as a strong ETag: the file behind a key never changes.
+
+That only holds while every worker process sees every data version bump
+(the data_versions table of migration v1.13.0, or a shared result cache
+tier). With process-local versions a write handled by one worker would not
+change the keys of the others, so the cache is disabled.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from flask import current_app
+
+from app.utils.cache import get_cache
+
+# Directory (inside the instance folder) holding cached report files
+REPORT_CACHE_DIRECTORY = 'report_cache'
+
+
+class ReportArtifact(namedtuple('ReportArtifact', 'key path temporary')):
+    """
+    A generated report file: in the cache, or a temporary file to discard
+    after use when the cache is disabled
+    """
+    __slots__ = ()
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def read(self):
+        """
+        Return the report bytes
+        """
+        with open(self.path, 'rb') as artifact_file:
+            return artifact_file.read()
+
+    def discard(self):
+        """
+        Remove the file if it is temporary
+        """
+        if self.temporary:
+            _remove(self.path)
+
+
+def report_cache_key(report_type, parameters, file_format, version_stamp):
+    """
+    Hash the inputs that determine a report file
+
+    Args:
+        report_type (str): employee, team, skills or tools
+        parameters (dict): Normalized collect_data arguments (parse_report_parameters)
+        file_format (str): Output format
+        version_stamp (str): Data version stamp of the result cache
+    """
+    payload = json.dumps(
+        [report_type, parameters, file_format, version_stamp],
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReportArtifactCache:
+    """
+    Directory of report files named by their cache key, capped in size
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key, extension):
+        return os.path.join(self.directory, key[:2], f'{key}.{extension}')
+
+    def get(self, key, extension):
+        """
+        Return the path of a cached file (marking it recently used) or None
+        """
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, extension, write):
+        """
+        Store a file and evict the least recently used files over the size cap
+
+        Args:
+            key (str): Cache key
+            extension (str): File extension
+            write (callable): Function writing the file to the path it is given
+
+        Returns:
+            str: Path of the cached file
+        """
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # Generated concurrently by another request: keep the file the
+            # ETag may already have been sent for
+            return path
+
+        temp_path = _write_temporary(write, os.path.dirname(path), '.part')
+        os.replace(temp_path, path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used files until the cache fits max_bytes
+        """
+        with self._lock:
+            files = []
+            total = 0
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith('.part'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, path, stat.st_size))
+                    total += stat.st_size
+
+            files.sort()
+            for _, path, size in files:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                _remove(path)
+                total -= size
+
+    def clear(self):
+        """
+        Remove every cached file
+        """
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                _remove(os.path.join(root, name))
+
+
+def get_report_cache():
+    """
+    Return the report file cache of the current application (None when
+    KPI_REPORT_CACHE_MAX_BYTES is 0 or the data version is process-local)
+    """
+    max_bytes = current_app.config.get('KPI_REPORT_CACHE_MAX_BYTES')
+    if not max_bytes or not get_cache().versions_shared:
+        return None
+
+    cache = current_app.extensions.get('kpi_report_cache')
+    if cache is None:
+        cache = ReportArtifactCache(
+            os.path.join(current_app.instance_path, REPORT_CACHE_DIRECTORY),
+            max_bytes
+        )
+        current_app.extensions['kpi_report_cache'] = cache
+    return cache
+
+
+def get_report_artifact(report_type, parameters, file_format, extension, write):
+    """
+    Return a report file from the cache, generating and storing it on a miss
+
+    Args:
+        report_type (str): employee, team, skills or tools
+        parameters (dict): Normalized collect_data arguments
+        file_format (str): Output format
+        extension (str): File extension of the format
+        write (callable): Function writing the report to the path it is given
+
+    Returns:
+        ReportArtifact: The cached report (a temporary file when the cache is disabled)
+    """
+    key = report_cache_key(report_type, parameters, file_format, get_cache().version_stamp('data'))
+    cache = get_report_cache()
+    if cache is None:
+        return ReportArtifact(key, _write_temporary(write, None, f'.{extension}'), True)
+
+    path = cache.get(key, extension)
+    if path is None:
+        path = cache.put(key, extension, write)
+    return ReportArtifact(key, path, False)
+
+
+def _write_temporary(write, directory, suffix):
+    """
+    Let ``write`` fill a new temporary file and return its path
+    """
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    os.close(descriptor)
+    try:
+        write(temp_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return temp_path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,15 +1,41 @@
 """
 Base report generator class for the KPI system.
 """
-import io
 import datetime
+import io
+import os
+import re
+import tempfile
+import zipfile
 from abc import ABC, abstractmethod
 
 import pandas as pd
 import xlsxwriter
-from weasyprint import HTML
 from flask import render_template
 
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = pq = None
+
+from app.reports.pdf_renderer import render_pdf
+
+
+# Rows converted to CSV text at a time
+CSV_CHUNK_ROWS = 10000
+
+
+def parquet_supported():
+    """Return True if Parquet output is available (pyarrow is installed)."""
+    return pq is not None
+
+
+def _sheet_file_name(sheet_name, extension):
+    """Return a file name for a sheet inside a zipped export."""
+    name = re.sub(r'[^\w\-]+', '_', str(sheet_name)).strip('_').lower() or 'sheet'
+    return f'{name}.{extension}'
+
 
 class ReportGenerator(ABC):
     """Base class for all report generators."""
@@ -71,12 +97,8 @@ class ReportGenerator(ABC):
             **template_data
         )
         
-        # Generate PDF from HTML
-        pdf_file = io.BytesIO()
-        HTML(string=html_content).write_pdf(pdf_file)
-        pdf_file.seek(0)
-        
-        return pdf_file.getvalue()
+        # Generate PDF from HTML in the rendering processes
+        return render_pdf(html_content)
     
     def generate_excel(self):
         """Generate an Excel report.
@@ -84,14 +106,28 @@ class ReportGenerator(ABC):
         Returns:
             bytes: Excel document as bytes
         """
-        # Create an Excel file in memory
-        excel_file = io.BytesIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.xlsx')
+            self.write_excel(path)
+            with open(path, 'rb') as excel_file:
+                return excel_file.read()
+    
+    def write_excel(self, path):
+        """Write the Excel report to a file.
+        
+        The workbook is written in xlsxwriter's constant_memory mode, which
+        flushes every row to disk as soon as the next one starts, and column
+        widths are tracked while the rows are written, so memory use stays
+        flat however many rows a sheet has.
         
+        Args:
+            path (str): File to write the workbook to
+        """
         # Get data for the Excel report
         excel_data = self.prepare_excel_data()
         
         # Create the Excel workbook
-        workbook = xlsxwriter.Workbook(excel_file)
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
         
         # Add a title format
         title_format = workbook.add_format({
@@ -113,37 +149,78 @@ class ReportGenerator(ABC):
             'border': 1
         })
         
-        # Process each dataframe in the excel_data
+        subtitle_format = workbook.add_format({'align': 'center'})
+        
+        # Process each dataframe in the excel_data (rows must be written in
+        # order in constant_memory mode)
         for sheet_name, df in excel_data.items():
             # Create a worksheet
             worksheet = workbook.add_worksheet(sheet_name)
             
             # Write title
             worksheet.merge_range('A1:H1', self.title, title_format)
-            worksheet.merge_range('A2:H2', f'Generated on {self.created_at.strftime("%Y-%m-%d %H:%M")}', workbook.add_format({'align': 'center'}))
+            worksheet.merge_range('A2:H2', f'Generated on {self.created_at.strftime("%Y-%m-%d %H:%M")}', subtitle_format)
             
             # Write the column headers
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(3, col_num, value, header_format)
+            columns = list(df.columns)
+            worksheet.write_row(3, 0, columns, header_format)
+            widths = [len(str(column)) for column in columns]
             
-            # Write the dataframe data
-            for row_num, row_data in enumerate(df.values):
+            # Write the dataframe data row by row, measuring the columns as we go
+            for row_num, row_data in enumerate(df.itertuples(index=False, name=None), start=4):
+                # Missing values (NaN/None) become blank cells
+                row_data = [None if value != value else value for value in row_data]
+                worksheet.write_row(row_num, 0, row_data, data_format)
                 for col_num, value in enumerate(row_data):
-                    worksheet.write(row_num + 4, col_num, value, data_format)
+                    if value is not None:
+                        width = len(str(value))
+                        if width > widths[col_num]:
+                            widths[col_num] = width
                     
-            # Auto-size columns
-            for i, col in enumerate(df.columns):
-                # Get maximum width of data in column
-                max_len = max(df[col].astype(str).apply(len).max(), len(str(col)))
-                # Add a bit of padding
-                worksheet.set_column(i, i, max_len + 2)
+            # Size the columns, with a bit of padding
+            for col_num, width in enumerate(widths):
+                worksheet.set_column(col_num, col_num, width + 2)
         
         # Close the workbook
         workbook.close()
+    
+    def write_csv(self, path):
+        """Write the report's datasets as a zip archive of CSV files.
         
-        # Return the Excel file as bytes
-        excel_file.seek(0)
-        return excel_file.getvalue()
+        Every sheet of prepare_excel_data() becomes one UTF-8 CSV file. The
+        rows are converted and compressed in chunks straight into the
+        archive.
+        
+        Args:
+            path (str): File to write the zip archive to
+        """
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for sheet_name, df in self.prepare_excel_data().items():
+                with archive.open(_sheet_file_name(sheet_name, 'csv'), 'w') as member:
+                    with io.TextIOWrapper(member, encoding='utf-8', newline='') as csv_file:
+                        df.to_csv(csv_file, index=False, chunksize=CSV_CHUNK_ROWS)
+    
+    def write_parquet(self, path):
+        """Write the report's datasets as a zip archive of Parquet files.
+        
+        Every sheet of prepare_excel_data() becomes one Parquet file, with
+        the column types of its dataframe.
+        
+        Args:
+            path (str): File to write the zip archive to
+            
+        Raises:
+            ValueError: If pyarrow is not installed
+        """
+        if pq is None:
+            raise ValueError('Parquet output requires the pyarrow package')
+        
+        # Parquet files are already compressed, so they are stored as they are
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for sheet_name, df in self.prepare_excel_data().items():
+                table = pyarrow.Table.from_pandas(df.rename(columns=str), preserve_index=False)
+                with archive.open(_sheet_file_name(sheet_name, 'parquet'), 'w') as member:
+                    pq.write_table(table, member)
     
     @abstractmethod
     def prepare_excel_data(self):
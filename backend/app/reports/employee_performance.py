@@ -6,9 +6,9 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from app.models.employee import Employee
-from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
-from app.models.skill import Skill, SkillCategory
-from app.models.tool import Tool, ToolCategory
+from app.models.evaluation import Evaluation
+from app.utils.catalog import get_catalog
+from app.utils.evaluation_queries import load_evaluation_details
 from app import db
 from .base import ReportGenerator
 
@@ -55,29 +55,28 @@ class EmployeePerformanceReport(ReportGenerator):
         if not employee:
             raise ValueError(f"Employee with ID {employee_id} not found")
         
-        # Get evaluations for this employee
-        evaluations = Evaluation.query.filter(
-            Evaluation.employee_id == employee_id,
-            Evaluation.date >= start_date,
-            Evaluation.date <= end_date
-        ).order_by(Evaluation.date.desc()).all()
-        
-        # Get all skill categories
-        skill_categories = SkillCategory.query.all()
+        # Get evaluations for this employee with all of their rows (four queries)
+        evaluations = load_evaluation_details(
+            Evaluation.query.filter(
+                Evaluation.employee_id == employee_id,
+                Evaluation.evaluation_date >= start_date.date(),
+                Evaluation.evaluation_date <= end_date.date()
+            ).order_by(Evaluation.evaluation_date.desc())
+        )
         
-        # Get all tool categories
-        tool_categories = ToolCategory.query.all()
+        # Skill and tool categories from the taxonomy catalog
+        catalog = get_catalog()
+        skill_categories = catalog.skill_categories
+        tool_categories = catalog.tool_categories
         
         # Prepare skill data from evaluations
         skill_data = defaultdict(list)
         for evaluation in evaluations:
-            for skill_eval in evaluation.skill_evaluations:
-                skill = skill_eval.skill
-                category = skill.category.name
-                skill_data[category].append({
-                    'skill_name': skill.name,
+            for skill_eval in evaluation.skills:
+                skill_data[skill_eval.category_name].append({
+                    'skill_name': skill_eval.name,
                     'rating': skill_eval.rating,
-                    'date': evaluation.date
+                    'date': evaluation.evaluation.evaluation_date
                 })
         
         # Calculate average skill ratings by category
@@ -92,14 +91,12 @@ class EmployeePerformanceReport(ReportGenerator):
         # Prepare tool data from evaluations
         tool_data = defaultdict(list)
         for evaluation in evaluations:
-            for tool_eval in evaluation.tool_evaluations:
-                tool = tool_eval.tool
-                category = tool.category.name
-                tool_data[category].append({
-                    'tool_name': tool.name,
+            for tool_eval in evaluation.tools:
+                tool_data[tool_eval.category_name].append({
+                    'tool_name': tool_eval.name,
                     'can_operate': tool_eval.can_operate,
-                    'owned': tool_eval.owned,
-                    'date': evaluation.date
+                    'owned': tool_eval.owns_tool,
+                    'date': evaluation.evaluation.evaluation_date
                 })
         
         # Count tools that can be operated and owned by category
@@ -127,14 +124,14 @@ class EmployeePerformanceReport(ReportGenerator):
         # Group evaluations by month
         eval_by_month = defaultdict(list)
         for evaluation in evaluations:
-            month_key = evaluation.date.strftime('%Y-%m')
+            month_key = evaluation.evaluation.evaluation_date.strftime('%Y-%m')
             eval_by_month[month_key].append(evaluation)
         
         # Calculate average skill rating for each month
         for month_key, month_evals in sorted(eval_by_month.items()):
             month_skills = []
             for eval in month_evals:
-                month_skills.extend([se.rating for se in eval.skill_evaluations])
+                month_skills.extend([se.rating for se in eval.skills])
             
             if month_skills:
                 avg_rating = sum(month_skills) / len(month_skills)
@@ -148,10 +145,10 @@ class EmployeePerformanceReport(ReportGenerator):
         all_skill_ratings = []
         
         for eval in evaluations:
-            for skill_eval in eval.skill_evaluations:
+            for skill_eval in eval.skills:
                 all_skill_ratings.append({
-                    'skill_name': skill_eval.skill.name,
-                    'category': skill_eval.skill.category.name,
+                    'skill_name': skill_eval.name,
+                    'category': skill_eval.category_name,
                     'rating': skill_eval.rating
                 })
         
@@ -252,7 +249,7 @@ class EmployeePerformanceReport(ReportGenerator):
             'Phone Number': [employee.phone],
             'Email': [employee.email],
             'Total Evaluations': [len(evaluations)],
-            'Last Evaluation Date': [evaluations[0].date if evaluations else 'N/A']
+            'Last Evaluation Date': [evaluations[0].evaluation.evaluation_date if evaluations else 'N/A']
         }
         employee_df = pd.DataFrame(employee_info)
         
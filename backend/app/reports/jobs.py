@@ -0,0 +1,402 @@
+"""
+Background report jobs.
+
+Rendering a report (collect_data plus WeasyPrint or xlsxwriter) can take
+seconds, so instead of generating it inside the request a client submits a
+job and polls its status:
+
+    POST /reports/jobs             -> 202 {"job_id": 7, ...}
+    GET  /reports/jobs/7           -> {"status": "running", ...}
+    GET  /reports/jobs/7/download  -> the file once the status is "done"
+
+A job is a saved_reports row (status queued -> running -> done/failed), so
+any worker process can answer status requests. Jobs run on a small thread
+pool per process (KPI_REPORT_WORKERS); files are written to
+instance/reports (copied from the report cache when an identical report was
+generated before) and every produced or failed file is recorded in
+export_history.
+
+A job whose process exits while it is queued or running would never finish,
+so jobs older than KPI_REPORT_JOB_TIMEOUT that are still queued or running
+are marked failed when a worker starts its pool (and when such a job is
+polled). They are not re-queued: another live worker may still own them.
+"""
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from app.models.report import ExportHistory, ReportTemplate, SavedReport
+from app.reports.artifact_cache import get_report_artifact
+from app.reports.base import parquet_supported
+from app.reports.generators import get_available_report_types, get_report_generator
+
+# Template rendered for the PDF version of each report type
+REPORT_TEMPLATES = {
+    'employee': 'employee_performance.html',
+    'team': 'team_performance.html',
+    'skills': 'skills_analysis.html',
+    'tools': 'tool_inventory.html'
+}
+
+# Output format -> (file extension, mimetype)
+REPORT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('csv.zip', 'application/zip'),
+    'parquet': ('parquet.zip', 'application/zip')
+}
+
+# Generator method writing each dataset format (one file per sheet of
+# prepare_excel_data)
+DATA_WRITERS = {
+    'excel': 'write_excel',
+    'csv': 'write_csv',
+    'parquet': 'write_parquet'
+}
+
+# report_templates.template_type of each report type
+TEMPLATE_TYPES = {
+    'employee': 'EMPLOYEE',
+    'team': 'TEAM',
+    'skills': 'SKILL',
+    'tools': 'TOOL'
+}
+
+# Report period when the request gives no start date (the generators' default)
+DEFAULT_REPORT_DAYS = 365
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def parse_report_parameters(report_type, values):
+    """
+    Validate and normalize the collect_data arguments of a report
+
+    Args:
+        report_type (str): employee, team, skills or tools
+        values: Request form/args (MultiDict) or a plain dict
+
+    The report period is always resolved: a missing end date is today and
+    a missing start date DEFAULT_REPORT_DAYS before the end, so the result
+    identifies the data a report covers (it keys the report file cache).
+
+    Returns:
+        dict: collect_data keyword arguments without empty values
+
+    Raises:
+        ValueError: If the report type or a parameter is invalid
+    """
+    if report_type not in REPORT_TEMPLATES:
+        raise ValueError(f"Unsupported report type: {report_type}")
+
+    end_date = _parse_date(values.get('end_date'), 'end_date') or date.today().strftime('%Y-%m-%d')
+    start_date = _parse_date(values.get('start_date'), 'start_date') or (
+        datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=DEFAULT_REPORT_DAYS)
+    ).strftime('%Y-%m-%d')
+    parameters = {
+        'start_date': start_date,
+        'end_date': end_date
+    }
+
+    if report_type == 'employee':
+        parameters['employee_id'] = _parse_int(values.get('employee_id'), 'employee_id')
+        if parameters['employee_id'] is None:
+            raise ValueError('Employee ID is required')
+    else:
+        parameters['tier'] = (values.get('tier') or '').strip() or None
+
+    if report_type == 'team':
+        raw_ids = values.getlist('employee_ids') if hasattr(values, 'getlist') else values.get('employee_ids') or []
+        if isinstance(raw_ids, (str, int)):
+            raw_ids = [raw_ids]
+        employee_ids = sorted({_parse_int(value, 'employee_ids') for value in raw_ids if str(value).strip()})
+        parameters['employee_ids'] = employee_ids or None
+    elif report_type in ('skills', 'tools'):
+        parameters['category_id'] = _parse_int(values.get('category_id'), 'category_id')
+
+    return {name: value for name, value in sorted(parameters.items()) if value is not None}
+
+
+def check_report_format(file_format):
+    """
+    Raise ValueError if reports cannot be produced in a format
+    """
+    if file_format not in REPORT_FORMATS:
+        raise ValueError(f'Unsupported format: {file_format}')
+    if file_format == 'parquet' and not parquet_supported():
+        raise ValueError('Parquet output requires the pyarrow package')
+
+
+def write_report(report_type, parameters, file_format, path):
+    """
+    Collect the data of a report and write the document to a file (Excel,
+    CSV and Parquet datasets are streamed to disk)
+    """
+    check_report_format(file_format)
+
+    generator = get_report_generator(report_type)
+    generator.collect_data(**parameters)
+    if file_format == 'pdf':
+        with open(path, 'wb') as report_file:
+            report_file.write(generator.generate_pdf(REPORT_TEMPLATES[report_type]))
+    else:
+        getattr(generator, DATA_WRITERS[file_format])(path)
+
+
+def generate_report(report_type, parameters, file_format):
+    """
+    Return a report file, reusing the cached file of an identical earlier
+    request when the data has not changed since
+
+    Returns:
+        ReportArtifact: The report (its key is a strong ETag)
+    """
+    check_report_format(file_format)
+
+    extension, _ = REPORT_FORMATS[file_format]
+    return get_report_artifact(
+        report_type, parameters, file_format, extension,
+        lambda path: write_report(report_type, parameters, file_format, path)
+    )
+
+
+def report_file_name(report_type, file_format, when=None):
+    """
+    Return the download name of a report file
+    """
+    extension, _ = REPORT_FORMATS[file_format]
+    stem = REPORT_TEMPLATES[report_type].rsplit('.', 1)[0]
+    return f"{stem}_{(when or datetime.now()).strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def report_directory():
+    """
+    Return (and create) the directory generated report files are stored in
+    """
+    directory = os.path.join(current_app.instance_path, 'reports')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def submit_report_job(report_type, parameters, file_format, user_id=None):
+    """
+    Queue a report for background generation
+
+    Returns:
+        SavedReport: The job record (its id is the job id)
+    """
+    check_report_format(file_format)
+
+    report = SavedReport(
+        name=_report_type_name(report_type),
+        report_type=report_type,
+        parameters=json.dumps(parameters, sort_keys=True),
+        created_by=user_id,
+        status=JOB_QUEUED,
+        file_format=file_format
+    )
+    db.session.add(report)
+    db.session.commit()
+
+    get_report_jobs().submit(report.id)
+    return report
+
+
+def report_job_expired(report):
+    """
+    Return True if a queued or running job is older than KPI_REPORT_JOB_TIMEOUT
+    (its worker most likely exited before finishing it)
+    """
+    timeout = current_app.config.get('KPI_REPORT_JOB_TIMEOUT', 3600)
+    return bool(timeout) and report.status in (JOB_QUEUED, JOB_RUNNING) and \
+        report.created_at is not None and \
+        report.created_at < datetime.utcnow() - timedelta(seconds=timeout)
+
+
+def fail_expired_report_jobs(report_id=None):
+    """
+    Mark queued or running jobs older than KPI_REPORT_JOB_TIMEOUT failed
+
+    Args:
+        report_id (int): Only check this job
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    timeout = current_app.config.get('KPI_REPORT_JOB_TIMEOUT', 3600)
+    if not timeout:
+        return 0
+
+    now = datetime.utcnow()
+    statement = update(SavedReport).where(
+        SavedReport.status.in_((JOB_QUEUED, JOB_RUNNING)),
+        SavedReport.created_at < now - timedelta(seconds=timeout)
+    )
+    if report_id is not None:
+        statement = statement.where(SavedReport.id == report_id)
+    result = db.session.execute(
+        statement.values(
+            status=JOB_FAILED,
+            error_message='The report job was interrupted before it completed',
+            completed_at=now
+        ),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    if result.rowcount:
+        current_app.logger.warning('Marked %d interrupted report job(s) failed', result.rowcount)
+    return result.rowcount
+
+
+def run_report_job(report_id):
+    """
+    Generate a queued report, store the file and record the outcome
+    """
+    report = db.session.get(SavedReport, report_id)
+    if report is None or report.status != JOB_QUEUED:
+        return
+
+    report.status = JOB_RUNNING
+    db.session.commit()
+
+    report_type = report.report_type
+    file_format = report.file_format
+    file_name = report_file_name(report_type, file_format)
+    file_path = os.path.join(report_directory(), f'{report.id}_{file_name}')
+
+    try:
+        artifact = generate_report(report_type, json.loads(report.parameters or '{}'), file_format)
+        # Write under a temporary name so a download never sees a partial file
+        if artifact.temporary:
+            shutil.move(artifact.path, file_path + '.part')
+        else:
+            shutil.copyfile(artifact.path, file_path + '.part')
+        os.replace(file_path + '.part', file_path)
+        file_size = os.path.getsize(file_path)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Report job %s failed', report_id)
+        report = db.session.get(SavedReport, report_id)
+        report.status = JOB_FAILED
+        report.error_message = str(e) or e.__class__.__name__
+        report.completed_at = datetime.utcnow()
+        _record_export(report, file_name, '', None, 'FAILED', report.error_message)
+    else:
+        report.status = JOB_DONE
+        report.file_path = file_path
+        report.file_size = file_size
+        report.completed_at = datetime.utcnow()
+        _record_export(report, file_name, file_path, file_size, 'SUCCESS')
+
+    db.session.commit()
+
+
+class ReportJobQueue:
+    """
+    Thread pool running report jobs of one application
+    """
+
+    def __init__(self, app, max_workers=2):
+        self.app = app
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='kpi-report')
+
+    def submit(self, report_id):
+        """
+        Schedule a queued report
+        """
+        return self._executor.submit(self._run, report_id)
+
+    def _run(self, report_id):
+        with self.app.app_context():
+            try:
+                run_report_job(report_id)
+            finally:
+                db.session.remove()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def get_report_jobs():
+    """
+    Return the report job queue of the current application
+    """
+    queue = current_app.extensions.get('kpi_report_jobs')
+    if queue is None:
+        fail_expired_report_jobs()
+        queue = ReportJobQueue(
+            current_app._get_current_object(),
+            current_app.config.get('KPI_REPORT_WORKERS', 2)
+        )
+        current_app.extensions['kpi_report_jobs'] = queue
+    return queue
+
+
+def _record_export(report, file_name, file_path, file_size, status, error_message=None):
+    db.session.add(ExportHistory(
+        report_template_id=_template_id(report.report_type),
+        file_name=file_name,
+        file_path=file_path,
+        file_size=file_size,
+        status=status,
+        error_message=error_message,
+        user_id=report.created_by
+    ))
+
+
+def _template_id(report_type):
+    """
+    Return the id of the system template of a report type, creating it in
+    databases that were not seeded by migration v1.5.0
+    """
+    template_type = TEMPLATE_TYPES[report_type]
+    template = ReportTemplate.query.filter_by(
+        template_type=template_type
+    ).order_by(ReportTemplate.is_system.desc(), ReportTemplate.id).first()
+    if template is None:
+        template = ReportTemplate(
+            name=_report_type_name(report_type),
+            template_type=template_type,
+            config='{}',
+            is_system=True
+        )
+        db.session.add(template)
+        db.session.flush()
+    return template.id
+
+
+def _report_type_name(report_type):
+    for available in get_available_report_types():
+        if available['id'] == report_type:
+            return available['name']
+    return report_type
+
+
+def _parse_date(value, field):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Invalid {field} '{value}' (expected YYYY-MM-DD)")
+
+
+def _parse_int(value, field):
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field} '{value}'")
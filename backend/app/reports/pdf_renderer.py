@@ -0,0 +1,273 @@
+"""
+Out-of-process PDF rendering.
+
+WeasyPrint layout is pure CPU work that holds the GIL, so rendering a PDF
+inside a request thread stalls every other request of the worker. Report
+generators render their HTML as usual and hand it to a small pool of warm
+rendering processes (WeasyPrint is imported once per process) that return
+the PDF bytes:
+
+- the number of PDFs running or waiting is bounded (KPI_PDF_WORKERS +
+  KPI_PDF_QUEUE_SIZE); a request that finds the queue full gets
+  PDFRendererBusy instead of piling up, background report jobs wait for a
+  free slot
+- each PDF has a time limit (KPI_PDF_TIMEOUT); a renderer that does not
+  return in time is killed and the pool restarted
+- a process is replaced after KPI_PDF_MAX_JOBS_PER_WORKER renders, which
+  caps the memory WeasyPrint and its font caches accumulate
+
+With KPI_PDF_WORKERS = 0 PDFs are rendered in the calling thread.
+"""
+import atexit
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+from flask import current_app, has_request_context
+
+# Extra seconds the caller waits for a renderer that should have timed out itself
+TIMEOUT_GRACE = 5
+
+_renderer_lock = threading.Lock()
+
+
+class PDFRenderError(RuntimeError):
+    """
+    A PDF could not be rendered
+    """
+
+
+class PDFRendererBusy(PDFRenderError):
+    """
+    Too many PDFs are already running or waiting
+    """
+
+
+class PDFRenderTimeout(PDFRenderError):
+    """
+    A PDF took longer than the configured time limit
+    """
+
+
+def render_html_to_pdf(html, base_url=None, timeout=None):
+    """
+    Render an HTML document to PDF bytes (runs inside the worker processes)
+
+    Args:
+        html (str): Rendered report template
+        base_url (str): URL relative links and images are resolved against
+        timeout (float): Seconds before the render is aborted
+    """
+    use_alarm = bool(timeout) and hasattr(signal, 'setitimer') and \
+        threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        from weasyprint import HTML
+        return HTML(string=html, base_url=base_url).write_pdf()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _alarm(signum, frame):
+    raise PDFRenderTimeout('PDF rendering timed out')
+
+
+def _warm_up(pid_queue):
+    """
+    Process initializer: report the process id (so a stuck renderer can be
+    killed) and pay the WeasyPrint import before the first job
+    """
+    pid_queue.put(os.getpid())
+    import weasyprint  # noqa: F401
+
+
+class RenderProcessPool(ProcessPoolExecutor):
+    """
+    Spawned process pool whose workers report their process ids, so a
+    renderer stuck where the alarm cannot reach it can be killed
+    """
+
+    def __init__(self, max_workers, max_tasks_per_child=None):
+        # Never fork the threaded web process (open database connections, locks)
+        context = multiprocessing.get_context('spawn')
+        self._pid_queue = context.SimpleQueue()
+        self._pid_lock = threading.Lock()
+        self._worker_pids = set()
+        options = {
+            'max_workers': max_workers,
+            'mp_context': context,
+            'initializer': _warm_up,
+            'initargs': (self._pid_queue,)
+        }
+        if max_tasks_per_child:
+            options['max_tasks_per_child'] = max_tasks_per_child
+        super().__init__(**options)
+
+    def worker_pids(self):
+        """
+        Return the ids of the live worker processes.
+
+        Reading them also drains the queue, so it is called on every submit
+        to keep the pipe from filling up as recycled workers are replaced.
+        """
+        with self._pid_lock:
+            while not self._pid_queue.empty():
+                self._worker_pids.add(self._pid_queue.get())
+            self._worker_pids &= {process.pid for process in multiprocessing.active_children()}
+            return set(self._worker_pids)
+
+    def terminate(self):
+        """
+        Kill the worker processes and shut the pool down
+        """
+        pids = self.worker_pids()
+        # Only live children are signalled: the id of an exited worker may
+        # already belong to an unrelated process
+        for process in multiprocessing.active_children():
+            if process.pid in pids:
+                process.terminate()
+        self.shutdown(wait=False, cancel_futures=True)
+
+
+class PDFRenderer:
+    """
+    Bounded pool of PDF rendering processes
+    """
+
+    def __init__(self, max_workers=2, queue_size=8, timeout=120, max_jobs_per_worker=50):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout or None
+        self.max_jobs_per_worker = max_jobs_per_worker or None
+        self._slots = threading.BoundedSemaphore(self.max_workers + max(0, queue_size))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = 0
+        # Before Python 3.11 the pool cannot recycle single processes, so
+        # the whole pool is replaced once every process could have done its share
+        self._per_process_recycling = sys.version_info >= (3, 11)
+
+    def render(self, html, base_url=None, block=False):
+        """
+        Render an HTML document to PDF bytes
+
+        Args:
+            html (str): Rendered report template
+            base_url (str): URL relative links and images are resolved against
+            block (bool): Wait for a free slot instead of failing when the queue is full
+
+        Raises:
+            PDFRendererBusy: If the queue is full and block is False
+            PDFRenderTimeout: If the render exceeds the time limit
+            PDFRenderError: If the rendering process died
+        """
+        if not self._slots.acquire(blocking=block):
+            raise PDFRendererBusy('Too many PDF reports are being generated, please try again shortly')
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(render_html_to_pdf, html, base_url, self.timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout + TIMEOUT_GRACE if self.timeout else None)
+        except FutureTimeoutError:
+            # The renderer is stuck where the alarm cannot interrupt it
+            self._discard(executor, terminate=True)
+            raise PDFRenderTimeout('PDF rendering timed out')
+        except BrokenExecutor:
+            self._discard(executor)
+            raise PDFRenderError('The PDF rendering process exited unexpectedly')
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self):
+        with self._lock:
+            recycle_after = None if self._per_process_recycling or not self.max_jobs_per_worker \
+                else self.max_workers * self.max_jobs_per_worker
+            if self._executor is not None and recycle_after and self._jobs >= recycle_after:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._jobs = 0
+            self._executor.worker_pids()
+            self._jobs += 1
+            return self._executor
+
+    def _new_executor(self):
+        return RenderProcessPool(
+            self.max_workers,
+            self.max_jobs_per_worker if self._per_process_recycling else None
+        )
+
+    def _discard(self, executor, terminate=False):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        if terminate:
+            executor.terminate()
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_pdf_renderer():
+    """
+    Return the PDF renderer of the current application (None when PDFs are
+    rendered in-process)
+    """
+    if not current_app.config.get('KPI_PDF_WORKERS'):
+        return None
+
+    renderer = current_app.extensions.get('kpi_pdf_renderer')
+    if renderer is None:
+        # Two requests racing here would each start a pool of processes
+        with _renderer_lock:
+            renderer = current_app.extensions.get('kpi_pdf_renderer')
+            if renderer is None:
+                config = current_app.config
+                renderer = PDFRenderer(
+                    max_workers=config['KPI_PDF_WORKERS'],
+                    queue_size=config.get('KPI_PDF_QUEUE_SIZE', 8),
+                    timeout=config.get('KPI_PDF_TIMEOUT', 120),
+                    max_jobs_per_worker=config.get('KPI_PDF_MAX_JOBS_PER_WORKER', 50)
+                )
+                current_app.extensions['kpi_pdf_renderer'] = renderer
+                atexit.register(renderer.shutdown, wait=False)
+    return renderer
+
+
+def pdf_base_url():
+    """
+    Return the base URL of report templates (the application package, so
+    static/... resolves from disk instead of through the web server)
+    """
+    return Path(current_app.root_path).as_uri() + '/'
+
+
+def render_pdf(html, base_url=None):
+    """
+    Render a report's HTML to PDF bytes using the application's renderer.
+
+    Request threads fail fast with PDFRendererBusy when the queue is full;
+    background jobs wait for a slot.
+    """
+    base_url = base_url or pdf_base_url()
+    renderer = get_pdf_renderer()
+    if renderer is None:
+        return render_html_to_pdf(html, base_url, current_app.config.get('KPI_PDF_TIMEOUT'))
+    return renderer.render(html, base_url, block=not has_request_context())
@@ -8,6 +8,7 @@ from collections import defaultdict
 from app.models.employee import Employee
 from app.models.evaluation import Evaluation, SkillEvaluation
 from app.models.skill import Skill, SkillCategory
+from app.utils.timeseries import MonthIndex, MonthlySeries, downsample
 from app import db
 from .base import ReportGenerator
 
@@ -147,25 +148,21 @@ class SkillsAnalysisReport(ReportGenerator):
         # Sort skill gaps by gap size (descending)
         skill_gaps.sort(key=lambda x: x['gap'], reverse=True)
         
-        # Track skill development over time
-        # Group by month for time series analysis
-        monthly_skill_data = defaultdict(lambda: defaultdict(list))
+        # Track skill development over time on a shared month calendar
+        month_index = MonthIndex.between(start_date.date(), end_date.date())
+        skill_series = MonthlySeries.from_ratings(
+            list(skill_averages.keys()),
+            month_index,
+            (
+                (skill_id, rating['date'].strftime('%Y-%m'), rating['rating'])
+                for skill_id, ratings in skill_ratings.items()
+                for rating in ratings
+            )
+        )
         
-        for skill_id, ratings in skill_ratings.items():
-            for rating in ratings:
-                month_key = rating['date'].strftime('%Y-%m')
-                monthly_skill_data[month_key][skill_id].append(rating['rating'])
-        
-        # Calculate monthly averages
-        skill_trends = defaultdict(list)
-        
-        for month_key in sorted(monthly_skill_data.keys()):
-            for skill_id, ratings in monthly_skill_data[month_key].items():
-                if skill_id in skill_averages:  # Only track skills we calculated averages for
-                    skill_trends[skill_id].append({
-                        'month': month_key,
-                        'average': sum(ratings) / len(ratings) if ratings else 0
-                    })
+        # Averages per month (or quarter/year for long periods) for every skill
+        skill_series = downsample(skill_series)
+        skill_trends = {skill_id: skill_series.trend(skill_id) for skill_id in skill_averages}
         
         # Calculate skill distribution by tier (if all tiers were included)
         tier_skill_averages = defaultdict(lambda: defaultdict(list))
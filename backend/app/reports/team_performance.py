@@ -9,6 +9,7 @@ from app.models.employee import Employee
 from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
 from app.models.skill import Skill, SkillCategory
 from app.models.tool import Tool, ToolCategory
+from app.utils.kpi_stats import get_employee_category_totals
 from app import db
 from .base import ReportGenerator
 
@@ -88,25 +89,21 @@ class TeamPerformanceReport(ReportGenerator):
         # Prepare employee-wise skill data
         employee_skill_data = {}
         
+        # Rating totals by employee and category, from one grouped query
+        # (served by the rollup tables when KPI_USE_ROLLUPS is enabled)
+        category_totals = get_employee_category_totals(
+            [employee.id for employee in employees],
+            start_date.date(),
+            end_date.date()
+        )
+        
         for employee in employees:
-            employee_evals = [e for e in evaluations if e.employee_id == employee.id]
-            
-            # Aggregate skill ratings by category for this employee
-            skill_ratings = defaultdict(list)
-            
-            for eval in employee_evals:
-                for skill_eval in eval.skill_evaluations:
-                    skill = skill_eval.skill
-                    category = skill.category.name
-                    skill_ratings[category].append(skill_eval.rating)
-            
-            # Calculate average for each category
+            # Calculate average for each category this employee was rated in
             skill_averages = {}
-            for category, ratings in skill_ratings.items():
-                if ratings:
-                    skill_averages[category] = sum(ratings) / len(ratings)
-                else:
-                    skill_averages[category] = 0
+            for category in skill_categories:
+                rating_sum, rating_count = category_totals.get((employee.id, category.id), (0, 0))
+                if rating_count:
+                    skill_averages[category.name] = rating_sum / rating_count
             
             # Store data for this employee
             employee_skill_data[employee.id] = {
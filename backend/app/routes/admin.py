@@ -11,6 +11,7 @@ from flask_login import login_required, current_user
 from app.models.user import User
 from app.middleware.access_control import admin_required
 from app.utils.db_maintenance import optimize_database, get_database_stats
+from app.utils.instrumentation import get_performance_metrics
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -35,14 +36,8 @@ def dashboard():
     # Get database stats
     stats = get_database_stats()
     
-    # Get performance metrics (placeholder data for now)
-    performance_metrics = {
-        'avg_response_time': 145,
-        'requests_last_hour': 278,
-        'errors_last_day': 12,
-        'peak_load_time': '14:30',
-        'memory_usage': 45
-    }
+    # Get performance metrics collected by the request/query instrumentation
+    performance_metrics = get_performance_metrics()
     
     # Get recent evaluations
     # In a real implementation, this would query the database
@@ -12,6 +12,7 @@ from flask_login import login_required, current_user
 from app.middleware.access_control import admin_required
 from app.utils.db_maintenance import optimize_database, get_database_stats, check_database_integrity, export_database, import_csv_data
 from app.utils.admin_helpers import get_system_health, get_system_logs, cleanup_old_data
+from app.utils.instrumentation import get_performance_metrics
 
 # Database Maintenance
 @admin.route('/maintenance', methods=['GET'])
@@ -152,14 +153,8 @@ def health():
     """System health monitoring page"""
     health_data = get_system_health()
     
-    # Mock data for performance metrics (in a real app, this would come from monitoring)
-    performance_metrics = {
-        'avg_response_time': 145, # milliseconds
-        'requests_last_hour': 278,
-        'errors_last_day': 12,
-        'peak_load_time': '14:30',
-        'memory_usage': 45 # percent
-    }
+    # Get performance metrics collected by the request/query instrumentation
+    performance_metrics = get_performance_metrics()
     
     # Current timestamp for 'last updated'
     now = datetime.datetime.now()
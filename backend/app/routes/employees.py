@@ -1,11 +1,21 @@
 """
 Employee routes for the KPI system
 """
+import numpy as np
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from app.models.employee import Employee
 from app.models.skill import Skill, SkillCategory
 from app.models.tool import Tool, ToolCategory
 from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
+from app.utils.cache import bump_data_version
+from app.utils.profiles import get_employee_profile, invalidate_employee_profiles
+from app.utils.catalog import get_catalog
+from app.utils.employee_compare import MAX_COMPARE_EMPLOYEES, compare_employees, parse_employee_ids
+from app.utils.employee_search import EMPLOYEE_TIERS, employee_listing_page
+from app.utils.pagination import parse_page_size
+from app.utils.promotion import get_promotion_readiness, refresh_promotion_readiness
+from app.utils.serialization import model_serializer, parse_fields
+from app.utils.skill_state import get_skill_state
 from app import db
 from datetime import datetime
 from sqlalchemy import func, desc, and_
@@ -16,33 +26,24 @@ bp = Blueprint('employees', __name__, url_prefix='/employees')
 @bp.route('/')
 def index():
     """
-    List all employees with filtering options
+    List employees with search, filtering, sorting and keyset pagination
     """
-    # Get filter parameters
-    search = request.args.get('search', '')
-    tier = request.args.get('tier', '')
-    status = request.args.get('status', '')
-    
-    # Base query
-    query = Employee.query
-    
-    # Apply filters
-    if search:
-        query = query.filter(Employee.name.ilike(f'%{search}%') | 
-                           Employee.phone.ilike(f'%{search}%'))
-    
-    if tier:
-        query = query.filter(Employee.tier == tier)
-    
-    if status == 'active':
-        query = query.filter(Employee.active == True)
-    elif status == 'inactive':
-        query = query.filter(Employee.active == False)
-    
-    # Get results ordered by name
-    employees = query.order_by(Employee.name).all()
-    
-    return render_template('employees/index.html', employees=employees)
+    page = _employee_page()
+    return render_template('employees/index.html', employees=page.items, page=page, tiers=EMPLOYEE_TIERS)
+
+def _employee_page():
+    """
+    Return the employee listing page selected by the request arguments
+    """
+    return employee_listing_page(
+        search=request.args.get('search', ''),
+        tier=request.args.get('tier', ''),
+        status=request.args.get('status', ''),
+        sort=request.args.get('sort', 'name'),
+        direction=request.args.get('direction', 'asc'),
+        cursor=request.args.get('cursor'),
+        page_size=parse_page_size(request.args.get('per_page'))
+    )
 
 @bp.route('/create', methods=('GET', 'POST'))
 def create():
@@ -82,7 +83,11 @@ def create():
                     active=active
                 )
                 db.session.add(employee)
+                db.session.flush()
+                refresh_promotion_readiness([employee.employee_id])
                 db.session.commit()
+                invalidate_employee_profiles([employee.employee_id])
+                bump_data_version()
                 
                 flash(f'Employee "{name}" successfully created!', 'success')
                 return redirect(url_for('employees.view', employee_id=employee.employee_id))
@@ -99,111 +104,51 @@ def view(employee_id):
     """
     employee = Employee.query.get_or_404(employee_id)
     
-    # Get all evaluations for this employee
-    evaluations = Evaluation.query.filter_by(employee_id=employee_id)\
-                                .order_by(Evaluation.evaluation_date.desc())\
-                                .all()
+    # Evaluation history, ratings and tool status as one cached snapshot
+    profile = get_employee_profile(employee_id)
     
-    # Get the most recent evaluation
-    last_evaluation = evaluations[0] if evaluations else None
+    # Skill and tool taxonomy from the in-memory catalog
+    catalog = get_catalog()
+    skill_categories = catalog.skill_categories
+    tool_categories = catalog.tool_categories
+    tools = catalog.tools
     
-    # Get skill categories
-    skill_categories = SkillCategory.query.order_by(SkillCategory.display_order).all()
+    tools_by_category = {category.category_id: category.tools for category in tool_categories}
     
-    # Calculate average rating for each skill category
-    category_ratings = {}
-    
-    for category in skill_categories:
-        # Query average rating for this category
-        rating_query = db.session.query(
-            func.avg(SkillEvaluation.rating).label('avg_rating')
-        ).join(
-            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
-        ).join(
-            Skill, SkillEvaluation.skill_id == Skill.skill_id
-        ).filter(
-            Evaluation.employee_id == employee_id,
-            Skill.category_id == category.category_id
-        )
-        
-        avg_rating = rating_query.scalar()
-        category_ratings[category.category_id] = avg_rating if avg_rating else 0
-    
-    # Get tool categories and tools
-    tool_categories = ToolCategory.query.order_by(ToolCategory.display_order).all()
-    
-    # Group tools by category
-    tools_by_category = {}
-    for category in tool_categories:
-        tools_by_category[category.category_id] = Tool.query.filter_by(category_id=category.category_id).all()
-    
-    # Get tool proficiency data
-    # 1. Tools the employee can operate
-    can_operate_tools = set()
-    tool_evals = db.session.query(
-        ToolEvaluation.tool_id
-    ).join(
-        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
-    ).filter(
-        Evaluation.employee_id == employee_id,
-        ToolEvaluation.can_operate == True
-    ).all()
-    
-    for tool_eval in tool_evals:
-        can_operate_tools.add(tool_eval.tool_id)
-    
-    # 2. Tools the employee owns
-    owns_tools = set()
-    tool_evals = db.session.query(
-        ToolEvaluation.tool_id
-    ).join(
-        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
-    ).filter(
-        Evaluation.employee_id == employee_id,
-        ToolEvaluation.owns_tool == True
-    ).all()
-    
-    for tool_eval in tool_evals:
-        owns_tools.add(tool_eval.tool_id)
-    
-    # Calculate tool counts by category
-    category_tool_counts = {}
-    for category in tool_categories:
-        # Count tools in this category that the employee can operate
-        count = db.session.query(func.count(Tool.tool_id)).filter(
-            Tool.category_id == category.category_id,
-            Tool.tool_id.in_(can_operate_tools)
-        ).scalar()
-        
-        category_tool_counts[category.category_id] = count
+    # Count the tools the employee can operate in each category
+    can_operate_tools = profile['can_operate_tools']
+    category_tool_counts = {
+        category_id: sum(1 for tool in category_tools if tool.tool_id in can_operate_tools)
+        for category_id, category_tools in tools_by_category.items()
+    }
     
     # Calculate overall tool proficiency percentage
-    total_tools = db.session.query(func.count(Tool.tool_id)).scalar()
-    tool_proficiency = (len(can_operate_tools) / total_tools * 100) if total_tools > 0 else 0
+    tool_proficiency = (len(can_operate_tools) / len(tools) * 100) if tools else 0
     
-    # Get special skills
-    special_skills = db.session.query(
-        SpecialSkill
-    ).join(
-        Evaluation, SpecialSkill.evaluation_id == Evaluation.evaluation_id
-    ).filter(
-        Evaluation.employee_id == employee_id
-    ).all()
+    # Current category ratings from the latest rating of every skill
+    current_averages = get_skill_state().category_averages([employee_id], skill_categories)[0]
+    current_category_ratings = {
+        category.category_id: float(average)
+        for category, average in zip(skill_categories, current_averages) if not np.isnan(average)
+    }
     
     return render_template(
         'employees/view.html',
         employee=employee,
-        evaluations=evaluations,
-        last_evaluation=last_evaluation,
+        evaluations=profile['evaluations'],
+        last_evaluation=profile['evaluations'][0] if profile['evaluations'] else None,
         skill_categories=skill_categories,
-        category_ratings=category_ratings,
+        category_ratings=profile['category_ratings'],
+        current_category_ratings=current_category_ratings,
+        top_skills=profile['top_skills'],
+        improvement_skills=profile['improvement_skills'],
         tool_categories=tool_categories,
         tools_by_category=tools_by_category,
         can_operate_tools=can_operate_tools,
-        owns_tools=owns_tools,
+        owns_tools=profile['owns_tools'],
         category_tool_counts=category_tool_counts,
         tool_proficiency=tool_proficiency,
-        special_skills=special_skills
+        special_skills=profile['special_skills']
     )
 
 @bp.route('/<int:employee_id>/edit', methods=('GET', 'POST'))
@@ -245,51 +190,32 @@ def edit(employee_id):
                 employee.active = active
                 employee.updated_at = datetime.now()
                 
+                # The tier and active flag decide the next promotion step
+                refresh_promotion_readiness([employee_id])
                 db.session.commit()
+                invalidate_employee_profiles([employee_id])
+                bump_data_version()
                 
                 flash(f'Employee "{name}" successfully updated!', 'success')
                 return redirect(url_for('employees.view', employee_id=employee.employee_id))
         
         flash(error, 'danger')
     
-    # Calculate statistics for display
-    # Get all evaluations for this employee
-    evaluations = Evaluation.query.filter_by(employee_id=employee_id).all()
-    
-    # Calculate average skill rating
-    avg_skill_rating = 0
-    if evaluations:
-        skill_ratings = db.session.query(
-            func.avg(SkillEvaluation.rating).label('avg_rating')
-        ).join(
-            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
-        ).filter(
-            Evaluation.employee_id == employee_id
-        ).scalar()
-        
-        avg_skill_rating = skill_ratings if skill_ratings else 0
+    # Statistics for display come from the cached profile snapshot
+    profile = get_employee_profile(employee_id)
     
     # Calculate tool proficiency
-    total_tools = db.session.query(func.count(Tool.tool_id)).scalar()
+    total_tools = len(get_catalog().tools)
     if total_tools > 0:
-        can_operate_count = db.session.query(
-            func.count(ToolEvaluation.tool_id.distinct())
-        ).join(
-            Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
-        ).filter(
-            Evaluation.employee_id == employee_id,
-            ToolEvaluation.can_operate == True
-        ).scalar()
-        
-        tools_proficiency = (can_operate_count / total_tools * 100)
+        tools_proficiency = (len(profile['can_operate_tools']) / total_tools * 100)
     else:
         tools_proficiency = 0
     
     return render_template(
         'employees/edit.html',
         employee=employee,
-        evaluations=evaluations,
-        avg_skill_rating=avg_skill_rating,
+        evaluations=profile['evaluations'],
+        avg_skill_rating=profile['avg_skill_rating'],
         tools_proficiency=tools_proficiency
     )
 
@@ -306,7 +232,10 @@ def delete(employee_id):
         
         # Delete the employee (and cascade delete related records)
         db.session.delete(employee)
+        refresh_promotion_readiness([employee_id])
         db.session.commit()
+        invalidate_employee_profiles([employee_id])
+        bump_data_version()
         
         flash(f'Employee "{name}" successfully deleted!', 'success')
     except Exception as e:
@@ -319,28 +248,64 @@ def delete(employee_id):
 @bp.route('/api/list')
 def api_list():
     """
-    Return JSON list of employees
+    Return one page of employees as JSON.
+
+    Accepts the listing arguments (search, tier, status, sort, direction,
+    per_page, cursor) and ``fields``, a comma-separated list of the
+    attributes to include.
     """
-    # Get filter parameters
-    tier = request.args.get('tier', '')
-    status = request.args.get('status', '')
-    
-    # Base query
-    query = Employee.query
-    
-    # Apply filters
-    if tier:
-        query = query.filter(Employee.tier == tier)
-    
-    if status == 'active':
-        query = query.filter(Employee.active == True)
-    elif status == 'inactive':
-        query = query.filter(Employee.active == False)
-    
-    # Get results ordered by name
-    employees = query.order_by(Employee.name).all()
-    
-    return jsonify([employee.to_dict() for employee in employees])
+    page = _employee_page()
+    fields = parse_fields(request.args.get('fields'))
+    serializer = model_serializer(Employee).select(fields)
+    with_count = not fields or 'evaluation_count' in fields
+
+    employees = []
+    for employee, evaluation_count in page.items:
+        data = serializer(employee)
+        if with_count:
+            data['evaluation_count'] = evaluation_count
+        employees.append(data)
+
+    return jsonify({
+        'employees': employees,
+        'page_size': page.page_size,
+        'next_cursor': page.next_cursor
+    })
+
+@bp.route('/api/compare')
+def api_compare():
+    """
+    Compare a group of employees side by side.
+
+    ``ids`` is a comma-separated (or repeated) list of employee ids. The
+    response holds one row per employee for category averages, current
+    category averages, tools operated per tool category, tool proficiency
+    and latest skill ratings.
+    """
+    try:
+        employee_ids = parse_employee_ids(request.args.getlist('ids'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not employee_ids:
+        return jsonify({'error': 'At least one employee id is required'}), 400
+    if len(employee_ids) > MAX_COMPARE_EMPLOYEES:
+        return jsonify({'error': f'At most {MAX_COMPARE_EMPLOYEES} employees can be compared'}), 400
+
+    return jsonify(compare_employees(employee_ids))
+
+@bp.route('/api/promotion-readiness')
+def api_promotion_readiness():
+    """
+    Return the promotion readiness of every active employee, best first.
+
+    ``ready=1`` limits the result to the employees who meet every
+    requirement of their next tier.
+    """
+    results = get_promotion_readiness()
+    if request.args.get('ready', type=int):
+        results = [result for result in results if result.ready]
+    return jsonify({'results': [result.to_dict() for result in results]})
 
 @bp.route('/api/<int:employee_id>')
 def api_get(employee_id):
@@ -348,18 +313,11 @@ def api_get(employee_id):
     Return JSON data for a specific employee
     """
     employee = Employee.query.get_or_404(employee_id)
-    return jsonify(employee.to_dict())
+    return jsonify(employee.to_dict(parse_fields(request.args.get('fields'))))
 
 @bp.route('/api/tiers')
 def api_tiers():
     """
     Return list of valid employee tiers
     """
-    tiers = [
-        "Apprentice",
-        "Handyman",
-        "Craftsman",
-        "Master Craftsman",
-        "Lead Craftsman"
-    ]
-    return jsonify(tiers)
+    return jsonify(list(EMPLOYEE_TIERS))
@@ -1,13 +1,25 @@
 """
 Evaluation routes for the KPI system
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, abort, current_app, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from app.models.employee import Employee
 from app.models.skill import Skill, SkillCategory
 from app.models.tool import Tool, ToolCategory
 from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
-from app import db
-from datetime import datetime
+from app.utils.rollups import evaluation_rollup_keys, refresh_rollups
+from app.utils.cache import bump_data_version
+from app.utils.evaluation_queries import (
+    EvaluationFilters, evaluation_listing_page, evaluation_row_serializer, iter_evaluation_listing,
+    load_evaluation_detail
+)
+from app.utils.evaluation_import import IMPORT_FORMATS, detect_format, import_evaluations
+from app.utils.evaluation_writer import parse_evaluation_form, create_evaluation, update_evaluation
+from app.utils.profiles import invalidate_employee_profiles
+from app.utils.catalog import get_catalog
+from app.utils.pagination import parse_page_size
+from app.utils.serialization import parse_fields
+from app.middleware.access_control import api_manager_required
+from app import csrf, db
 
 # Create blueprint
 bp = Blueprint('evaluations', __name__, url_prefix='/evaluations')
@@ -15,10 +27,21 @@ bp = Blueprint('evaluations', __name__, url_prefix='/evaluations')
 @bp.route('/')
 def index():
     """
-    List all evaluations
+    List evaluations, newest first, one keyset page at a time
     """
-    evaluations = Evaluation.query.order_by(Evaluation.evaluation_date.desc()).all()
-    return render_template('evaluations/index.html', evaluations=evaluations)
+    filters = EvaluationFilters.from_request(request.args)
+    page = evaluation_listing_page(
+        filters,
+        request.args.get('cursor'),
+        parse_page_size(request.args.get('per_page'))
+    )
+    return render_template(
+        'evaluations/index.html',
+        evaluations=page.items,
+        page=page,
+        filters=filters,
+        employees=Employee.query.order_by(Employee.name).with_entities(Employee.employee_id, Employee.name).all()
+    )
 
 @bp.route('/create', methods=('GET', 'POST'))
 def create():
@@ -30,79 +53,22 @@ def create():
     
     if request.method == 'POST':
         # Process the submitted form
-        employee_id = request.form.get('employee_id')
-        evaluator_id = request.form.get('evaluator_id')
-        evaluation_date = request.form.get('evaluation_date')
-        notes = request.form.get('notes')
-
-        error = None
-        if not employee_id:
-            error = 'Employee is required.'
-        elif not evaluation_date:
-            error = 'Evaluation date is required.'
+        data, error = parse_evaluation_form(request.form, get_catalog(fresh=True))
 
         if error is None:
-            # Create new evaluation record
-            evaluation = Evaluation(
-                employee_id=employee_id,
-                evaluator_id=evaluator_id,
-                evaluation_date=datetime.strptime(evaluation_date, '%Y-%m-%d').date(),
-                notes=notes
-            )
-            db.session.add(evaluation)
-            db.session.commit()
-
-            # Get the new evaluation ID to use for skill and tool evaluations
-            evaluation_id = evaluation.evaluation_id
-            
-            # Process skill evaluations
-            skill_categories = SkillCategory.query.all()
-            for category in skill_categories:
-                for skill in category.skills:
-                    skill_rating = request.form.get(f'skill_{skill.skill_id}')
-                    if skill_rating and skill_rating.isdigit():
-                        skill_eval = SkillEvaluation(
-                            evaluation_id=evaluation_id,
-                            skill_id=skill.skill_id,
-                            rating=int(skill_rating)
-                        )
-                        db.session.add(skill_eval)
-            
-            # Process tool evaluations
-            tool_categories = ToolCategory.query.all()
-            for category in tool_categories:
-                for tool in category.tools:
-                    can_operate = request.form.get(f'tool_operate_{tool.tool_id}') == 'on'
-                    owns_tool = request.form.get(f'tool_own_{tool.tool_id}') == 'on'
-                    if can_operate or owns_tool:
-                        tool_eval = ToolEvaluation(
-                            evaluation_id=evaluation_id,
-                            tool_id=tool.tool_id,
-                            can_operate=can_operate,
-                            owns_tool=owns_tool
-                        )
-                        db.session.add(tool_eval)
-            
-            # Process special skills
-            special_skills = request.form.get('special_skills')
-            if special_skills:
-                for skill_name in special_skills.split(','):
-                    if skill_name.strip():
-                        special_skill = SpecialSkill(
-                            evaluation_id=evaluation_id,
-                            skill_name=skill_name.strip()
-                        )
-                        db.session.add(special_skill)
-            
-            db.session.commit()
+            # Evaluation, ratings and rollups are written in one transaction
+            evaluation = create_evaluation(data)
+            invalidate_employee_profiles([data.employee_id])
+            bump_data_version()
             flash('Evaluation successfully created!', 'success')
-            return redirect(url_for('evaluations.view', evaluation_id=evaluation_id))
+            return redirect(url_for('evaluations.view', evaluation_id=evaluation.evaluation_id))
         else:
             flash(error, 'danger')
     
     # Get all categories, skills, and tools for the form
-    skill_categories = SkillCategory.query.order_by(SkillCategory.display_order).all()
-    tool_categories = ToolCategory.query.order_by(ToolCategory.display_order).all()
+    catalog = get_catalog()
+    skill_categories = catalog.skill_categories
+    tool_categories = catalog.tool_categories
     
     return render_template(
         'evaluations/create.html',
@@ -116,103 +82,51 @@ def view(evaluation_id):
     """
     View details of an evaluation
     """
-    evaluation = Evaluation.query.get_or_404(evaluation_id)
-    return render_template('evaluations/view.html', evaluation=evaluation)
+    details = load_evaluation_detail(evaluation_id)
+    if details is None:
+        abort(404)
+    return render_template('evaluations/view.html', evaluation=details.evaluation, details=details)
 
 @bp.route('/<int:evaluation_id>/edit', methods=('GET', 'POST'))
 def edit(evaluation_id):
     """
     Edit an existing evaluation
     """
-    evaluation = Evaluation.query.get_or_404(evaluation_id)
-    employees = Employee.query.filter_by(active=True).all()
-    
     if request.method == 'POST':
-        # Similar to create but update existing records
-        evaluation.employee_id = request.form.get('employee_id')
-        evaluation.evaluator_id = request.form.get('evaluator_id')
-        evaluation.evaluation_date = datetime.strptime(request.form.get('evaluation_date'), '%Y-%m-%d').date()
-        evaluation.notes = request.form.get('notes')
-
-        # Clear existing skill and tool evaluations to replace with new ones
-        SkillEvaluation.query.filter_by(evaluation_id=evaluation_id).delete()
-        ToolEvaluation.query.filter_by(evaluation_id=evaluation_id).delete()
-        SpecialSkill.query.filter_by(evaluation_id=evaluation_id).delete()
-        
-        # Process skill evaluations
-        skill_categories = SkillCategory.query.all()
-        for category in skill_categories:
-            for skill in category.skills:
-                skill_rating = request.form.get(f'skill_{skill.skill_id}')
-                if skill_rating and skill_rating.isdigit():
-                    skill_eval = SkillEvaluation(
-                        evaluation_id=evaluation_id,
-                        skill_id=skill.skill_id,
-                        rating=int(skill_rating)
-                    )
-                    db.session.add(skill_eval)
-        
-        # Process tool evaluations
-        tool_categories = ToolCategory.query.all()
-        for category in tool_categories:
-            for tool in category.tools:
-                can_operate = request.form.get(f'tool_operate_{tool.tool_id}') == 'on'
-                owns_tool = request.form.get(f'tool_own_{tool.tool_id}') == 'on'
-                if can_operate or owns_tool:
-                    tool_eval = ToolEvaluation(
-                        evaluation_id=evaluation_id,
-                        tool_id=tool.tool_id,
-                        can_operate=can_operate,
-                        owns_tool=owns_tool
-                    )
-                    db.session.add(tool_eval)
-        
-        # Process special skills
-        special_skills = request.form.get('special_skills')
-        if special_skills:
-            for skill_name in special_skills.split(','):
-                if skill_name.strip():
-                    special_skill = SpecialSkill(
-                        evaluation_id=evaluation_id,
-                        skill_name=skill_name.strip()
-                    )
-                    db.session.add(special_skill)
-        
-        db.session.commit()
-        flash('Evaluation successfully updated!', 'success')
-        return redirect(url_for('evaluations.view', evaluation_id=evaluation_id))
+        evaluation = Evaluation.query.get_or_404(evaluation_id)
+        data, error = parse_evaluation_form(request.form, get_catalog(fresh=True))
+
+        if error is None:
+            previous_employee_id = evaluation.employee_id
+            # Only the rows that differ from the form are written
+            if update_evaluation(evaluation, data):
+                invalidate_employee_profiles([previous_employee_id, evaluation.employee_id])
+                bump_data_version()
+            flash('Evaluation successfully updated!', 'success')
+            return redirect(url_for('evaluations.view', evaluation_id=evaluation_id))
+        else:
+            flash(error, 'danger')
     
     # Get all categories, skills, and tools for the form
-    skill_categories = SkillCategory.query.order_by(SkillCategory.display_order).all()
-    tool_categories = ToolCategory.query.order_by(ToolCategory.display_order).all()
-    
-    # Get existing skill evaluations
-    skill_evaluations = {
-        se.skill_id: se.rating 
-        for se in SkillEvaluation.query.filter_by(evaluation_id=evaluation_id).all()
-    }
-    
-    # Get existing tool evaluations
-    tool_evaluations = {
-        te.tool_id: {'can_operate': te.can_operate, 'owns_tool': te.owns_tool} 
-        for te in ToolEvaluation.query.filter_by(evaluation_id=evaluation_id).all()
-    }
+    catalog = get_catalog()
+    skill_categories = catalog.skill_categories
+    tool_categories = catalog.tool_categories
     
-    # Get existing special skills
-    special_skills = [
-        ss.skill_name 
-        for ss in SpecialSkill.query.filter_by(evaluation_id=evaluation_id).all()
-    ]
+    # Get the evaluation with its ratings, tool evaluations and special skills
+    details = load_evaluation_detail(evaluation_id)
+    if details is None:
+        abort(404)
+    employees = Employee.query.filter_by(active=True).all()
     
     return render_template(
         'evaluations/edit.html',
-        evaluation=evaluation,
+        evaluation=details.evaluation,
         employees=employees,
         skill_categories=skill_categories,
         tool_categories=tool_categories,
-        skill_evaluations=skill_evaluations,
-        tool_evaluations=tool_evaluations,
-        special_skills=','.join(special_skills)
+        skill_evaluations=details.skill_ratings,
+        tool_evaluations=details.tool_flags,
+        special_skills=','.join(details.special_skill_names)
     )
 
 @bp.route('/<int:evaluation_id>/delete', methods=('POST',))
@@ -221,8 +135,13 @@ def delete(evaluation_id):
     Delete an evaluation
     """
     evaluation = Evaluation.query.get_or_404(evaluation_id)
+    employee_id = evaluation.employee_id
+    rollup_keys = evaluation_rollup_keys(evaluation)
     db.session.delete(evaluation)
+    refresh_rollups(rollup_keys)
     db.session.commit()
+    invalidate_employee_profiles([employee_id])
+    bump_data_version()
     flash('Evaluation successfully deleted!', 'success')
     return redirect(url_for('evaluations.index'))
 
@@ -230,10 +149,48 @@ def delete(evaluation_id):
 @bp.route('/api/list')
 def api_list():
     """
-    Return JSON list of evaluations
+    Return one page of evaluations as JSON.
+
+    Query parameters: employee_id, evaluator_id, start_date, end_date,
+    per_page, cursor (the next_cursor of the previous page) and fields, a
+    comma-separated list of the attributes to include.
+    """
+    filters = EvaluationFilters.from_request(request.args)
+    serializer = evaluation_row_serializer(parse_fields(request.args.get('fields')))
+    page = evaluation_listing_page(
+        filters,
+        request.args.get('cursor'),
+        parse_page_size(request.args.get('per_page'))
+    )
+    return jsonify({
+        'evaluations': serializer.many(page.items),
+        'filters': filters.to_dict(),
+        'page_size': page.page_size,
+        'next_cursor': page.next_cursor
+    })
+
+@bp.route('/api/stream')
+def api_stream():
+    """
+    Stream every matching evaluation as a JSON array.
+
+    Rows are read from a server-side cursor and written as they arrive, so
+    memory use does not grow with the size of the history. Accepts the
+    filters and fields of api_list.
     """
-    evaluations = Evaluation.query.order_by(Evaluation.evaluation_date.desc()).all()
-    return jsonify([evaluation.to_dict() for evaluation in evaluations])
+    filters = EvaluationFilters.from_request(request.args)
+    serializer = evaluation_row_serializer(parse_fields(request.args.get('fields')))
+
+    def generate():
+        dumps = current_app.json.dumps
+        yield '['
+        separator = ''
+        for row in iter_evaluation_listing(filters):
+            yield separator + dumps(serializer(row))
+            separator = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @bp.route('/api/<int:evaluation_id>')
 def api_get(evaluation_id):
@@ -241,4 +198,30 @@ def api_get(evaluation_id):
     Return JSON data for a specific evaluation
     """
     evaluation = Evaluation.query.get_or_404(evaluation_id)
-    return jsonify(evaluation.to_dict())
+    return jsonify(evaluation.to_dict(parse_fields(request.args.get('fields'))))
+
+@bp.route('/api/import', methods=('POST',))
+@csrf.exempt
+@api_manager_required
+def api_import():
+    """
+    Import many evaluations at once from CSV or JSON.
+
+    Accepts an uploaded ``file`` or the raw request body. The format is taken
+    from the ``format`` argument, the file name or the content type. Invalid
+    rows are reported in the response and do not abort the import. Import
+    scripts authenticate with HTTP Basic credentials of a manager account.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        file_format = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        file_format = request.args.get('format') or detect_format(content_type=request.mimetype)
+
+    if file_format not in IMPORT_FORMATS:
+        return jsonify({'success': False, 'message': 'Format must be csv or json'}), 400
+
+    result = import_evaluations(stream, file_format)
+    return jsonify(result), 200 if result['records_imported'] or result['success'] else 400
@@ -4,18 +4,34 @@ Reports routes for the KPI system
 from datetime import datetime
 import json
 
-from flask import Blueprint, render_template, redirect, url_for, send_file, request, jsonify, Response, abort
+from flask import Blueprint, render_template, redirect, url_for, send_file, request, jsonify, abort
+from flask_login import current_user
 from app.models.employee import Employee
 from app.models.skill import Skill, SkillCategory
 from app.models.tool import Tool, ToolCategory
 from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
-from app.reports.generators import get_report_generator, get_available_report_types
+from app.models.report import SavedReport
+from app.reports.generators import get_available_report_types
+from app.reports.base import parquet_supported
+from app.reports.pdf_renderer import PDFRendererBusy
+from app.reports.jobs import (
+    JOB_DONE, REPORT_FORMATS, fail_expired_report_jobs, generate_report, parse_report_parameters, report_file_name,
+    report_job_expired, submit_report_job
+)
 from app import db
 import io
+import os
 
 # Create blueprint
 bp = Blueprint('reports', __name__, url_prefix='/reports')
 
+@bp.context_processor
+def inject_report_formats():
+    """
+    Let the report forms offer Parquet only when pyarrow is installed
+    """
+    return dict(parquet_available=parquet_supported())
+
 @bp.route('/')
 def index():
     """
@@ -40,61 +56,19 @@ def generate_employee_report():
     Generate an employee performance report
     """
     if request.method == 'POST':
-        employee_id = request.form.get('employee_id')
-        start_date = request.form.get('start_date')
-        end_date = request.form.get('end_date')
         format_type = request.form.get('format', 'pdf')
         
-        if not employee_id:
-            return jsonify({'error': 'Employee ID is required'}), 400
-            
-        # Initialize the report generator
         try:
-            report_generator = get_report_generator('employee')
+            parameters = parse_report_parameters('employee', request.form)
+            
+            employee = db.session.get(Employee, parameters['employee_id'])
+            employee_name = employee.name.lower().replace(' ', '_') if employee else parameters['employee_id']
+            filename = f"employee_performance_{employee_name}_{datetime.now().strftime('%Y%m%d')}"
             
-            # Collect the data for this report
-            report_generator.collect_data(
-                employee_id=int(employee_id),
-                start_date=start_date,
-                end_date=end_date
-            )
+            return _send_report('employee', parameters, format_type, filename)
             
-            # Generate the report in the requested format
-            if format_type == 'pdf':
-                pdf_data = report_generator.generate_pdf('employee_performance.html')
-                
-                # Create a response with the PDF data
-                employee = Employee.query.get(employee_id)
-                filename = f"employee_performance_{employee.last_name}_{datetime.now().strftime('%Y%m%d')}.pdf"
-                
-                return Response(
-                    pdf_data,
-                    mimetype='application/pdf',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/pdf'
-                    }
-                )
-                
-            elif format_type == 'excel':
-                excel_data = report_generator.generate_excel()
-                
-                # Create a response with the Excel data
-                employee = Employee.query.get(employee_id)
-                filename = f"employee_performance_{employee.last_name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-                
-                return Response(
-                    excel_data,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                    }
-                )
-                
-            else:
-                return jsonify({'error': f'Unsupported format: {format_type}'}), 400
-                
+        except PDFRendererBusy as e:
+            return jsonify({'error': str(e)}), 503
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
@@ -110,63 +84,18 @@ def generate_team_report():
     Generate a team performance report
     """
     if request.method == 'POST':
-        tier = request.form.get('tier')
-        start_date = request.form.get('start_date')
-        end_date = request.form.get('end_date')
         format_type = request.form.get('format', 'pdf')
-        employee_ids = request.form.getlist('employee_ids')
         
-        if employee_ids:
-            employee_ids = [int(id) for id in employee_ids]
-        
-        # Initialize the report generator
         try:
-            report_generator = get_report_generator('team')
+            parameters = parse_report_parameters('team', request.form)
+            
+            timestamp = datetime.now().strftime('%Y%m%d')
+            filename = f"team_performance_{parameters.get('tier') or 'all_tiers'}_{timestamp}"
             
-            # Collect the data for this report
-            report_generator.collect_data(
-                tier=tier if tier else None,
-                start_date=start_date,
-                end_date=end_date,
-                employee_ids=employee_ids if employee_ids else None
-            )
+            return _send_report('team', parameters, format_type, filename)
             
-            # Generate the report in the requested format
-            if format_type == 'pdf':
-                pdf_data = report_generator.generate_pdf('team_performance.html')
-                
-                # Create a response with the PDF data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                filename = f"team_performance_{tier or 'all_tiers'}_{timestamp}.pdf"
-                
-                return Response(
-                    pdf_data,
-                    mimetype='application/pdf',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/pdf'
-                    }
-                )
-                
-            elif format_type == 'excel':
-                excel_data = report_generator.generate_excel()
-                
-                # Create a response with the Excel data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                filename = f"team_performance_{tier or 'all_tiers'}_{timestamp}.xlsx"
-                
-                return Response(
-                    excel_data,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                    }
-                )
-                
-            else:
-                return jsonify({'error': f'Unsupported format: {format_type}'}), 400
-                
+        except PDFRendererBusy as e:
+            return jsonify({'error': str(e)}), 503
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
@@ -183,75 +112,24 @@ def generate_skills_report():
     Generate a skills analysis report
     """
     if request.method == 'POST':
-        category_id = request.form.get('category_id')
-        tier = request.form.get('tier')
-        start_date = request.form.get('start_date')
-        end_date = request.form.get('end_date')
         format_type = request.form.get('format', 'pdf')
         
-        if category_id:
-            category_id = int(category_id)
-        
-        # Initialize the report generator
         try:
-            report_generator = get_report_generator('skills')
+            parameters = parse_report_parameters('skills', request.form)
+            
+            timestamp = datetime.now().strftime('%Y%m%d')
+            category_name = 'all_categories'
+            if parameters.get('category_id'):
+                category = db.session.get(SkillCategory, parameters['category_id'])
+                if category:
+                    category_name = category.name.lower().replace(' ', '_')
+                    
+            filename = f"skills_analysis_{category_name}_{timestamp}"
             
-            # Collect the data for this report
-            report_generator.collect_data(
-                category_id=category_id,
-                tier=tier if tier else None,
-                start_date=start_date,
-                end_date=end_date
-            )
+            return _send_report('skills', parameters, format_type, filename)
             
-            # Generate the report in the requested format
-            if format_type == 'pdf':
-                pdf_data = report_generator.generate_pdf('skills_analysis.html')
-                
-                # Create a response with the PDF data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                category_name = 'all_categories'
-                if category_id:
-                    category = SkillCategory.query.get(category_id)
-                    if category:
-                        category_name = category.name.lower().replace(' ', '_')
-                        
-                filename = f"skills_analysis_{category_name}_{timestamp}.pdf"
-                
-                return Response(
-                    pdf_data,
-                    mimetype='application/pdf',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/pdf'
-                    }
-                )
-                
-            elif format_type == 'excel':
-                excel_data = report_generator.generate_excel()
-                
-                # Create a response with the Excel data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                category_name = 'all_categories'
-                if category_id:
-                    category = SkillCategory.query.get(category_id)
-                    if category:
-                        category_name = category.name.lower().replace(' ', '_')
-                        
-                filename = f"skills_analysis_{category_name}_{timestamp}.xlsx"
-                
-                return Response(
-                    excel_data,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                    }
-                )
-                
-            else:
-                return jsonify({'error': f'Unsupported format: {format_type}'}), 400
-                
+        except PDFRendererBusy as e:
+            return jsonify({'error': str(e)}), 503
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
@@ -269,75 +147,24 @@ def generate_tools_report():
     Generate a tool inventory report
     """
     if request.method == 'POST':
-        category_id = request.form.get('category_id')
-        tier = request.form.get('tier')
-        start_date = request.form.get('start_date')
-        end_date = request.form.get('end_date')
         format_type = request.form.get('format', 'pdf')
         
-        if category_id:
-            category_id = int(category_id)
-        
-        # Initialize the report generator
         try:
-            report_generator = get_report_generator('tools')
+            parameters = parse_report_parameters('tools', request.form)
+            
+            timestamp = datetime.now().strftime('%Y%m%d')
+            category_name = 'all_categories'
+            if parameters.get('category_id'):
+                category = db.session.get(ToolCategory, parameters['category_id'])
+                if category:
+                    category_name = category.name.lower().replace(' ', '_')
+                    
+            filename = f"tool_inventory_{category_name}_{timestamp}"
             
-            # Collect the data for this report
-            report_generator.collect_data(
-                category_id=category_id,
-                tier=tier if tier else None,
-                start_date=start_date,
-                end_date=end_date
-            )
+            return _send_report('tools', parameters, format_type, filename)
             
-            # Generate the report in the requested format
-            if format_type == 'pdf':
-                pdf_data = report_generator.generate_pdf('tool_inventory.html')
-                
-                # Create a response with the PDF data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                category_name = 'all_categories'
-                if category_id:
-                    category = ToolCategory.query.get(category_id)
-                    if category:
-                        category_name = category.name.lower().replace(' ', '_')
-                        
-                filename = f"tool_inventory_{category_name}_{timestamp}.pdf"
-                
-                return Response(
-                    pdf_data,
-                    mimetype='application/pdf',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/pdf'
-                    }
-                )
-                
-            elif format_type == 'excel':
-                excel_data = report_generator.generate_excel()
-                
-                # Create a response with the Excel data
-                timestamp = datetime.now().strftime('%Y%m%d')
-                category_name = 'all_categories'
-                if category_id:
-                    category = ToolCategory.query.get(category_id)
-                    if category:
-                        category_name = category.name.lower().replace(' ', '_')
-                        
-                filename = f"tool_inventory_{category_name}_{timestamp}.xlsx"
-                
-                return Response(
-                    excel_data,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{filename}"',
-                        'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                    }
-                )
-                
-            else:
-                return jsonify({'error': f'Unsupported format: {format_type}'}), 400
-                
+        except PDFRendererBusy as e:
+            return jsonify({'error': str(e)}), 503
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
@@ -349,6 +176,100 @@ def generate_tools_report():
     tiers = sorted(set(e.tier for e in employees))
     return render_template('reports/tools_report_form.html', tool_categories=tool_categories, tiers=tiers)
 
+def _send_report(report_type, parameters, format_type, filename):
+    """
+    Send a report as an attachment.
+
+    The file comes from the report cache when the same report was generated
+    since the last data change, and its cache key is sent as a strong ETag
+    (the same report always has the same ETag and bytes).
+    """
+    if format_type not in REPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {format_type}'}), 400
+
+    artifact = generate_report(report_type, parameters, format_type)
+    extension, mimetype = REPORT_FORMATS[format_type]
+    # Streamed from disk in chunks, never loaded into memory as a whole
+    response = send_file(
+        artifact.path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f'{filename}.{extension}',
+        etag=False if artifact.temporary else artifact.key,
+        conditional=True
+    )
+    if artifact.temporary:
+        # Close callbacks are skipped for passthrough file responses; the
+        # file is still sent in chunks
+        response.direct_passthrough = False
+        response.call_on_close(artifact.discard)
+    return response
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a report for background generation.
+
+    Accepts a form or JSON body with ``report_type`` (employee, team,
+    skills, tools), ``format`` (pdf, excel, csv, parquet) and the parameters of the
+    report's form. Returns 202 with the job id and its status URL.
+    """
+    values = request.get_json(silent=True) if request.is_json else request.form
+    values = values or {}
+    report_type = values.get('report_type')
+    format_type = values.get('format', 'pdf')
+
+    try:
+        parameters = parse_report_parameters(report_type, values)
+        user_id = current_user.get_id() if current_user and current_user.is_authenticated else None
+        report = submit_report_job(report_type, parameters, format_type, int(user_id) if user_id else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(_job_status(report)), 202
+
+@bp.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """
+    Return the status of a report job
+    """
+    report = db.session.get(SavedReport, job_id)
+    if report is None or report.status is None:
+        abort(404)
+    if report_job_expired(report):
+        fail_expired_report_jobs(report.id)
+        db.session.refresh(report)
+    return jsonify(_job_status(report))
+
+@bp.route('/jobs/<int:job_id>/download')
+def download_job(job_id):
+    """
+    Download the file of a finished report job
+    """
+    report = db.session.get(SavedReport, job_id)
+    if report is None or report.status is None:
+        abort(404)
+    if report.status != JOB_DONE:
+        return jsonify({'error': f'Report is {report.status}', **_job_status(report)}), 409
+    if not report.file_path or not os.path.exists(report.file_path):
+        abort(404)
+
+    extension, mimetype = REPORT_FORMATS[report.file_format]
+    return send_file(
+        report.file_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=report_file_name(report.report_type, report.file_format, report.completed_at)
+    )
+
+def _job_status(report):
+    status = report.to_dict()
+    status['job_id'] = report.id
+    status['status_url'] = url_for('reports.job_status', job_id=report.id)
+    if report.status == JOB_DONE:
+        status['download_url'] = url_for('reports.download_job', job_id=report.id)
+    return status
+
 @bp.route('/report_options/<report_type>')
 def report_options(report_type):
     """
@@ -412,6 +412,8 @@ def get_system_logs(log_type='application', page=1, per_page=100):
             log_file = os.path.join(log_dir, 'access.log')
         elif log_type == 'error':
             log_file = os.path.join(log_dir, 'error.log')
+        elif log_type == 'slow_queries':
+            log_file = os.path.join(log_dir, 'slow_queries.log')
         else:
             log_file = os.path.join(log_dir, 'app.log')
         
@@ -0,0 +1,65 @@
+"""
+Audit log writer.
+
+The audit_log table is created by migration v1.4.0 and has no ORM model, so
+entries are written with a lightweight table construct inside the caller's
+session. Databases that have not been migrated yet are skipped silently.
+"""
+import json
+
+from flask import current_app, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import column, insert, inspect, table
+
+from app import db
+
+audit_log = table(
+    'audit_log',
+    column('user_id'),
+    column('action'),
+    column('table_name'),
+    column('record_id'),
+    column('details'),
+    column('ip_address')
+)
+
+
+def audit_log_available():
+    """
+    Return True if the database has the audit_log table (checked once per app)
+    """
+    available = current_app.extensions.get('kpi_audit_log')
+    if available is None:
+        available = inspect(db.engine).has_table('audit_log')
+        current_app.extensions['kpi_audit_log'] = available
+    return available
+
+
+def log_audit_event(action, table_name, record_id=None, details=None):
+    """
+    Add an audit_log entry to the current transaction
+
+    Args:
+        action (str): CREATE, UPDATE, DELETE, ...
+        table_name (str): Table of the changed record
+        record_id (int): Primary key of the changed record
+        details (dict): JSON-serializable description of the change
+    """
+    if not audit_log_available():
+        return
+
+    user_id = None
+    ip_address = None
+    if has_request_context():
+        ip_address = request.remote_addr
+        if current_user and current_user.is_authenticated:
+            user_id = current_user.get_id()
+
+    db.session.execute(insert(audit_log).values(
+        user_id=user_id,
+        action=action,
+        table_name=table_name,
+        record_id=record_id,
+        details=json.dumps(details, default=str) if details is not None else None,
+        ip_address=ip_address
+    ))
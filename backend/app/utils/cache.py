@@ -0,0 +1,412 @@
+"""
+Result cache for the KPI system.
+
+Cached values are keyed by a namespace, a caller supplied key (for example a
+normalized filter tuple) and the current data version. Writes to evaluations
+and employees bump the data version, which makes every older entry
+unreachable; stale entries then age out of the LRU.
+
+Version counters are kept in the application database when it has the
+data_versions table (migration v1.13.0), so a write handled by one
+Waitress/Gunicorn worker process invalidates the results of all of them. An
+optional sqlite-backed shared tier (KPI_CACHE_SHARED_PATH) lets the workers
+also share warm entries (and holds the counters of databases without
+data_versions). Otherwise the counters are local to each process.
+"""
+import hashlib
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import column, func, inspect, select, table, text
+
+from app import db
+
+data_versions = table(
+    'data_versions',
+    column('name'),
+    column('version')
+)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry time to live"""
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheTier:
+    """Cache tier stored in a sqlite file shared by all worker processes"""
+
+    def __init__(self, path, ttl=300, max_entries=1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            ''')
+            # Random id of this cache file, so counters restarting from zero
+            # in a recreated file never repeat an old version stamp
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('epoch', ?)",
+                (secrets.randbits(48),)
+            )
+        self.epoch = self.get_version('epoch')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?',
+                (key, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        """Store a value and prune expired or excess entries"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + self.ttl)
+            )
+            conn.execute('DELETE FROM cache_entries WHERE expires_at < ?', (now,))
+            conn.execute('''
+                DELETE FROM cache_entries WHERE key NOT IN (
+                    SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT ?
+                )
+            ''', (self.max_entries,))
+
+    def get_version(self, name):
+        """Return the shared version counter for a name"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT version FROM cache_versions WHERE name = ?', (name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_versions(self, prefix):
+        """Return {name: version} of the shared counters whose name starts with prefix"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, version FROM cache_versions WHERE substr(name, 1, ?) = ?",
+                (len(prefix), prefix)
+            ).fetchall()
+        return dict(rows)
+
+    def bump_version(self, name):
+        """Increment the shared version counter for a name"""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO cache_versions (name, version) VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET version = version + 1
+            ''', (name,))
+
+    def clear(self):
+        """Remove every entry"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache_entries')
+
+
+class DatabaseVersionStore:
+    """
+    Version counters in the application database's data_versions table.
+
+    Bumps run in their own short transaction on a separate connection, so
+    they can be issued right after (or from a hook of) the commit of the
+    write they announce.
+    """
+
+    def __init__(self):
+        self._available = None
+        self._epoch = None
+
+    def available(self):
+        """Return True if the database has the data_versions table (checked once)"""
+        if self._available is None:
+            self._available = inspect(db.engine).has_table('data_versions')
+        return self._available
+
+    @property
+    def epoch(self):
+        if self._epoch is None:
+            self._epoch = self.get_version('epoch')
+        return self._epoch
+
+    def get_version(self, name):
+        """Return the version counter for a name"""
+        with db.engine.connect() as conn:
+            version = conn.execute(
+                select(data_versions.c.version).where(data_versions.c.name == name)
+            ).scalar()
+        return version or 0
+
+    def get_versions(self, prefix):
+        """Return {name: version} of the counters whose name starts with prefix"""
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(data_versions.c.name, data_versions.c.version).where(
+                    func.substr(data_versions.c.name, 1, len(prefix)) == prefix
+                )
+            ).all()
+        return dict(rows)
+
+    def bump_version(self, name):
+        """Increment the version counter for a name"""
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                'INSERT INTO data_versions (name, version) VALUES (:name, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1'
+            ), {'name': name})
+
+
+class ResultCache:
+    """Two-tier (process local + optional shared) result cache"""
+
+    def __init__(self, max_entries=256, ttl=300, shared=None, database=None):
+        self.local = LRUCache(max_entries, ttl)
+        self.shared = shared
+        self.database = database
+        # Version counters of a process-local cache start from zero on every
+        # start, so stamps handed out to persistent caches carry a random epoch
+        self._local_epoch = secrets.randbits(48)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _version_store(self):
+        """
+        Return where version counters are kept: the database, the shared
+        tier or (None) this process
+        """
+        if self.database is not None and has_app_context() and self.database.available():
+            return self.database
+        return self.shared
+
+    @property
+    def versions_shared(self):
+        """True if every worker process sees the version bumps of the others"""
+        return self._version_store() is not None
+
+    @property
+    def epoch(self):
+        store = self._version_store()
+        return store.epoch if store is not None else self._local_epoch
+
+    def get_version(self, name='data'):
+        """
+        Return the current version counter for a name.
+
+        Shared counters are read once per request, so every cache key and
+        snapshot used by a request (for example the employee comparison and
+        the skill state matrix it is built from) agree on one version.
+        """
+        store = self._version_store()
+        if store is None:
+            return self._versions.get(name, 0)
+        if not has_app_context():
+            return store.get_version(name)
+
+        versions = g.setdefault('kpi_versions', {})
+        if name not in versions:
+            versions[name] = store.get_version(name)
+        return versions[name]
+
+    def get_versions(self, prefix):
+        """
+        Return {name: version} of every counter whose name starts with prefix
+        (for example the per-employee counters)
+        """
+        store = self._version_store()
+        if store is None:
+            with self._lock:
+                return {name: version for name, version in self._versions.items() if name.startswith(prefix)}
+        return store.get_versions(prefix)
+
+    def bump_version(self, name='data'):
+        """Invalidate every entry computed against the given version"""
+        store = self._version_store()
+        if store is None:
+            with self._lock:
+                self._versions[name] = self._versions.get(name, 0) + 1
+            return
+
+        store.bump_version(name)
+        if has_app_context():
+            g.get('kpi_versions', {}).pop(name, None)
+
+    def version_stamp(self, name='data'):
+        """
+        Return a version identifier that is unique across restarts (for
+        caches that outlive the process, such as generated report files)
+        """
+        return f'{self.epoch:x}.{self.get_version(name)}'
+
+    def get_or_compute(self, namespace, key, compute, version='data'):
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Args:
+            namespace (str): Cache namespace (e.g. 'dashboard')
+            key (tuple): Hashable, normalized key for the cached value
+            compute (callable): Function returning the value on a cache miss
+            version (str): Name of the version counter the value depends on
+
+        Returns:
+            object: The cached or freshly computed value
+        """
+        full_key = (namespace, self.get_version(version), key)
+
+        found, value = self.local.get(full_key)
+        if found:
+            return value
+
+        if self.shared is not None:
+            shared_key = hashlib.sha256(repr(full_key).encode('utf-8')).hexdigest()
+            found, value = self.shared.get(shared_key)
+            if found:
+                self.local.set(full_key, value)
+                return value
+
+        value = compute()
+
+        self.local.set(full_key, value)
+        if self.shared is not None:
+            self.shared.set(shared_key, value)
+
+        return value
+
+    def clear(self):
+        """Remove every cached entry"""
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def init_cache(app):
+    """
+    Create the result cache for an application from its configuration
+    """
+    shared = None
+    if app.config.get('KPI_CACHE_SHARED_PATH'):
+        shared = SqliteCacheTier(
+            app.config['KPI_CACHE_SHARED_PATH'],
+            ttl=app.config.get('KPI_CACHE_TTL', 300),
+            max_entries=app.config.get('KPI_CACHE_MAX_ENTRIES', 256) * 4
+        )
+
+    app.extensions['kpi_cache'] = ResultCache(
+        max_entries=app.config.get('KPI_CACHE_MAX_ENTRIES', 256),
+        ttl=app.config.get('KPI_CACHE_TTL', 300),
+        shared=shared,
+        database=DatabaseVersionStore() if 'sqlalchemy' in app.extensions else None
+    )
+    return app.extensions['kpi_cache']
+
+
+def get_cache():
+    """
+    Return the result cache of the current application
+    """
+    cache = current_app.extensions.get('kpi_cache')
+    if cache is None:
+        cache = init_cache(current_app)
+    return cache
+
+
+def cached(namespace, key, compute, version='data'):
+    """
+    Return a cached value for the current application, honouring KPI_CACHE_ENABLED
+    """
+    if not current_app.config.get('KPI_CACHE_ENABLED', True):
+        return compute()
+    return get_cache().get_or_compute(namespace, key, compute, version)
+
+
+def get_data_version():
+    """
+    Return the current data version (changes on every evaluation/employee write)
+    """
+    return get_cache().get_version('data')
+
+
+def bump_data_version():
+    """
+    Invalidate cached results after evaluations or employees change
+    """
+    get_cache().bump_version('data')
+
+
+def data_etag(*parts):
+    """
+    Build an ETag from the current data version stamp and request specific
+    parts (for example a filter cache key).
+
+    Returns None when the data version is local to this process: a write
+    handled by another worker would not change it, so callers have to hash
+    the response body instead.
+    """
+    cache = get_cache()
+    if not cache.versions_shared:
+        return None
+    payload = repr((cache.version_stamp('data'),) + parts).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
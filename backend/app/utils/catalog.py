@@ -0,0 +1,202 @@
+"""
+In-memory catalog of the skill and tool taxonomy.
+
+Skill categories, skills, tool categories and tools rarely change, so each
+worker keeps an immutable snapshot of them with id -> entry maps and ordered
+category -> children tuples. The snapshot is reloaded when the catalog
+version is bumped, which happens automatically whenever a session commits
+changes to one of the taxonomy models. Without a shared cache tier that
+bump is only seen by the worker that made the change, so snapshots are also
+reloaded once they are older than KPI_CATALOG_TTL seconds, and the
+evaluation write path always reads a fresh snapshot.
+"""
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.skill import Skill, SkillCategory
+from app.models.tool import Tool, ToolCategory
+from app.utils.cache import get_cache
+
+# Tables whose contents are held in the catalog
+CATALOG_TABLES = ('skill_categories', 'skills', 'tool_categories', 'tools')
+
+_session_hooks_installed = False
+_load_lock = threading.Lock()
+
+
+class SkillCategoryEntry(namedtuple('SkillCategoryEntry', 'category_id name description display_order skills')):
+    """Read-only skill category with its ordered skills"""
+    __slots__ = ()
+
+
+class ToolCategoryEntry(namedtuple('ToolCategoryEntry', 'category_id name description display_order tools')):
+    """Read-only tool category with its ordered tools"""
+    __slots__ = ()
+
+
+class SkillEntry(namedtuple('SkillEntry', 'skill_id category_id name description display_order')):
+    """Read-only skill"""
+    __slots__ = ()
+
+    @property
+    def category(self):
+        return get_catalog().skill_categories_by_id.get(self.category_id)
+
+
+class ToolEntry(namedtuple('ToolEntry', 'tool_id category_id name description display_order')):
+    """Read-only tool"""
+    __slots__ = ()
+
+    @property
+    def category(self):
+        return get_catalog().tool_categories_by_id.get(self.category_id)
+
+
+class Catalog:
+    """
+    Immutable snapshot of the skill/tool taxonomy for one catalog version
+    """
+
+    def __init__(self, version, skill_categories, skills, tool_categories, tools):
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        self.skills = tuple(sorted(skills, key=_display_key('skill_id')))
+        self.skills_by_id = MappingProxyType({skill.skill_id: skill for skill in self.skills})
+        self.skill_categories = tuple(
+            SkillCategoryEntry(
+                category.category_id, category.name, category.description, category.display_order,
+                tuple(skill for skill in self.skills if skill.category_id == category.category_id)
+            )
+            for category in sorted(skill_categories, key=_display_key('category_id'))
+        )
+        self.skill_categories_by_id = MappingProxyType(
+            {category.category_id: category for category in self.skill_categories}
+        )
+
+        self.tools = tuple(sorted(tools, key=_display_key('tool_id')))
+        self.tools_by_id = MappingProxyType({tool.tool_id: tool for tool in self.tools})
+        self.tool_categories = tuple(
+            ToolCategoryEntry(
+                category.category_id, category.name, category.description, category.display_order,
+                tuple(tool for tool in self.tools if tool.category_id == category.category_id)
+            )
+            for category in sorted(tool_categories, key=_display_key('category_id'))
+        )
+        self.tool_categories_by_id = MappingProxyType(
+            {category.category_id: category for category in self.tool_categories}
+        )
+
+    @classmethod
+    def load(cls, version):
+        """
+        Load the taxonomy from the database (four queries)
+        """
+        return cls(
+            version,
+            SkillCategory.query.with_entities(
+                SkillCategory.category_id, SkillCategory.name, SkillCategory.description, SkillCategory.display_order
+            ).all(),
+            [SkillEntry(*row) for row in Skill.query.with_entities(
+                Skill.skill_id, Skill.category_id, Skill.name, Skill.description, Skill.display_order
+            ).all()],
+            ToolCategory.query.with_entities(
+                ToolCategory.category_id, ToolCategory.name, ToolCategory.description, ToolCategory.display_order
+            ).all(),
+            [ToolEntry(*row) for row in Tool.query.with_entities(
+                Tool.tool_id, Tool.category_id, Tool.name, Tool.description, Tool.display_order
+            ).all()]
+        )
+
+
+def _display_key(id_attribute):
+    """
+    Sort by display order (unset last), then by id
+    """
+    def key(entry):
+        return (entry.display_order is None, entry.display_order or 0, getattr(entry, id_attribute))
+    return key
+
+
+def get_catalog(fresh=False):
+    """
+    Return the taxonomy catalog of the current application.
+
+    The catalog version is checked once per request; the snapshot is only
+    reloaded from the database when the version changed or the snapshot is
+    older than KPI_CATALOG_TTL.
+
+    Args:
+        fresh (bool): Reload the snapshot regardless (for writes that must
+            see taxonomy changes made by other workers)
+    """
+    if 'kpi_catalog' in g and not fresh:
+        return g.kpi_catalog
+
+    version = get_cache().get_version('catalog')
+    ttl = current_app.config.get('KPI_CATALOG_TTL', 60)
+
+    def stale(catalog):
+        return (
+            fresh or catalog is None or catalog.version != version
+            or (ttl is not None and time.monotonic() - catalog.loaded_at > ttl)
+        )
+
+    catalog = current_app.extensions.get('kpi_catalog')
+    if stale(catalog):
+        with _load_lock:
+            catalog = current_app.extensions.get('kpi_catalog')
+            if stale(catalog):
+                catalog = Catalog.load(version)
+                current_app.extensions['kpi_catalog'] = catalog
+
+    g.kpi_catalog = catalog
+    return catalog
+
+
+def bump_catalog_version():
+    """
+    Invalidate the catalog (and cached results that list categories) after
+    the taxonomy changed
+    """
+    cache = get_cache()
+    cache.bump_version('catalog')
+    cache.bump_version('data')
+    g.pop('kpi_catalog', None)
+
+
+def init_catalog(app):
+    """
+    Bump the catalog version whenever a session commits taxonomy changes
+    """
+    global _session_hooks_installed
+    if _session_hooks_installed:
+        return
+
+    event.listen(Session, 'after_flush', _track_taxonomy_changes)
+    event.listen(Session, 'after_commit', _bump_after_commit)
+    event.listen(Session, 'after_rollback', _clear_taxonomy_changes)
+    _session_hooks_installed = True
+
+
+def _track_taxonomy_changes(session, flush_context):
+    taxonomy_models = (SkillCategory, Skill, ToolCategory, Tool)
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, taxonomy_models):
+            session.info['kpi_catalog_changed'] = True
+            return
+
+
+def _bump_after_commit(session):
+    if session.info.pop('kpi_catalog_changed', False) and has_app_context():
+        bump_catalog_version()
+
+
+def _clear_taxonomy_changes(session):
+    session.info.pop('kpi_catalog_changed', None)
@@ -5,6 +5,9 @@ import csv
 import shutil
 from flask import current_app
 
+from app.utils.cache import bump_data_version
+from app.utils.catalog import CATALOG_TABLES, bump_catalog_version
+
 def optimize_database():
     """Optimize the SQLite database by running VACUUM and ANALYZE commands"""
     try:
@@ -338,6 +341,11 @@ def import_csv_data(table_name, csv_file_path, truncate=False):
         conn.commit()
         conn.close()
         
+        # Cached results (and the taxonomy catalog) may be stale now
+        bump_data_version()
+        if table_name in CATALOG_TABLES:
+            bump_catalog_version()
+        
         return {
             'success': True,
             'message': f"Successfully imported {records_imported} records into table '{table_name}'",
@@ -0,0 +1,198 @@
+"""
+Side-by-side comparison of several employees.
+
+Every metric is computed for the whole group at once: historical category
+averages and tool proficiency with one grouped query each, latest ratings
+and current category averages from the shared skill state matrix. The
+result is a compact matrix (one row per employee, one column per category,
+tool category or skill) so comparing a crew of twenty costs about the same
+as viewing one employee.
+"""
+import numpy as np
+from sqlalchemy import func
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
+from app.models.rollup import SkillRatingRollup
+from app.models.skill import Skill
+from app.utils.cache import cached
+from app.utils.catalog import get_catalog
+from app.utils.kpi_stats import rollups_enabled
+from app.utils.skill_state import get_skill_state
+
+# Largest group that can be compared in one request
+MAX_COMPARE_EMPLOYEES = 50
+
+# Decimal places of averages in the result
+COMPARE_PRECISION = 2
+
+
+def parse_employee_ids(values):
+    """
+    Parse employee ids from request values ("1,2,3" and/or repeated values)
+
+    Returns:
+        list: Unique ids in the order given
+
+    Raises:
+        ValueError: If a value is not an integer
+    """
+    employee_ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                employee_ids.append(int(part))
+            except ValueError:
+                raise ValueError(f"Invalid employee id '{part}'")
+    return list(dict.fromkeys(employee_ids))
+
+
+def compare_employees(employee_ids):
+    """
+    Return the (cached) comparison matrix of a group of employees.
+
+    Cached under the data version like the skill state matrix it reads, so
+    a write in any worker invalidates both.
+    """
+    employee_ids = tuple(employee_ids)
+    return cached('employee.compare', employee_ids, lambda: build_comparison(employee_ids))
+
+
+def build_comparison(employee_ids):
+    """
+    Build the comparison matrix of a group of employees.
+
+    Rows of every matrix follow ``employees``; columns follow
+    ``skill_categories``, ``tool_categories`` or ``skills``. Missing values
+    (nothing rated in a category, skill never rated) are None.
+
+    Returns:
+        dict: employees, missing (unknown ids), skill_categories,
+            category_averages, current_category_averages, tool_categories,
+            tool_counts, tool_proficiency, skills and latest_ratings
+    """
+    catalog = get_catalog()
+    skill_categories = catalog.skill_categories
+    tool_categories = catalog.tool_categories
+    skills = [skill for category in skill_categories for skill in category.skills]
+
+    rows = db.session.query(
+        Employee.employee_id,
+        Employee.name,
+        Employee.tier,
+        Employee.active
+    ).filter(Employee.employee_id.in_(employee_ids)).all()
+    found = {row.employee_id: row for row in rows}
+    employees = [found[employee_id] for employee_id in employee_ids if employee_id in found]
+    ids = [employee.employee_id for employee in employees]
+
+    skill_state = get_skill_state()
+    tool_counts, tool_proficiency = _tool_matrix(ids, tool_categories, len(catalog.tools))
+
+    return {
+        'employees': [
+            {'employee_id': employee.employee_id, 'name': employee.name,
+             'tier': employee.tier, 'active': employee.active}
+            for employee in employees
+        ],
+        'missing': [employee_id for employee_id in employee_ids if employee_id not in found],
+        'skill_categories': [
+            {'category_id': category.category_id, 'name': category.name} for category in skill_categories
+        ],
+        'category_averages': _to_lists(_category_average_matrix(ids, skill_categories)),
+        'current_category_averages': _to_lists(skill_state.category_averages(ids, skill_categories)),
+        'tool_categories': [
+            {'category_id': category.category_id, 'name': category.name, 'tool_count': len(category.tools)}
+            for category in tool_categories
+        ],
+        'tool_counts': tool_counts.tolist(),
+        'tool_proficiency': _to_lists(tool_proficiency),
+        'skills': [
+            {'skill_id': skill.skill_id, 'name': skill.name, 'category_id': skill.category_id} for skill in skills
+        ],
+        'latest_ratings': _to_lists(skill_state.ratings_for(ids, [skill.skill_id for skill in skills]), digits=0)
+    }
+
+
+def _category_average_matrix(employee_ids, skill_categories):
+    """
+    Average rating over all evaluations per employee and skill category
+    (one grouped query, from the rollup tables when they are enabled)
+    """
+    if rollups_enabled():
+        query = db.session.query(
+            SkillRatingRollup.employee_id,
+            SkillRatingRollup.category_id,
+            func.sum(SkillRatingRollup.rating_sum),
+            func.sum(SkillRatingRollup.rating_count)
+        ).filter(
+            SkillRatingRollup.employee_id.in_(employee_ids)
+        ).group_by(SkillRatingRollup.employee_id, SkillRatingRollup.category_id)
+    else:
+        query = db.session.query(
+            Evaluation.employee_id,
+            Skill.category_id,
+            func.sum(SkillEvaluation.rating),
+            func.count(SkillEvaluation.rating)
+        ).join(
+            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+        ).join(
+            Skill, SkillEvaluation.skill_id == Skill.skill_id
+        ).filter(
+            Evaluation.employee_id.in_(employee_ids)
+        ).group_by(Evaluation.employee_id, Skill.category_id)
+
+    rows = {employee_id: position for position, employee_id in enumerate(employee_ids)}
+    columns = {category.category_id: position for position, category in enumerate(skill_categories)}
+    averages = np.full((len(employee_ids), len(columns)), np.nan)
+    for employee_id, category_id, rating_sum, rating_count in query.all():
+        if rating_count and category_id in columns:
+            averages[rows[employee_id], columns[category_id]] = (rating_sum or 0) / rating_count
+    return averages
+
+
+def _tool_matrix(employee_ids, tool_categories, total_tools):
+    """
+    Count the tools each employee can operate per tool category (one grouped
+    query) and derive the overall tool proficiency percentage
+    """
+    query = db.session.query(
+        Evaluation.employee_id,
+        ToolEvaluation.tool_id
+    ).join(
+        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id.in_(employee_ids),
+        ToolEvaluation.can_operate == True
+    ).group_by(Evaluation.employee_id, ToolEvaluation.tool_id)
+
+    rows = {employee_id: position for position, employee_id in enumerate(employee_ids)}
+    tool_columns = {
+        tool.tool_id: position
+        for position, category in enumerate(tool_categories) for tool in category.tools
+    }
+    counts = np.zeros((len(employee_ids), len(tool_categories)), dtype=np.int64)
+    operated = np.zeros(len(employee_ids), dtype=np.int64)
+    for employee_id, tool_id in query.all():
+        operated[rows[employee_id]] += 1
+        if tool_id in tool_columns:
+            counts[rows[employee_id], tool_columns[tool_id]] += 1
+
+    proficiency = operated / total_tools * 100 if total_tools else np.zeros(len(employee_ids))
+    return counts, proficiency
+
+
+def _to_lists(matrix, digits=COMPARE_PRECISION):
+    """
+    Convert a float array to (nested) lists of rounded values with NaN as None
+    """
+    if matrix.ndim > 1:
+        return [_to_lists(row, digits) for row in matrix]
+    return [
+        None if np.isnan(value) else (int(value) if digits == 0 else round(value, digits))
+        for value in matrix.astype(np.float64).tolist()
+    ]
@@ -0,0 +1,193 @@
+"""
+Employee search and listing.
+
+Search uses an SQLite FTS5 index over employee names and phone numbers, so
+prefix and multi-word searches ("jo smi", "555-12") are index lookups rather
+than LIKE scans over the whole table. The index is a regular FTS5 table
+keyed by employee_id and kept in sync by triggers on the employees table;
+phone numbers are indexed both as written and as bare digits. When the index
+has not been created yet, search falls back to LIKE.
+
+The listing is paged with a keyset cursor on (sort column, employee_id).
+"""
+import re
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import case, column, func, select, text
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation
+from app.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, keyset_paginate
+
+SEARCH_TABLE = 'employees_fts'
+
+# Tiers from junior to senior (sorting by tier follows this order)
+EMPLOYEE_TIERS = (
+    "Apprentice",
+    "Handyman",
+    "Craftsman",
+    "Master Craftsman",
+    "Lead Craftsman"
+)
+
+# Characters removed from phone numbers for the digits-only index column
+_PHONE_PUNCTUATION = ('-', ' ', '(', ')', '.', '+', '/')
+
+
+def _phone_digits_sql(phone_column):
+    expression = f"coalesce({phone_column}, '')"
+    for character in _PHONE_PUNCTUATION:
+        expression = f"replace({expression}, '{character}', '')"
+    return expression
+
+
+SEARCH_INDEX_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+    USING fts5(name, phone, tokenize = 'unicode61', prefix = '2 3')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_insert AFTER INSERT ON employees BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, phone)
+        VALUES (new.employee_id, new.name, coalesce(new.phone, '') || ' ' || {_phone_digits_sql('new.phone')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_delete AFTER DELETE ON employees BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.employee_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS employees_fts_update AFTER UPDATE OF name, phone ON employees BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.employee_id;
+        INSERT INTO {SEARCH_TABLE}(rowid, name, phone)
+        VALUES (new.employee_id, new.name, coalesce(new.phone, '') || ' ' || {_phone_digits_sql('new.phone')});
+    END
+    """
+)
+
+SEARCH_INDEX_POPULATE = f"""
+    INSERT INTO {SEARCH_TABLE}(rowid, name, phone)
+    SELECT employee_id, name, coalesce(phone, '') || ' ' || {_phone_digits_sql('phone')} FROM employees
+"""
+
+
+def _tier_rank():
+    return case(
+        {tier: rank for rank, tier in enumerate(EMPLOYEE_TIERS)},
+        value=Employee.tier,
+        else_=len(EMPLOYEE_TIERS)
+    )
+
+
+# Sort options: (key column, key type, extract the key from an Employee)
+EMPLOYEE_SORTS = {
+    'name': (lambda: Employee.name, str, lambda employee: employee.name),
+    'tier': (_tier_rank, int, lambda employee: (
+        EMPLOYEE_TIERS.index(employee.tier) if employee.tier in EMPLOYEE_TIERS else len(EMPLOYEE_TIERS)
+    )),
+    'hire_date': (lambda: func.coalesce(Employee.hire_date, date.min), date,
+                  lambda employee: employee.hire_date or date.min),
+    'employee_id': (lambda: Employee.employee_id, int, lambda employee: employee.employee_id),
+}
+
+
+def search_index_available():
+    """
+    Return True if the FTS5 employee index exists (a positive result is cached per app)
+    """
+    if current_app.extensions.get('kpi_employee_search'):
+        return True
+
+    available = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first() is not None
+    if available:
+        current_app.extensions['kpi_employee_search'] = True
+    return available
+
+
+def rebuild_search_index():
+    """
+    Create the FTS5 index and its triggers if needed and repopulate it
+
+    Returns:
+        int: Number of indexed employees
+    """
+    for statement in SEARCH_INDEX_DDL:
+        db.session.execute(text(statement))
+    db.session.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+    db.session.execute(text(SEARCH_INDEX_POPULATE))
+    db.session.commit()
+    return db.session.execute(text(f'SELECT count(*) FROM {SEARCH_TABLE}')).scalar()
+
+
+def build_match_query(search):
+    """
+    Turn free text into an FTS5 query where every word must match as a prefix
+
+    Returns:
+        str: The MATCH expression, or None if the text has no searchable words
+    """
+    tokens = re.findall(r'\w+', search or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def apply_employee_search(query, search):
+    """
+    Restrict an employee query to the employees matching a search text
+    """
+    search = (search or '').strip()
+    if not search:
+        return query
+
+    if search_index_available():
+        match = build_match_query(search)
+        if match is None:
+            return query.filter(False)
+        matches = text(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match'
+        ).bindparams(match=match).columns(column('rowid'))
+        return query.filter(Employee.employee_id.in_(matches))
+
+    return query.filter(Employee.name.ilike(f'%{search}%') | Employee.phone.ilike(f'%{search}%'))
+
+
+def employee_listing_page(search='', tier='', status='', sort='name', direction='asc',
+                          cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one keyset page of employees with their evaluation counts
+
+    Returns:
+        KeysetPage: items are (Employee, evaluation_count) rows
+    """
+    if sort not in EMPLOYEE_SORTS:
+        sort = 'name'
+    column_factory, key_type, key_of = EMPLOYEE_SORTS[sort]
+
+    evaluation_count = select(func.count(Evaluation.evaluation_id)).where(
+        Evaluation.employee_id == Employee.employee_id
+    ).correlate(Employee).scalar_subquery()
+
+    query = db.session.query(Employee, evaluation_count.label('evaluation_count'))
+    query = apply_employee_search(query, search)
+    if tier:
+        query = query.filter(Employee.tier == tier)
+    if status == 'active':
+        query = query.filter(Employee.active == True)
+    elif status == 'inactive':
+        query = query.filter(Employee.active == False)
+
+    return keyset_paginate(
+        query,
+        (column_factory(), Employee.employee_id),
+        decode_cursor(cursor, (key_type, int)),
+        page_size,
+        descending=direction == 'desc',
+        key=lambda row: (key_of(row[0]), row[0].employee_id)
+    )
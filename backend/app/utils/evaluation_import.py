@@ -0,0 +1,417 @@
+"""
+Bulk import of field evaluations.
+
+Supervisors record evaluations on paper and enter them in bursts, so the
+importer takes a CSV or JSON file with one row per rating and groups rows
+into evaluations by (employee_id, evaluator_id, evaluation_date). Every row
+may carry a skill rating, a tool evaluation and/or a special skill:
+
+    employee_id, evaluator_id, evaluation_date, skill_id | skill, rating,
+    tool_id | tool, can_operate, owns_tool, special_skill, notes
+
+The file is read in a single streaming pass. Rows are validated against the
+taxonomy catalog and the employee list, invalid rows are reported and
+skipped, and valid rows are written with executemany INSERTs in chunked
+transactions together with the rollups they touch. A chunk that fails in the
+database is rolled back and its rows are reported; later chunks still run.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
+from app.utils.cache import bump_data_version
+from app.utils.catalog import get_catalog
+from app.utils.profiles import invalidate_employee_profiles
+from app.utils.rollups import refresh_rollups
+
+IMPORT_FORMATS = ('csv', 'json')
+
+# Rows written per transaction
+IMPORT_CHUNK_SIZE = 2000
+
+# Row errors included in the result (the total is always counted)
+MAX_REPORTED_ERRORS = 1000
+
+# Characters read at a time from a JSON array
+JSON_READ_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'\s*')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on', 'x')
+
+
+class RowError(ValueError):
+    """Raised for an import row that fails validation"""
+
+
+def iter_csv_rows(stream):
+    """
+    Yield the rows of a CSV text stream as dictionaries
+    """
+    yield from csv.DictReader(stream)
+
+
+def iter_json_rows(stream):
+    """
+    Yield the objects of a JSON array or of JSON Lines (one object per line)
+    """
+    first_line = stream.readline()
+    if first_line.lstrip().startswith('['):
+        yield from _iter_json_array(stream, first_line)
+        return
+
+    for line in chain([first_line], stream):
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json_array(stream, text):
+    """
+    Yield the items of a JSON array one at a time, reading the stream in
+    blocks so only about one block of text is held in memory
+    """
+    decoder = json.JSONDecoder()
+    buffer = text
+    position = text.index('[') + 1
+    exhausted = False
+    expect = 'first'  # the 'first' item or ']', an 'item' after ',' or a 'separator'
+
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if not exhausted and len(buffer) - position < JSON_READ_SIZE:
+            # Keep a block ahead of the parser, so a number cut off at the
+            # end of the buffer is not mistaken for a complete item
+            block = stream.read(JSON_READ_SIZE)
+            exhausted = not block
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+        if position == len(buffer):
+            raise ValueError('Unterminated JSON array')
+
+        char = buffer[position]
+        if expect == 'separator' or (expect == 'first' and char == ']'):
+            if char == ']':
+                if (buffer[position + 1:] + stream.read()).strip():
+                    raise ValueError('Extra data after the JSON array')
+                return
+            if char != ',':
+                raise ValueError("Expected ',' or ']' between JSON array items")
+            position += 1
+            expect = 'item'
+            continue
+
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            # The item is longer than the buffered text
+            block = stream.read(JSON_READ_SIZE)
+            exhausted = not block
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+
+        yield item
+        expect = 'separator'
+
+
+def detect_format(filename=None, content_type=None):
+    """
+    Guess the import format from a file name or content type
+    """
+    name = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.json', '.jsonl', '.ndjson')) or 'json' in content_type:
+        return 'json'
+    return None
+
+
+def import_evaluations(stream, file_format='csv', chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import evaluations from a text or binary stream
+
+    Args:
+        stream: File-like object with CSV or JSON content
+        file_format (str): 'csv' or 'json'
+        chunk_size (int): Rows written per transaction
+
+    Returns:
+        dict: success, message, rows_read, records_imported,
+            evaluations_created, error_count and errors ([{'row', 'error'}])
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format '{file_format}'")
+
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    rows = iter_csv_rows(stream) if file_format == 'csv' else iter_json_rows(stream)
+    importer = EvaluationImporter(chunk_size)
+    try:
+        for row in rows:
+            importer.add(row)
+    except (ValueError, csv.Error) as e:
+        # Malformed files stop the import; chunks already written are kept
+        importer.record_error(importer.rows_read + 1, f'Unreadable input: {e}')
+    importer.finish()
+    return importer.result()
+
+
+class EvaluationImporter:
+    """
+    Validates import rows and writes them in chunks
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE):
+        self.chunk_size = max(1, chunk_size)
+        self.catalog = get_catalog()
+        self.employee_ids = set(db.session.execute(select(Employee.__table__.c.employee_id)).scalars())
+        self.skill_names = {skill.name.strip().lower(): skill.skill_id for skill in self.catalog.skills}
+        self.tool_names = {tool.name.strip().lower(): tool.tool_id for tool in self.catalog.tools}
+
+        # evaluation key -> evaluation_id (or None until written) and the
+        # skills/tools already imported for it
+        self.evaluations = {}
+        self.seen_skills = set()
+        self.seen_tools = set()
+
+        self.pending = []
+        self.rows_read = 0
+        self.records_imported = 0
+        self.evaluations_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.touched_employees = set()
+
+    def add(self, row):
+        """
+        Validate one row and queue it for the current chunk
+        """
+        self.rows_read += 1
+        try:
+            self.pending.append(self._parse(row, self.rows_read))
+        except RowError as e:
+            self.record_error(self.rows_read, str(e))
+
+        if len(self.pending) >= self.chunk_size:
+            self._write_chunk()
+
+    def record_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def finish(self):
+        """
+        Write the last chunk and invalidate cached data
+        """
+        self._write_chunk()
+        if self.records_imported:
+            invalidate_employee_profiles(self.touched_employees)
+            bump_data_version()
+
+    def result(self):
+        return {
+            'success': self.error_count == 0,
+            'message': (
+                f'Imported {self.records_imported} of {self.rows_read} rows into '
+                f'{self.evaluations_created} evaluations ({self.error_count} errors)'
+            ),
+            'rows_read': self.rows_read,
+            'records_imported': self.records_imported,
+            'evaluations_created': self.evaluations_created,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
+
+    def _parse(self, row, row_number):
+        if not isinstance(row, dict):
+            raise RowError('Row must be an object')
+
+        employee_id = _parse_int(row.get('employee_id'), 'employee_id', required=True)
+        if employee_id not in self.employee_ids:
+            raise RowError(f'Unknown employee_id {employee_id}')
+
+        evaluator_id = _parse_int(row.get('evaluator_id'), 'evaluator_id')
+        if evaluator_id is not None and evaluator_id not in self.employee_ids:
+            raise RowError(f'Unknown evaluator_id {evaluator_id}')
+
+        evaluation_date = _value(row.get('evaluation_date'))
+        if not evaluation_date:
+            raise RowError('evaluation_date is required')
+        try:
+            evaluation_date = datetime.strptime(evaluation_date, '%Y-%m-%d').date()
+        except ValueError:
+            raise RowError(f"Invalid evaluation_date '{evaluation_date}' (expected YYYY-MM-DD)")
+
+        key = (employee_id, evaluator_id, evaluation_date)
+
+        skill_id = self._lookup(row, 'skill_id', 'skill', self.catalog.skills_by_id, self.skill_names)
+        rating = None
+        if skill_id is not None:
+            rating = _parse_int(row.get('rating'), 'rating', required=True)
+            if not 1 <= rating <= 5:
+                raise RowError(f'Rating {rating} is outside 1-5')
+            if (key, skill_id) in self.seen_skills:
+                raise RowError(f'Duplicate rating for skill {skill_id} in this evaluation')
+
+        tool_id = self._lookup(row, 'tool_id', 'tool', self.catalog.tools_by_id, self.tool_names)
+        if tool_id is not None and (key, tool_id) in self.seen_tools:
+            raise RowError(f'Duplicate tool {tool_id} in this evaluation')
+
+        special_skill = _value(row.get('special_skill'))
+        if skill_id is None and tool_id is None and not special_skill:
+            raise RowError('Row has no skill, tool or special skill')
+
+        if skill_id is not None:
+            self.seen_skills.add((key, skill_id))
+        if tool_id is not None:
+            self.seen_tools.add((key, tool_id))
+
+        return {
+            'row_number': row_number,
+            'key': key,
+            'notes': _value(row.get('notes')),
+            'skill_id': skill_id,
+            'rating': rating,
+            'tool_id': tool_id,
+            'can_operate': _parse_bool(row.get('can_operate')),
+            'owns_tool': _parse_bool(row.get('owns_tool')),
+            'special_skill': special_skill
+        }
+
+    def _lookup(self, row, id_field, name_field, by_id, by_name):
+        """
+        Resolve a skill/tool from its id or name column (None if both are empty)
+        """
+        item_id = _parse_int(row.get(id_field), id_field)
+        if item_id is not None:
+            if item_id not in by_id:
+                raise RowError(f'Unknown {id_field} {item_id}')
+            return item_id
+
+        name = _value(row.get(name_field))
+        if not name:
+            return None
+        item_id = by_name.get(name.lower())
+        if item_id is None:
+            raise RowError(f"Unknown {name_field} '{name}'")
+        return item_id
+
+    def _write_chunk(self):
+        """
+        Write the pending rows in one transaction, or roll it back and report
+        every row of the chunk if the database rejects it
+        """
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, []
+        created = []
+        try:
+            self._insert_rows(pending, created)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.exception('Evaluation import chunk of %d rows failed', len(pending))
+
+            # Forget what the rolled back chunk added, so the rows can be
+            # imported again (for example from a corrected file)
+            for key in created:
+                del self.evaluations[key]
+            for row in pending:
+                self.seen_skills.discard((row['key'], row['skill_id']))
+                self.seen_tools.discard((row['key'], row['tool_id']))
+                self.record_error(row['row_number'], f"Not saved, the database rejected this row's chunk: {getattr(e, 'orig', None) or e}")
+            return
+
+        self.records_imported += len(pending)
+        self.evaluations_created += len(created)
+        self.touched_employees.update(row['key'][0] for row in pending)
+
+    def _insert_rows(self, pending, created):
+        """
+        Insert a chunk's evaluations and ratings and refresh their rollups
+        (the keys of new evaluations are appended to created)
+        """
+        # Create the evaluations first seen in this chunk
+        for row in pending:
+            key = row['key']
+            if key not in self.evaluations:
+                employee_id, evaluator_id, evaluation_date = key
+                result = db.session.execute(insert(Evaluation.__table__).values(
+                    employee_id=employee_id,
+                    evaluator_id=evaluator_id,
+                    evaluation_date=evaluation_date,
+                    notes=row['notes']
+                ))
+                self.evaluations[key] = result.inserted_primary_key[0]
+                created.append(key)
+
+        skill_rows, tool_rows, special_rows = [], [], []
+        rollup_keys = set()
+        for row in pending:
+            evaluation_id = self.evaluations[row['key']]
+            if row['skill_id'] is not None:
+                skill_rows.append({'evaluation_id': evaluation_id, 'skill_id': row['skill_id'], 'rating': row['rating']})
+            if row['tool_id'] is not None:
+                tool_rows.append({
+                    'evaluation_id': evaluation_id, 'tool_id': row['tool_id'],
+                    'can_operate': row['can_operate'], 'owns_tool': row['owns_tool']
+                })
+            if row['special_skill']:
+                special_rows.append({'evaluation_id': evaluation_id, 'skill_name': row['special_skill']})
+
+            employee_id, evaluator_id, evaluation_date = row['key']
+            rollup_keys.add((employee_id, evaluation_date.strftime('%Y-%m')))
+
+        # Core executemany INSERTs, without the ORM's per-row bookkeeping
+        if skill_rows:
+            db.session.execute(insert(SkillEvaluation.__table__), skill_rows)
+        if tool_rows:
+            db.session.execute(insert(ToolEvaluation.__table__), tool_rows)
+        if special_rows:
+            db.session.execute(insert(SpecialSkill.__table__), special_rows)
+
+        refresh_rollups(rollup_keys)
+
+
+def _value(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _parse_int(value, field, required=False):
+    value = _value(value)
+    if value is None:
+        if required:
+            raise RowError(f'{field} is required')
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"Invalid {field} '{value}'")
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = _value(value)
+    return value is not None and value.lower() in TRUE_VALUES
@@ -0,0 +1,290 @@
+"""
+Read paths for evaluations.
+
+The listing query returns one flat row per evaluation (employee and
+evaluator names plus skill/tool counts as correlated subqueries), ordered by
+(evaluation_date, evaluation_id) so it can be paged with a keyset cursor or
+streamed from a server-side cursor without loading the whole history.
+
+The detail loader fetches complete evaluations (employee, evaluator, skill,
+tool and special-skill rows) with eager loading in four queries regardless
+of their size, and resolves skill and tool names from the taxonomy catalog.
+"""
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload, selectinload
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
+from app.utils.catalog import get_catalog
+from app.utils.pagination import decode_cursor, keyset_paginate
+from app.utils.serialization import Serializer
+
+# Sort key of the evaluation listing (newest first)
+LISTING_KEY = (Evaluation.evaluation_date, Evaluation.evaluation_id)
+LISTING_KEY_TYPES = (date, int)
+
+# Rows fetched per round trip when streaming
+STREAM_BATCH_SIZE = 500
+
+
+class EvaluationFilters(namedtuple('EvaluationFilters', 'employee_id evaluator_id start_date end_date')):
+    """
+    Filters of the evaluation listing
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_request(cls, args):
+        """
+        Build filters from request arguments (invalid values are ignored)
+        """
+        return cls(
+            employee_id=args.get('employee_id', type=int),
+            evaluator_id=args.get('evaluator_id', type=int),
+            start_date=_parse_date(args.get('start_date')),
+            end_date=_parse_date(args.get('end_date'))
+        )
+
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'evaluator_id': self.evaluator_id,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None
+        }
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _listing_columns():
+    employee = aliased(Employee)
+    evaluator = aliased(Employee)
+
+    skill_count = select(func.count(SkillEvaluation.skill_evaluation_id)).where(
+        SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).correlate(Evaluation).scalar_subquery()
+    tool_count = select(func.count(ToolEvaluation.tool_evaluation_id)).where(
+        ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).correlate(Evaluation).scalar_subquery()
+
+    columns = (
+        Evaluation.evaluation_id,
+        Evaluation.employee_id,
+        employee.name.label('employee_name'),
+        Evaluation.evaluator_id,
+        evaluator.name.label('evaluator_name'),
+        Evaluation.evaluation_date,
+        Evaluation.notes,
+        skill_count.label('skill_count'),
+        tool_count.label('tool_count'),
+        Evaluation.created_at,
+        Evaluation.updated_at
+    )
+    joins = (
+        (employee, Evaluation.employee_id == employee.employee_id),
+        (evaluator, Evaluation.evaluator_id == evaluator.employee_id)
+    )
+    return columns, joins
+
+
+@lru_cache(maxsize=None)
+def listing_serializer():
+    """
+    Return the serializer of listing rows (built on first use: aliasing
+    Employee configures the mappers, which must wait until every model is
+    imported)
+    """
+    return Serializer.for_columns(_listing_columns()[0])
+
+
+def _apply_filters(query, filters):
+    if filters.employee_id:
+        query = query.filter(Evaluation.employee_id == filters.employee_id)
+    if filters.evaluator_id:
+        query = query.filter(Evaluation.evaluator_id == filters.evaluator_id)
+    if filters.start_date:
+        query = query.filter(Evaluation.evaluation_date >= filters.start_date)
+    if filters.end_date:
+        query = query.filter(Evaluation.evaluation_date <= filters.end_date)
+    return query
+
+
+def evaluation_listing_query(filters):
+    """
+    Return the (unordered) listing query for the given filters
+    """
+    columns, joins = _listing_columns()
+    query = db.session.query(*columns)
+    for target, condition in joins:
+        query = query.outerjoin(target, condition)
+    return _apply_filters(query, filters)
+
+
+def evaluation_listing_page(filters, cursor, page_size):
+    """
+    Return one keyset page of the evaluation listing, newest first
+
+    Args:
+        filters (EvaluationFilters): Listing filters
+        cursor (str): Cursor token of the previous page (None for the first page)
+        page_size (int): Rows per page
+
+    Returns:
+        KeysetPage: rows with the columns of evaluation_row_serializer
+    """
+    return keyset_paginate(
+        evaluation_listing_query(filters),
+        LISTING_KEY,
+        decode_cursor(cursor, LISTING_KEY_TYPES),
+        page_size
+    )
+
+
+def iter_evaluation_listing(filters, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield every listing row, newest first, from a server-side cursor
+    """
+    query = evaluation_listing_query(filters).order_by(
+        *(column.desc() for column in LISTING_KEY)
+    ).execution_options(stream_results=True, yield_per=batch_size)
+    yield from query
+
+
+def evaluation_row_serializer(fields=None):
+    """
+    Return the serializer of listing rows: the fields of Evaluation.to_dict
+    plus employee/evaluator names and child counts, optionally limited to
+    the requested fields
+    """
+    return listing_serializer().select(fields)
+
+
+class SkillRatingDetail(namedtuple('SkillRatingDetail', 'skill_evaluation_id skill_id name category_id '
+                                                        'category_name rating notes')):
+    """One skill rating of an evaluation with its catalog names"""
+    __slots__ = ()
+
+
+class ToolRatingDetail(namedtuple('ToolRatingDetail', 'tool_evaluation_id tool_id name category_id '
+                                                      'category_name can_operate owns_tool')):
+    """One tool evaluation with its catalog names"""
+    __slots__ = ()
+
+
+class EvaluationDetail(namedtuple('EvaluationDetail', 'evaluation skills tools special_skills')):
+    """
+    A fully loaded evaluation.
+
+    ``evaluation`` is the Evaluation with employee and evaluator loaded;
+    skills and tools are ordered like the taxonomy catalog.
+    """
+    __slots__ = ()
+
+    @property
+    def skill_ratings(self):
+        """
+        Map skill_id -> rating
+        """
+        return {skill.skill_id: skill.rating for skill in self.skills}
+
+    @property
+    def tool_flags(self):
+        """
+        Map tool_id -> {'can_operate', 'owns_tool'}
+        """
+        return {
+            tool.tool_id: {'can_operate': tool.can_operate, 'owns_tool': tool.owns_tool}
+            for tool in self.tools
+        }
+
+    @property
+    def special_skill_names(self):
+        return [special_skill.skill_name for special_skill in self.special_skills]
+
+
+def load_evaluation_details(query):
+    """
+    Load the evaluations of a query with all of their rows
+
+    Args:
+        query: Evaluation query (filters and ordering are kept)
+
+    Returns:
+        list: EvaluationDetail per evaluation, in query order
+    """
+    evaluations = query.options(
+        joinedload(Evaluation.employee),
+        joinedload(Evaluation.evaluator),
+        selectinload(Evaluation.skill_evaluations),
+        selectinload(Evaluation.tool_evaluations),
+        selectinload(Evaluation.special_skills)
+    ).all()
+
+    catalog = get_catalog()
+    skill_order = _catalog_order(catalog.skill_categories, 'skills', 'skill_id')
+    tool_order = _catalog_order(catalog.tool_categories, 'tools', 'tool_id')
+
+    details = []
+    for evaluation in evaluations:
+        skills = []
+        for skill_evaluation in evaluation.skill_evaluations:
+            skill = catalog.skills_by_id.get(skill_evaluation.skill_id)
+            category = catalog.skill_categories_by_id.get(skill.category_id) if skill else None
+            skills.append(SkillRatingDetail(
+                skill_evaluation.skill_evaluation_id,
+                skill_evaluation.skill_id,
+                skill.name if skill else 'Unknown skill',
+                category.category_id if category else None,
+                category.name if category else 'Uncategorized',
+                skill_evaluation.rating,
+                skill_evaluation.notes
+            ))
+        skills.sort(key=lambda row: skill_order.get(row.skill_id, (len(skill_order), row.skill_id)))
+
+        tools = []
+        for tool_evaluation in evaluation.tool_evaluations:
+            tool = catalog.tools_by_id.get(tool_evaluation.tool_id)
+            category = catalog.tool_categories_by_id.get(tool.category_id) if tool else None
+            tools.append(ToolRatingDetail(
+                tool_evaluation.tool_evaluation_id,
+                tool_evaluation.tool_id,
+                tool.name if tool else 'Unknown tool',
+                category.category_id if category else None,
+                category.name if category else 'Uncategorized',
+                bool(tool_evaluation.can_operate),
+                bool(tool_evaluation.owns_tool)
+            ))
+        tools.sort(key=lambda row: tool_order.get(row.tool_id, (len(tool_order), row.tool_id)))
+
+        details.append(EvaluationDetail(evaluation, skills, tools, list(evaluation.special_skills)))
+    return details
+
+
+def load_evaluation_detail(evaluation_id):
+    """
+    Load one evaluation with all of its rows, or None if it does not exist
+    """
+    details = load_evaluation_details(Evaluation.query.filter(Evaluation.evaluation_id == evaluation_id))
+    return details[0] if details else None
+
+
+def _catalog_order(categories, children, id_attribute):
+    """
+    Map child id -> (position, id) following the catalog's display order
+    """
+    order = {}
+    for category in categories:
+        for child in getattr(category, children):
+            child_id = getattr(child, id_attribute)
+            order[child_id] = (len(order), child_id)
+    return order
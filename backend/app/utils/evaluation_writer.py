@@ -0,0 +1,345 @@
+"""
+Batched write path for evaluations.
+
+The evaluation form is parsed once against the taxonomy catalog into plain
+data, and the skill, tool and special-skill rows are written with one
+executemany INSERT per table, so saving a form costs a handful of statements
+no matter how many skills and tools it lists. The evaluation, its children
+and the rollups touched by it are committed in a single transaction.
+
+Updates are diff based: existing rows are matched to the form by skill_id,
+tool_id or special-skill name and only the differences are written. The
+resulting EvaluationDiff limits the rollup refresh and is recorded in the
+audit log.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import delete, insert, update
+
+from app import db
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
+from app.utils.audit import log_audit_event
+from app.utils.rollups import evaluation_rollup_keys, refresh_rollups
+
+
+class EvaluationForm(namedtuple('EvaluationForm', 'employee_id evaluator_id evaluation_date notes '
+                                                  'skill_ratings tool_flags special_skills')):
+    """
+    Parsed evaluation form.
+
+    skill_ratings maps skill_id -> rating, tool_flags maps
+    tool_id -> (can_operate, owns_tool) and special_skills is a list of names.
+    """
+    __slots__ = ()
+
+
+def parse_evaluation_form(form, catalog):
+    """
+    Parse a submitted evaluation form against the taxonomy catalog
+
+    Returns:
+        tuple: (EvaluationForm or None, error message or None)
+    """
+    employee_id = form.get('employee_id')
+    evaluation_date = form.get('evaluation_date')
+
+    evaluator_id = form.get('evaluator_id')
+
+    if not employee_id:
+        return None, 'Employee is required.'
+    if not employee_id.isdecimal():
+        return None, 'Employee is invalid.'
+    if evaluator_id and not evaluator_id.isdecimal():
+        return None, 'Evaluator is invalid.'
+    if not evaluation_date:
+        return None, 'Evaluation date is required.'
+
+    try:
+        evaluation_date = datetime.strptime(evaluation_date, '%Y-%m-%d').date()
+    except ValueError:
+        return None, 'Evaluation date must be in YYYY-MM-DD format.'
+
+    skill_ratings = {}
+    for skill in catalog.skills:
+        rating = form.get(f'skill_{skill.skill_id}')
+        if rating and rating.isdecimal():
+            skill_ratings[skill.skill_id] = int(rating)
+
+    tool_flags = {}
+    for tool in catalog.tools:
+        can_operate = form.get(f'tool_operate_{tool.tool_id}') == 'on'
+        owns_tool = form.get(f'tool_own_{tool.tool_id}') == 'on'
+        if can_operate or owns_tool:
+            tool_flags[tool.tool_id] = (can_operate, owns_tool)
+
+    special_skills = [
+        skill_name.strip()
+        for skill_name in (form.get('special_skills') or '').split(',')
+        if skill_name.strip()
+    ]
+
+    return EvaluationForm(
+        employee_id=int(employee_id),
+        evaluator_id=int(evaluator_id) if evaluator_id else None,
+        evaluation_date=evaluation_date,
+        notes=form.get('notes'),
+        skill_ratings=skill_ratings,
+        tool_flags=tool_flags,
+        special_skills=special_skills
+    ), None
+
+
+def create_evaluation(data):
+    """
+    Insert an evaluation with all of its rows and rollups in one transaction
+
+    Returns:
+        Evaluation: the committed evaluation
+    """
+    evaluation = Evaluation(
+        employee_id=data.employee_id,
+        evaluator_id=data.evaluator_id,
+        evaluation_date=data.evaluation_date,
+        notes=data.notes
+    )
+    db.session.add(evaluation)
+    db.session.flush()
+
+    _insert_children(evaluation.evaluation_id, data)
+
+    refresh_rollups(evaluation_rollup_keys(evaluation))
+    db.session.commit()
+    return evaluation
+
+
+class EvaluationDiff:
+    """
+    Changes applied to an evaluation by an update.
+
+    Skill and tool changes are keyed by skill_id/tool_id: ``*_added`` maps to
+    the new value, ``*_changed`` to (old, new) and ``*_removed`` to the old
+    value. Header changes map field -> (old, new).
+    """
+
+    def __init__(self):
+        self.header = {}
+        self.skills_added = {}
+        self.skills_changed = {}
+        self.skills_removed = {}
+        self.tools_added = {}
+        self.tools_changed = {}
+        self.tools_removed = {}
+        self.special_skills_added = []
+        self.special_skills_removed = []
+
+    @property
+    def skills_modified(self):
+        return bool(self.skills_added or self.skills_changed or self.skills_removed)
+
+    @property
+    def tools_modified(self):
+        return bool(self.tools_added or self.tools_changed or self.tools_removed)
+
+    @property
+    def moved(self):
+        """
+        True if the evaluation changed employee or date (every rollup bucket is affected)
+        """
+        return 'employee_id' in self.header or 'evaluation_date' in self.header
+
+    def __bool__(self):
+        return bool(
+            self.header or self.skills_modified or self.tools_modified
+            or self.special_skills_added or self.special_skills_removed
+        )
+
+    def to_dict(self):
+        """
+        Return the non-empty parts of the diff (used as audit log details)
+        """
+        diff = {
+            'header': self.header,
+            'skills_added': self.skills_added,
+            'skills_changed': self.skills_changed,
+            'skills_removed': self.skills_removed,
+            'tools_added': self.tools_added,
+            'tools_changed': self.tools_changed,
+            'tools_removed': self.tools_removed,
+            'special_skills_added': self.special_skills_added,
+            'special_skills_removed': self.special_skills_removed
+        }
+        return {name: value for name, value in diff.items() if value}
+
+
+def update_evaluation(evaluation, data):
+    """
+    Apply a parsed form to an existing evaluation in one transaction.
+
+    Existing child rows are compared with the form by skill_id, tool_id and
+    special-skill name; only the differences are inserted, updated or
+    deleted, so unchanged rows keep their ids and created_at. The diff
+    decides which rollups are refreshed and is written to the audit log.
+
+    Returns:
+        EvaluationDiff: the applied changes (empty if nothing changed)
+    """
+    diff = EvaluationDiff()
+    evaluation_id = evaluation.evaluation_id
+    rollup_keys = evaluation_rollup_keys(evaluation)
+
+    for field in ('employee_id', 'evaluator_id', 'evaluation_date', 'notes'):
+        old, new = getattr(evaluation, field), getattr(data, field)
+        if old != new:
+            diff.header[field] = (old, new)
+    if diff.header:
+        _apply_header(evaluation, data)
+
+    _diff_skills(evaluation_id, data, diff)
+    _diff_tools(evaluation_id, data, diff)
+    _diff_special_skills(evaluation_id, data, diff)
+
+    if diff:
+        # A move touches every row of the old and new buckets; otherwise only
+        # the rollup table whose rows changed needs to be recomputed
+        if diff.moved:
+            refresh_rollups(rollup_keys | evaluation_rollup_keys(evaluation))
+        else:
+            refresh_rollups(rollup_keys, skills=diff.skills_modified, tools=diff.tools_modified)
+        log_audit_event('UPDATE', 'evaluations', evaluation_id, diff.to_dict())
+
+    db.session.commit()
+    return diff
+
+
+def _apply_header(evaluation, data):
+    evaluation.employee_id = data.employee_id
+    evaluation.evaluator_id = data.evaluator_id
+    evaluation.evaluation_date = data.evaluation_date
+    evaluation.notes = data.notes
+    db.session.flush()
+
+
+def _diff_skills(evaluation_id, data, diff):
+    existing = {}
+    stale_ids = []
+    for skill_evaluation_id, skill_id, rating in db.session.query(
+        SkillEvaluation.skill_evaluation_id, SkillEvaluation.skill_id, SkillEvaluation.rating
+    ).filter(SkillEvaluation.evaluation_id == evaluation_id).order_by(SkillEvaluation.skill_evaluation_id):
+        # Duplicate ratings of one skill are collapsed into the oldest row
+        if skill_id in existing:
+            stale_ids.append(skill_evaluation_id)
+        else:
+            existing[skill_id] = (skill_evaluation_id, rating)
+
+    inserts, updates = [], []
+    for skill_id, rating in data.skill_ratings.items():
+        if skill_id not in existing:
+            inserts.append({'evaluation_id': evaluation_id, 'skill_id': skill_id, 'rating': rating})
+            diff.skills_added[skill_id] = rating
+            continue
+        skill_evaluation_id, old_rating = existing.pop(skill_id)
+        if old_rating != rating:
+            updates.append({'skill_evaluation_id': skill_evaluation_id, 'rating': rating})
+            diff.skills_changed[skill_id] = (old_rating, rating)
+
+    for skill_id, (skill_evaluation_id, old_rating) in existing.items():
+        stale_ids.append(skill_evaluation_id)
+        diff.skills_removed[skill_id] = old_rating
+
+    _apply(SkillEvaluation, SkillEvaluation.skill_evaluation_id, inserts, updates, stale_ids)
+
+
+def _diff_tools(evaluation_id, data, diff):
+    existing = {}
+    stale_ids = []
+    for tool_evaluation_id, tool_id, can_operate, owns_tool in db.session.query(
+        ToolEvaluation.tool_evaluation_id, ToolEvaluation.tool_id,
+        ToolEvaluation.can_operate, ToolEvaluation.owns_tool
+    ).filter(ToolEvaluation.evaluation_id == evaluation_id).order_by(ToolEvaluation.tool_evaluation_id):
+        if tool_id in existing:
+            stale_ids.append(tool_evaluation_id)
+        else:
+            existing[tool_id] = (tool_evaluation_id, (bool(can_operate), bool(owns_tool)))
+
+    inserts, updates = [], []
+    for tool_id, flags in data.tool_flags.items():
+        can_operate, owns_tool = flags
+        if tool_id not in existing:
+            inserts.append({
+                'evaluation_id': evaluation_id, 'tool_id': tool_id,
+                'can_operate': can_operate, 'owns_tool': owns_tool
+            })
+            diff.tools_added[tool_id] = flags
+            continue
+        tool_evaluation_id, old_flags = existing.pop(tool_id)
+        if old_flags != flags:
+            updates.append({'tool_evaluation_id': tool_evaluation_id, 'can_operate': can_operate, 'owns_tool': owns_tool})
+            diff.tools_changed[tool_id] = (old_flags, flags)
+
+    for tool_id, (tool_evaluation_id, old_flags) in existing.items():
+        stale_ids.append(tool_evaluation_id)
+        diff.tools_removed[tool_id] = old_flags
+
+    _apply(ToolEvaluation, ToolEvaluation.tool_evaluation_id, inserts, updates, stale_ids)
+
+
+def _diff_special_skills(evaluation_id, data, diff):
+    # Special skills have no natural key besides their name; repeated names
+    # are matched one to one
+    existing = {}
+    for special_skill_id, skill_name in db.session.query(
+        SpecialSkill.special_skill_id, SpecialSkill.skill_name
+    ).filter(SpecialSkill.evaluation_id == evaluation_id).order_by(SpecialSkill.special_skill_id):
+        existing.setdefault(skill_name, []).append(special_skill_id)
+
+    inserts = []
+    for skill_name in data.special_skills:
+        if existing.get(skill_name):
+            existing[skill_name].pop(0)
+        else:
+            inserts.append({'evaluation_id': evaluation_id, 'skill_name': skill_name})
+            diff.special_skills_added.append(skill_name)
+
+    stale_ids = []
+    for skill_name, special_skill_ids in existing.items():
+        stale_ids.extend(special_skill_ids)
+        diff.special_skills_removed.extend([skill_name] * len(special_skill_ids))
+
+    _apply(SpecialSkill, SpecialSkill.special_skill_id, inserts, [], stale_ids)
+
+
+def _apply(model, primary_key, inserts, updates, delete_ids):
+    """
+    Apply one table's changes with at most one statement each for inserts,
+    updates (executemany by primary key) and deletes
+    """
+    if delete_ids:
+        db.session.execute(delete(model).where(primary_key.in_(delete_ids)))
+    if updates:
+        db.session.execute(update(model), updates)
+    if inserts:
+        db.session.execute(insert(model), inserts)
+
+
+def _insert_children(evaluation_id, data):
+    """
+    Insert the skill, tool and special-skill rows of a form (one executemany each)
+    """
+    if data.skill_ratings:
+        db.session.execute(insert(SkillEvaluation), [
+            {'evaluation_id': evaluation_id, 'skill_id': skill_id, 'rating': rating}
+            for skill_id, rating in data.skill_ratings.items()
+        ])
+
+    if data.tool_flags:
+        db.session.execute(insert(ToolEvaluation), [
+            {'evaluation_id': evaluation_id, 'tool_id': tool_id, 'can_operate': can_operate, 'owns_tool': owns_tool}
+            for tool_id, (can_operate, owns_tool) in data.tool_flags.items()
+        ])
+
+    if data.special_skills:
+        db.session.execute(insert(SpecialSkill), [
+            {'evaluation_id': evaluation_id, 'skill_name': skill_name}
+            for skill_name in data.special_skills
+        ])
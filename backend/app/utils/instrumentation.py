@@ -0,0 +1,243 @@
+"""
+Request and database instrumentation for the KPI system.
+
+SQLAlchemy cursor events count queries and their time per request, a Flask
+before/after_request pair times every route, and a rolling in-memory window
+keeps the latencies per endpoint so the admin pages can show real
+p50/p95/p99 figures. Queries slower than SLOW_QUERY_THRESHOLD_MS are written
+to instance/logs/slow_queries.log together with the route that issued them.
+
+Metrics are kept per worker process.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency samples kept per endpoint for the percentile window
+HISTOGRAM_WINDOW = 1000
+
+# Request log entries kept for the hourly/daily counters
+REQUEST_LOG_SIZE = 100000
+
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+_engine_hooks_installed = False
+
+
+class RequestMetrics:
+    """
+    Rolling window of request latencies per endpoint plus a 24 hour request log
+    """
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._queries = defaultdict(lambda: deque(maxlen=window))
+        self._requests = deque(maxlen=REQUEST_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration_ms, status_code, query_count=0, query_ms=0.0, timestamp=None):
+        """
+        Record one finished request
+        """
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            self._latencies[endpoint].append(duration_ms)
+            self._queries[endpoint].append(query_count)
+            self._requests.append((timestamp, endpoint, duration_ms, status_code))
+
+            # Drop entries that fell out of the 24 hour window
+            cutoff = timestamp - timedelta(days=1)
+            while self._requests and self._requests[0][0] < cutoff:
+                self._requests.popleft()
+
+    def endpoint_stats(self):
+        """
+        Return latency percentiles per endpoint, slowest (p95) first
+        """
+        with self._lock:
+            samples = {
+                endpoint: (np.array(latencies), np.array(self._queries[endpoint]))
+                for endpoint, latencies in self._latencies.items() if latencies
+            }
+
+        stats = []
+        for endpoint, (latencies, queries) in samples.items():
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            stats.append({
+                'endpoint': endpoint,
+                'count': len(latencies),
+                'p50': round(float(p50), 1),
+                'p95': round(float(p95), 1),
+                'p99': round(float(p99), 1),
+                'avg_queries': round(float(queries.mean()), 1)
+            })
+        stats.sort(key=lambda item: item['p95'], reverse=True)
+        return stats
+
+    def summary(self, now=None):
+        """
+        Return the hourly/daily request counters and overall latency figures
+        """
+        now = now or datetime.now()
+        with self._lock:
+            requests = list(self._requests)
+
+        last_hour = now - timedelta(hours=1)
+        requests_by_hour = defaultdict(int)
+        durations = []
+        errors = 0
+        requests_last_hour = 0
+        for timestamp, endpoint, duration_ms, status_code in requests:
+            durations.append(duration_ms)
+            requests_by_hour[timestamp.hour] += 1
+            if status_code >= 500:
+                errors += 1
+            if timestamp >= last_hour:
+                requests_last_hour += 1
+
+        peak_load_time = 'N/A'
+        if requests_by_hour:
+            peak_hour = max(requests_by_hour, key=requests_by_hour.get)
+            peak_load_time = f'{peak_hour:02d}:00'
+
+        return {
+            'avg_response_time': round(float(np.mean(durations)), 1) if durations else 0,
+            'p95_response_time': round(float(np.percentile(durations, 95)), 1) if durations else 0,
+            'requests_last_hour': requests_last_hour,
+            'errors_last_day': errors,
+            'peak_load_time': peak_load_time
+        }
+
+
+def init_instrumentation(app):
+    """
+    Install the request timers and database hooks for an application
+    """
+    app.extensions['kpi_metrics'] = RequestMetrics()
+
+    if app.config.get('SLOW_QUERY_LOG', True):
+        _configure_slow_query_log(app)
+
+    _install_engine_hooks()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.query_time = 0.0
+
+    @app.after_request
+    def record_request_timing(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        query_count = g.get('query_count', 0)
+        query_ms = g.get('query_time', 0.0) * 1000
+
+        app.extensions['kpi_metrics'].record(
+            request.endpoint or request.path,
+            duration_ms,
+            response.status_code,
+            query_count,
+            query_ms
+        )
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={query_ms:.1f};desc="{query_count} queries", app;dur={duration_ms:.1f}'
+        )
+        return response
+
+
+def get_performance_metrics():
+    """
+    Return the performance metrics shown on the admin dashboard and health pages
+    """
+    metrics = current_app.extensions.get('kpi_metrics')
+    if metrics is None:
+        metrics = RequestMetrics()
+
+    performance_metrics = metrics.summary()
+    performance_metrics['memory_usage'] = _memory_usage()
+    performance_metrics['endpoints'] = metrics.endpoint_stats()
+    return performance_metrics
+
+
+def _memory_usage():
+    """
+    Return system memory usage in percent (0 if psutil is not installed)
+    """
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.virtual_memory().percent
+
+
+def _configure_slow_query_log(app):
+    """
+    Write slow queries to instance/logs/slow_queries.log in the admin log format
+    """
+    if slow_query_logger.handlers:
+        return
+
+    log_dir = os.path.join(app.instance_path, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+
+    handler = logging.FileHandler(os.path.join(log_dir, 'slow_queries.log'))
+    handler.setFormatter(logging.Formatter(
+        '[%(asctime)s] [%(levelname)s] [slow_query] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.WARNING)
+
+
+def _install_engine_hooks():
+    """
+    Listen to cursor events on every engine (installed once per process)
+    """
+    global _engine_hooks_installed
+    if _engine_hooks_installed:
+        return
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _engine_hooks_installed = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+        g.query_time += elapsed
+
+    if not has_app_context():
+        return
+
+    threshold = current_app.config.get('SLOW_QUERY_THRESHOLD_MS', 200)
+    if threshold is not None and elapsed * 1000 >= threshold:
+        route = (request.endpoint or request.path) if has_request_context() else 'cli'
+        slow_query_logger.warning(
+            '%.1f ms in %s: %s',
+            elapsed * 1000,
+            route,
+            ' '.join(statement.split())
+        )
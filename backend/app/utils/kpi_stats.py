@@ -0,0 +1,463 @@
+"""
+KPI aggregation helpers for the dashboard and reports.
+
+Every panel is computed from grouped SQL statements that share a single
+KPIFilters object, so the number of round-trips stays constant no matter how
+many skill categories or months of history are displayed.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
+from app.models.rollup import SkillRatingRollup, ToolRatingRollup
+from app.models.skill import Skill, SkillCategory
+from app.utils.timeseries import MonthIndex, MonthlySeries, month_range, next_month
+
+# Number of days covered by each dashboard date range option
+DATE_RANGE_DAYS = {
+    'year': 365,
+    'quarter': 90,
+    'month': 30
+}
+
+
+class KPIFilters:
+    """
+    Normalized employee/category/tier/date filters shared by every KPI query
+    """
+
+    def __init__(self, employee_id=None, category_id=None, tier=None, date_range='all', today=None, scope=None):
+        self.employee_id = employee_id or None
+        self.category_id = category_id or None
+        self.tier = tier or None
+        self.date_range = date_range if date_range in DATE_RANGE_DAYS else 'all'
+        self.today = today or datetime.now().date()
+        self.scope = scope or ('all',)
+
+        if self.date_range == 'all':
+            self.start_date = None
+        else:
+            self.start_date = self.today - timedelta(days=DATE_RANGE_DAYS[self.date_range])
+
+    @classmethod
+    def from_request(cls, args, user):
+        """
+        Build filters from request arguments, restricting non-manager users
+        to their own employee record
+        """
+        employee_id = args.get('employee_id', type=int)
+        scope = ('all',)
+
+        if not user.is_manager() and user.employee_id:
+            employee_id = user.employee_id
+            scope = ('employee', user.employee_id)
+
+        return cls(
+            employee_id=employee_id,
+            category_id=args.get('category_id', type=int),
+            tier=args.get('tier'),
+            date_range=args.get('date_range', 'all'),
+            scope=scope
+        )
+
+    def to_dict(self):
+        """
+        Convert filters to the dictionary used by the dashboard template
+        """
+        return {
+            'employee_id': self.employee_id,
+            'category_id': self.category_id,
+            'tier': self.tier,
+            'date_range': self.date_range
+        }
+
+    def cache_key(self):
+        """
+        Return a hashable key identifying the results of these filters.
+
+        Includes the visibility scope of the requesting user and the current
+        day, since relative date ranges move with it.
+        """
+        return (
+            self.scope,
+            self.employee_id,
+            self.category_id,
+            self.tier,
+            self.date_range,
+            self.today.isoformat()
+        )
+
+    def apply(self, query, dates=True):
+        """
+        Apply the employee, tier and date filters to a query that already
+        selects from (or joins) the evaluations table
+        """
+        if self.employee_id:
+            query = query.filter(Evaluation.employee_id == self.employee_id)
+        if self.tier:
+            query = query.join(
+                Employee, Evaluation.employee_id == Employee.employee_id
+            ).filter(Employee.tier == self.tier)
+        if dates and self.start_date:
+            query = query.filter(Evaluation.evaluation_date >= self.start_date)
+        return query
+
+    def apply_rollup(self, query, rollup, dates=True):
+        """
+        Apply the employee, tier and date filters to a rollup table query.
+
+        Rollups are stored per month, so the start date is rounded down to the
+        first day of its month.
+        """
+        if self.employee_id:
+            query = query.filter(rollup.employee_id == self.employee_id)
+        if self.tier:
+            query = query.join(
+                Employee, rollup.employee_id == Employee.employee_id
+            ).filter(Employee.tier == self.tier)
+        if dates and self.start_date:
+            query = query.filter(rollup.month >= self.start_date.strftime('%Y-%m'))
+        return query
+
+    def progress_window(self):
+        """
+        Return the (start, end) dates plotted by the progress chart.
+
+        The "all" and "year" ranges show the last twelve months, the shorter
+        ranges show the months they overlap.
+        """
+        end_date = self.today
+        if self.date_range in ('all', 'year'):
+            start_date = end_date.replace(day=1)
+            start_date = start_date.replace(year=start_date.year - 1)
+        else:
+            start_date = end_date - timedelta(days=DATE_RANGE_DAYS[self.date_range])
+        return start_date, end_date
+
+
+def rollups_enabled():
+    """
+    Return True when readers should use the materialized rollup tables
+    (KPI_USE_ROLLUPS setting)
+    """
+    return current_app.config.get('KPI_USE_ROLLUPS', False)
+
+
+def get_summary_stats(filters, category_totals=None):
+    """
+    Calculate the headline dashboard statistics in a single statement.
+
+    Args:
+        filters (KPIFilters): Filters to apply
+        category_totals (dict, optional): Result of get_category_totals() for the
+            same filters, used to derive the average rating without another query
+
+    Returns:
+        dict: total_employees, total_evaluations, avg_skill_rating, tools_percentage
+    """
+    total_employees = select(func.count(Employee.employee_id)).where(
+        Employee.active == True
+    ).scalar_subquery()
+
+    total_evaluations = filters.apply(
+        db.session.query(func.count(Evaluation.evaluation_id))
+    ).scalar_subquery()
+
+    if rollups_enabled() and not filters.start_date:
+        tool_query = filters.apply_rollup(
+            db.session.query(
+                func.sum(ToolRatingRollup.tool_count).label('total_tools'),
+                func.sum(ToolRatingRollup.can_operate_count).label('can_operate_count')
+            ),
+            ToolRatingRollup
+        ).subquery()
+    else:
+        tool_query = filters.apply(
+            db.session.query(
+                func.count(ToolEvaluation.tool_evaluation_id).label('total_tools'),
+                func.sum(func.cast(ToolEvaluation.can_operate, db.Integer)).label('can_operate_count')
+            ).join(
+                Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+            )
+        ).subquery()
+
+    row = db.session.query(
+        total_employees.label('total_employees'),
+        total_evaluations.label('total_evaluations'),
+        tool_query.c.total_tools,
+        tool_query.c.can_operate_count
+    ).one()
+
+    if category_totals is None:
+        category_totals = get_category_totals(filters)
+
+    stats = {
+        'total_employees': row.total_employees,
+        'total_evaluations': row.total_evaluations,
+        'avg_skill_rating': average_rating(category_totals, filters.category_id),
+        'tools_percentage': 0
+    }
+
+    if row.total_tools:
+        stats['tools_percentage'] = ((row.can_operate_count or 0) / row.total_tools) * 100
+
+    return stats
+
+
+def get_category_totals(filters):
+    """
+    Sum and count skill ratings per skill category for the filtered evaluations.
+
+    Ratings for skills without a category are kept under the ``None`` key so
+    that overall averages match a query that does not join the skills table.
+
+    Returns:
+        dict: Mapping of category_id to (rating_sum, rating_count)
+    """
+    if rollups_enabled() and not filters.start_date:
+        query = filters.apply_rollup(
+            db.session.query(
+                SkillRatingRollup.category_id,
+                func.sum(SkillRatingRollup.rating_sum),
+                func.sum(SkillRatingRollup.rating_count)
+            ),
+            SkillRatingRollup
+        ).group_by(SkillRatingRollup.category_id)
+
+        return {
+            category_id: (rating_sum or 0, rating_count or 0)
+            for category_id, rating_sum, rating_count in query.all()
+        }
+
+    query = filters.apply(
+        db.session.query(
+            Skill.category_id,
+            func.sum(SkillEvaluation.rating),
+            func.count(SkillEvaluation.rating)
+        ).join(
+            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+        ).outerjoin(
+            Skill, SkillEvaluation.skill_id == Skill.skill_id
+        )
+    ).group_by(Skill.category_id)
+
+    return {
+        category_id: (rating_sum or 0, rating_count)
+        for category_id, rating_sum, rating_count in query.all()
+    }
+
+
+def average_rating(category_totals, category_id=None):
+    """
+    Derive an average rating from category totals, optionally for one category
+    """
+    if category_id:
+        rating_sum, rating_count = category_totals.get(category_id, (0, 0))
+    else:
+        rating_sum = sum(total[0] for total in category_totals.values())
+        rating_count = sum(total[1] for total in category_totals.values())
+    return rating_sum / rating_count if rating_count else 0
+
+
+def get_category_averages(skill_categories, category_totals):
+    """
+    Build the radar chart mapping of category_id to average rating
+    """
+    averages = {}
+    for category in skill_categories:
+        rating_sum, rating_count = category_totals.get(category.category_id, (0, 0))
+        averages[category.category_id] = rating_sum / rating_count if rating_count else 0
+    return averages
+
+
+def get_ranked_skills(filters, limit=5):
+    """
+    Return the highest and lowest rated skills from a single ranked scan.
+
+    Skill averages are computed once, ranked in both directions with window
+    functions and joined with their category, so the top and bottom panels
+    need one round-trip and no per-row category lookups.
+
+    Args:
+        filters (KPIFilters): Filters to apply (category_id limits the skills)
+        limit (int): Number of skills in each list
+
+    Returns:
+        tuple: (top_skills, bottom_skills) lists of dictionaries with skill_id,
+            category_id, name, display_order, avg_rating, rating_count and
+            category ({'category_id', 'name'})
+    """
+    averages = filters.apply(
+        db.session.query(
+            SkillEvaluation.skill_id.label('skill_id'),
+            func.avg(SkillEvaluation.rating).label('avg_rating'),
+            func.count(SkillEvaluation.rating).label('rating_count')
+        ).join(
+            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+        )
+    ).group_by(SkillEvaluation.skill_id).subquery()
+
+    ranked = db.session.query(
+        Skill.skill_id,
+        Skill.category_id,
+        Skill.name,
+        Skill.display_order,
+        SkillCategory.name.label('category_name'),
+        averages.c.avg_rating,
+        averages.c.rating_count,
+        func.row_number().over(
+            order_by=(averages.c.avg_rating.desc(), Skill.skill_id)
+        ).label('top_rank'),
+        func.row_number().over(
+            order_by=(averages.c.avg_rating.asc(), Skill.skill_id)
+        ).label('bottom_rank')
+    ).join(
+        averages, averages.c.skill_id == Skill.skill_id
+    ).outerjoin(
+        SkillCategory, Skill.category_id == SkillCategory.category_id
+    )
+    if filters.category_id:
+        ranked = ranked.filter(Skill.category_id == filters.category_id)
+    ranked = ranked.subquery()
+
+    rows = db.session.query(ranked).filter(
+        or_(ranked.c.top_rank <= limit, ranked.c.bottom_rank <= limit)
+    ).all()
+
+    top_skills = []
+    bottom_skills = []
+    for row in rows:
+        skill = {
+            'skill_id': row.skill_id,
+            'category_id': row.category_id,
+            'name': row.name,
+            'display_order': row.display_order,
+            'avg_rating': row.avg_rating,
+            'rating_count': row.rating_count,
+            'category': {'category_id': row.category_id, 'name': row.category_name}
+        }
+        if row.top_rank <= limit:
+            top_skills.append((row.top_rank, skill))
+        if row.bottom_rank <= limit:
+            bottom_skills.append((row.bottom_rank, skill))
+
+    top_skills.sort(key=lambda item: item[0])
+    bottom_skills.sort(key=lambda item: item[0])
+    return [skill for rank, skill in top_skills], [skill for rank, skill in bottom_skills]
+
+
+def get_category_progress(filters, skill_categories):
+    """
+    Calculate monthly average ratings per category for the progress chart.
+
+    Employee and tier filters are applied; the date window comes from
+    KPIFilters.progress_window() and is expanded to whole months.
+
+    Returns:
+        tuple: (progress_dates, category_progress) where category_progress is a
+            MonthlySeries of categories x months; category_progress.get((category_id,
+            'YYYY-MM'), 0) returns the average rating for that month
+    """
+    start_date, end_date = filters.progress_window()
+    month_index = MonthIndex.between(start_date, end_date)
+    progress_dates = list(month_index.months)
+
+    category_ids = [category.category_id for category in skill_categories]
+    if not progress_dates:
+        return progress_dates, MonthlySeries(category_ids, month_index)
+
+    if rollups_enabled():
+        query = filters.apply_rollup(
+            db.session.query(
+                SkillRatingRollup.category_id,
+                SkillRatingRollup.month,
+                func.sum(SkillRatingRollup.rating_sum),
+                func.sum(SkillRatingRollup.rating_count)
+            ).filter(
+                SkillRatingRollup.month >= month_index.keys[0],
+                SkillRatingRollup.month <= month_index.keys[-1]
+            ),
+            SkillRatingRollup,
+            dates=False
+        ).group_by(SkillRatingRollup.category_id, SkillRatingRollup.month)
+    else:
+        month = func.strftime('%Y-%m', Evaluation.evaluation_date)
+        query = filters.apply(
+            db.session.query(
+                Skill.category_id,
+                month.label('month'),
+                func.sum(SkillEvaluation.rating),
+                func.count(SkillEvaluation.rating)
+            ).join(
+                Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+            ).join(
+                Skill, SkillEvaluation.skill_id == Skill.skill_id
+            ).filter(
+                Evaluation.evaluation_date >= progress_dates[0],
+                Evaluation.evaluation_date < next_month(progress_dates[-1])
+            ),
+            dates=False
+        ).group_by(Skill.category_id, month)
+
+    return progress_dates, MonthlySeries.from_totals(category_ids, month_index, query.all())
+
+
+def get_employee_category_totals(employee_ids, start_date=None, end_date=None):
+    """
+    Sum and count skill ratings per employee and skill category.
+
+    Reads the rollup tables when they are enabled, in which case the date
+    window is applied per month.
+
+    Args:
+        employee_ids (list): Employee IDs to include
+        start_date (date, optional): Earliest evaluation date
+        end_date (date, optional): Latest evaluation date
+
+    Returns:
+        dict: Mapping of (employee_id, category_id) to (rating_sum, rating_count)
+    """
+    if not employee_ids:
+        return {}
+
+    if rollups_enabled():
+        query = db.session.query(
+            SkillRatingRollup.employee_id,
+            SkillRatingRollup.category_id,
+            func.sum(SkillRatingRollup.rating_sum),
+            func.sum(SkillRatingRollup.rating_count)
+        ).filter(
+            SkillRatingRollup.employee_id.in_(employee_ids)
+        )
+        if start_date:
+            query = query.filter(SkillRatingRollup.month >= start_date.strftime('%Y-%m'))
+        if end_date:
+            query = query.filter(SkillRatingRollup.month <= end_date.strftime('%Y-%m'))
+        query = query.group_by(SkillRatingRollup.employee_id, SkillRatingRollup.category_id)
+    else:
+        query = db.session.query(
+            Evaluation.employee_id,
+            Skill.category_id,
+            func.sum(SkillEvaluation.rating),
+            func.count(SkillEvaluation.rating)
+        ).join(
+            Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+        ).join(
+            Skill, SkillEvaluation.skill_id == Skill.skill_id
+        ).filter(
+            Evaluation.employee_id.in_(employee_ids)
+        )
+        if start_date:
+            query = query.filter(Evaluation.evaluation_date >= start_date)
+        if end_date:
+            query = query.filter(Evaluation.evaluation_date <= end_date)
+        query = query.group_by(Evaluation.employee_id, Skill.category_id)
+
+    return {
+        (employee_id, category_id): (rating_sum or 0, rating_count or 0)
+        for employee_id, category_id, rating_sum, rating_count in query.all()
+    }
@@ -0,0 +1,113 @@
+"""
+In-app notification writer.
+
+The notification tables are created by migration v1.6.0 and have no ORM
+models, so notifications are written with lightweight table constructs
+inside the caller's session (like the audit log). Databases that have not
+been migrated yet are skipped silently.
+"""
+import json
+
+from flask import current_app
+from sqlalchemy import column, insert, inspect, select, table
+
+from app import db
+
+notification_types = table(
+    'notification_types',
+    column('id'),
+    column('name')
+)
+
+notifications = table(
+    'notifications',
+    column('user_id'),
+    column('type_id'),
+    column('title'),
+    column('message'),
+    column('data')
+)
+
+notification_settings = table(
+    'notification_settings',
+    column('user_id'),
+    column('type_id'),
+    column('app_enabled')
+)
+
+users = table(
+    'users',
+    column('id'),
+    column('role'),
+    column('active')
+)
+
+# Roles notified about employee events
+MANAGER_ROLES = ('admin', 'manager')
+
+
+def notifications_available():
+    """
+    Return True if the database has the notification tables (checked once per app)
+    """
+    available = current_app.extensions.get('kpi_notifications')
+    if available is None:
+        inspector = inspect(db.engine)
+        available = inspector.has_table('notifications') and inspector.has_table('notification_types')
+        current_app.extensions['kpi_notifications'] = available
+    return available
+
+
+def manager_user_ids(type_id):
+    """
+    Return the ids of active managers and admins who have not disabled
+    in-app notifications of a type
+    """
+    disabled = select(notification_settings.c.user_id).where(
+        notification_settings.c.type_id == type_id,
+        notification_settings.c.app_enabled == False
+    )
+    return db.session.execute(
+        select(users.c.id).where(
+            users.c.role.in_(MANAGER_ROLES),
+            users.c.active == True,
+            users.c.id.not_in(disabled)
+        )
+    ).scalars().all()
+
+
+def notify_managers(type_name, messages):
+    """
+    Add notifications for every manager to the current transaction
+
+    Args:
+        type_name (str): Name of a notification type (e.g. 'employee_tier_change')
+        messages (list): (title, message, data) tuples; data is a JSON-serializable dict
+
+    Returns:
+        int: Number of notifications written
+    """
+    if not messages or not notifications_available():
+        return 0
+
+    type_id = db.session.execute(
+        select(notification_types.c.id).where(notification_types.c.name == type_name)
+    ).scalar()
+    if type_id is None:
+        return 0
+
+    recipients = manager_user_ids(type_id)
+    rows = [
+        {
+            'user_id': user_id,
+            'type_id': type_id,
+            'title': title,
+            'message': message,
+            'data': json.dumps(data, default=str) if data is not None else None
+        }
+        for title, message, data in messages
+        for user_id in recipients
+    ]
+    if rows:
+        db.session.execute(insert(notifications), rows)
+    return len(rows)
@@ -0,0 +1,115 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+shown, so fetching page N costs the same as fetching page 1: the query seeks
+past the cursor with a row-value comparison instead of an OFFSET, and never
+counts the full result.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+# Rows per page when the client does not ask for a size
+DEFAULT_PAGE_SIZE = 50
+
+# Largest page a client may request
+MAX_PAGE_SIZE = 200
+
+
+class KeysetPage(namedtuple('KeysetPage', 'items page_size cursor next_cursor')):
+    """One page of results with the cursor of the following page (None on the last page)"""
+    __slots__ = ()
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Return a page size from a request argument, clamped to 1..maximum
+    """
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(values):
+    """
+    Encode a sort key (tuple of ints, strings and dates) as a URL-safe token
+    """
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    return token.decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, types):
+    """
+    Decode a cursor token into a sort key
+
+    Args:
+        token (str): Token produced by encode_cursor
+        types (tuple): Type of every key part (int, str, date or datetime)
+
+    Returns:
+        tuple: The sort key, or None if the token is missing or invalid
+    """
+    if not token:
+        return None
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            return None
+        values = []
+        for value, value_type in zip(payload, types):
+            if value_type in (date, datetime):
+                value = value_type.fromisoformat(value)
+            else:
+                value = value_type(value)
+            values.append(value)
+    except (ValueError, TypeError):
+        return None
+    return tuple(values)
+
+
+def keyset_paginate(query, columns, cursor, page_size, descending=True, key=None):
+    """
+    Return one page of a query ordered by the given key columns
+
+    Args:
+        query: SQLAlchemy query (without ORDER BY or LIMIT)
+        columns (tuple): Unique sort key columns, e.g. (date, id)
+        cursor (tuple): Decoded sort key of the last row of the previous page
+        page_size (int): Rows per page
+        descending (bool): Newest/highest keys first
+        key (callable): Extract the sort key from a row (defaults to the
+            attributes named like the key columns)
+
+    Returns:
+        KeysetPage
+    """
+    if key is None:
+        names = [column.key for column in columns]
+        key = lambda row: tuple(getattr(row, name) for name in names)
+
+    if cursor is not None:
+        seek = tuple_(*columns)
+        query = query.filter(seek < tuple_(*cursor) if descending else seek > tuple_(*cursor))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+
+    # Fetch one extra row to learn whether another page follows
+    rows = query.order_by(*order).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(key(rows[-1]))
+
+    return KeysetPage(rows, page_size, encode_cursor(cursor) if cursor else None, next_cursor)
@@ -0,0 +1,214 @@
+"""
+Employee profile snapshots.
+
+A snapshot holds everything the employee pages show about one employee's
+evaluation history as plain data, built from a fixed number of queries no
+matter how many categories or tools exist. Snapshots are cached per employee
+and invalidated whenever that employee's evaluations change.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
+from app.models.skill import Skill, SkillCategory
+from app.utils.cache import cached, get_cache
+
+# Number of skills listed as strengths and improvement areas
+PROFILE_RANKED_SKILLS = 3
+
+# Prefix of the per-employee version counter names
+PROFILE_VERSION_PREFIX = 'employee:'
+
+
+def profile_version(employee_id):
+    """
+    Return the cache version name of an employee's profile snapshot
+    """
+    return f'{PROFILE_VERSION_PREFIX}{int(employee_id)}'
+
+
+def get_employee_profile(employee_id):
+    """
+    Return the (cached) profile snapshot of an employee
+    """
+    return cached(
+        'employee.profile',
+        (int(employee_id),),
+        lambda: build_employee_profile(employee_id),
+        version=profile_version(employee_id)
+    )
+
+
+def invalidate_employee_profiles(employee_ids):
+    """
+    Drop the cached snapshots of the given employees.
+
+    Call this before bump_data_version(): a worker that sees the new data
+    version then also sees which employees changed (see get_skill_state).
+    """
+    cache = get_cache()
+    for employee_id in set(employee_ids):
+        if employee_id:
+            cache.bump_version(profile_version(employee_id))
+
+
+def build_employee_profile(employee_id):
+    """
+    Build the profile snapshot of an employee in four queries.
+
+    Returns:
+        dict: evaluations (newest first, with evaluator name, skill/tool counts
+            and average rating), evaluation_count, last_evaluation_date,
+            category_ratings, avg_skill_rating, top_skills, improvement_skills,
+            can_operate_tools, owns_tools and special_skills
+    """
+    evaluations = _evaluation_summaries(employee_id)
+    skill_averages = _skill_averages(employee_id)
+
+    # Category averages and the overall average from the per-skill totals
+    category_totals = {}
+    for skill in skill_averages:
+        rating_sum, rating_count = category_totals.get(skill['category_id'], (0, 0))
+        category_totals[skill['category_id']] = (rating_sum + skill['rating_sum'], rating_count + skill['rating_count'])
+
+    category_ratings = {
+        category_id: rating_sum / rating_count
+        for category_id, (rating_sum, rating_count) in category_totals.items() if rating_count
+    }
+    total_sum = sum(skill['rating_sum'] for skill in skill_averages)
+    total_count = sum(skill['rating_count'] for skill in skill_averages)
+
+    ranked = sorted(skill_averages, key=lambda skill: (-skill['avg_rating'], skill['skill_id']))
+    improvement = sorted(skill_averages, key=lambda skill: (skill['avg_rating'], skill['skill_id']))
+
+    # Tools the employee can operate or owns according to any evaluation
+    tool_rows = db.session.query(
+        ToolEvaluation.tool_id,
+        func.max(func.cast(ToolEvaluation.can_operate, db.Integer)),
+        func.max(func.cast(ToolEvaluation.owns_tool, db.Integer))
+    ).join(
+        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id == employee_id
+    ).group_by(ToolEvaluation.tool_id).all()
+
+    special_skills = [
+        {'skill_name': skill_name, 'description': description}
+        for skill_name, description in db.session.query(
+            SpecialSkill.skill_name,
+            SpecialSkill.description
+        ).join(
+            Evaluation, SpecialSkill.evaluation_id == Evaluation.evaluation_id
+        ).filter(
+            Evaluation.employee_id == employee_id
+        ).all()
+    ]
+
+    return {
+        'evaluations': evaluations,
+        'evaluation_count': len(evaluations),
+        'last_evaluation_date': evaluations[0]['evaluation_date'] if evaluations else None,
+        'category_ratings': category_ratings,
+        'avg_skill_rating': total_sum / total_count if total_count else 0,
+        'top_skills': ranked[:PROFILE_RANKED_SKILLS],
+        'improvement_skills': improvement[:PROFILE_RANKED_SKILLS],
+        'can_operate_tools': {tool_id for tool_id, can_operate, owns_tool in tool_rows if can_operate},
+        'owns_tools': {tool_id for tool_id, can_operate, owns_tool in tool_rows if owns_tool},
+        'special_skills': special_skills
+    }
+
+
+def _evaluation_summaries(employee_id):
+    """
+    Return one summary per evaluation of an employee, newest first
+    """
+    evaluator = aliased(Employee)
+
+    skill_stats = db.session.query(
+        SkillEvaluation.evaluation_id.label('evaluation_id'),
+        func.count(SkillEvaluation.skill_evaluation_id).label('skill_count'),
+        func.avg(SkillEvaluation.rating).label('avg_rating')
+    ).join(
+        Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id == employee_id
+    ).group_by(SkillEvaluation.evaluation_id).subquery()
+
+    tool_stats = db.session.query(
+        ToolEvaluation.evaluation_id.label('evaluation_id'),
+        func.count(ToolEvaluation.tool_evaluation_id).label('tool_count')
+    ).join(
+        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id == employee_id
+    ).group_by(ToolEvaluation.evaluation_id).subquery()
+
+    rows = db.session.query(
+        Evaluation.evaluation_id,
+        Evaluation.evaluation_date,
+        Evaluation.evaluator_id,
+        evaluator.name,
+        skill_stats.c.skill_count,
+        skill_stats.c.avg_rating,
+        tool_stats.c.tool_count
+    ).outerjoin(
+        evaluator, Evaluation.evaluator_id == evaluator.employee_id
+    ).outerjoin(
+        skill_stats, skill_stats.c.evaluation_id == Evaluation.evaluation_id
+    ).outerjoin(
+        tool_stats, tool_stats.c.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id == employee_id
+    ).order_by(
+        Evaluation.evaluation_date.desc()
+    ).all()
+
+    return [
+        {
+            'evaluation_id': evaluation_id,
+            'evaluation_date': evaluation_date,
+            'evaluator_id': evaluator_id,
+            'evaluator_name': evaluator_name,
+            'skill_count': skill_count or 0,
+            'tool_count': tool_count or 0,
+            'avg_rating': avg_rating or 0
+        }
+        for evaluation_id, evaluation_date, evaluator_id, evaluator_name, skill_count, avg_rating, tool_count in rows
+    ]
+
+
+def _skill_averages(employee_id):
+    """
+    Return rating totals and averages per skill for an employee
+    """
+    rows = db.session.query(
+        Skill.skill_id,
+        Skill.category_id,
+        Skill.name,
+        SkillCategory.name,
+        func.sum(SkillEvaluation.rating),
+        func.count(SkillEvaluation.rating)
+    ).join(
+        SkillEvaluation, SkillEvaluation.skill_id == Skill.skill_id
+    ).join(
+        Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).outerjoin(
+        SkillCategory, Skill.category_id == SkillCategory.category_id
+    ).filter(
+        Evaluation.employee_id == employee_id
+    ).group_by(Skill.skill_id).all()
+
+    return [
+        {
+            'skill_id': skill_id,
+            'category_id': category_id,
+            'name': name,
+            'rating_sum': rating_sum or 0,
+            'rating_count': rating_count,
+            'avg_rating': (rating_sum or 0) / rating_count if rating_count else 0,
+            'category': {'category_id': category_id, 'name': category_name}
+        }
+        for skill_id, category_id, name, category_name, rating_sum, rating_count in rows
+    ]
@@ -0,0 +1,419 @@
+"""
+Tier promotion readiness.
+
+Every active employee is scored against the requirements of the next tier
+(EMPLOYEE_TIERS order): a minimum current average over all skills, minimum
+current averages per skill category and tools the employee must be able to
+operate. Requirements come from the KPI_PROMOTION_THRESHOLDS setting, keyed
+by the target tier:
+
+    {'Craftsman': {
+        'min_average': 3.0,               # over all rated skills
+        'min_category_average': 2.5,      # every category with ratings
+        'category_minimums': {'Plumbing': 3.5},   # names or ids, must be rated
+        'required_tools': ['Pipe Threader'],      # names or ids
+    }}
+
+Scoring is one vectorized pass over the skill state matrix for any number of
+employees. Scores are stored in the promotion_readiness table; writes
+re-score only the employees they touched (from refresh_rollups), and an
+employee who becomes ready raises an employee_tier_change notification for
+the managers.
+"""
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, insert, inspect
+
+from app import db
+from app.models.employee import Employee
+from app.models.evaluation import Evaluation, ToolEvaluation
+from app.models.rollup import PromotionReadiness
+from app.utils.cache import cached
+from app.utils.catalog import get_catalog
+from app.utils.employee_search import EMPLOYEE_TIERS
+from app.utils.notifications import notify_managers
+from app.utils.skill_state import SkillStateMatrix, get_skill_state
+
+# Requirements used when KPI_PROMOTION_THRESHOLDS is not set
+DEFAULT_PROMOTION_THRESHOLDS = {
+    'Handyman': {'min_average': 2.5},
+    'Craftsman': {'min_average': 3.0, 'min_category_average': 2.5},
+    'Master Craftsman': {'min_average': 3.5, 'min_category_average': 3.0},
+    'Lead Craftsman': {'min_average': 4.0, 'min_category_average': 3.5}
+}
+
+# Notification type raised when an employee becomes ready for promotion
+PROMOTION_NOTIFICATION_TYPE = 'employee_tier_change'
+
+# Decimal places of scores and averages in results
+SCORE_PRECISION = 2
+
+
+class PromotionResult(namedtuple('PromotionResult', 'employee_id name current_tier target_tier score ready gaps')):
+    """
+    Readiness of one employee for the next tier.
+
+    ``score`` is the share of the requirements met (partially met minimums
+    count pro rata), ``gaps`` lists the unmet requirements.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class TierRequirements(namedtuple('TierRequirements', 'configured category_minimums default_minimums '
+                                                      'average_minimums required_tools')):
+    """
+    Promotion requirements as arrays indexed by target tier position
+    (columns follow the catalog's skill categories and tools; NaN means no
+    minimum)
+    """
+    __slots__ = ()
+
+
+def get_promotion_thresholds():
+    """
+    Return the configured promotion thresholds (KPI_PROMOTION_THRESHOLDS)
+    """
+    return current_app.config.get('KPI_PROMOTION_THRESHOLDS') or DEFAULT_PROMOTION_THRESHOLDS
+
+
+def compile_requirements(thresholds, catalog):
+    """
+    Resolve promotion thresholds against the catalog
+
+    Args:
+        thresholds (dict): Requirements keyed by target tier
+        catalog: Taxonomy catalog (categories and tools are matched by id or name)
+
+    Returns:
+        TierRequirements
+    """
+    categories = catalog.skill_categories
+    tools = catalog.tools
+    category_columns = _column_lookup(categories, 'category_id')
+    tool_columns = _column_lookup(tools, 'tool_id')
+
+    tier_count = len(EMPLOYEE_TIERS)
+    configured = np.zeros(tier_count, dtype=bool)
+    category_minimums = np.full((tier_count, len(categories)), np.nan)
+    default_minimums = np.full(tier_count, np.nan)
+    average_minimums = np.full(tier_count, np.nan)
+    required_tools = np.zeros((tier_count, len(tools)), dtype=bool)
+
+    for tier, requirements in thresholds.items():
+        if tier not in EMPLOYEE_TIERS:
+            current_app.logger.warning('Ignoring promotion thresholds for unknown tier %r', tier)
+            continue
+        row = EMPLOYEE_TIERS.index(tier)
+        configured[row] = True
+        default_minimums[row] = _minimum(requirements.get('min_category_average'))
+        average_minimums[row] = _minimum(requirements.get('min_average'))
+
+        for category, minimum in (requirements.get('category_minimums') or {}).items():
+            column = _resolve(category_columns, category)
+            if column is None:
+                current_app.logger.warning('Ignoring promotion minimum for unknown category %r', category)
+                continue
+            category_minimums[row, column] = _minimum(minimum)
+
+        for tool in requirements.get('required_tools') or ():
+            column = _resolve(tool_columns, tool)
+            if column is None:
+                current_app.logger.warning('Ignoring unknown required tool %r', tool)
+                continue
+            required_tools[row, column] = True
+
+    return TierRequirements(configured, category_minimums, default_minimums, average_minimums, required_tools)
+
+
+def score_employees(employees, skill_state, operated_tools, requirements=None, catalog=None):
+    """
+    Score employees against the requirements of their next tier
+
+    Args:
+        employees (list): (employee_id, name, tier) rows
+        skill_state (SkillStateMatrix): Current ratings of (at least) these employees
+        operated_tools (numpy.ndarray): (employees x catalog tools) matrix of
+            the tools each employee can operate
+        requirements (TierRequirements): Compiled thresholds (configured ones by default)
+        catalog: Taxonomy catalog (the application's by default)
+
+    Returns:
+        list: PromotionResult per employee that has a configured next tier
+    """
+    catalog = catalog or get_catalog()
+    if requirements is None:
+        requirements = compile_requirements(get_promotion_thresholds(), catalog)
+
+    rows, targets = [], []
+    for position, (employee_id, name, tier) in enumerate(employees):
+        if tier not in EMPLOYEE_TIERS:
+            continue
+        target = EMPLOYEE_TIERS.index(tier) + 1
+        if target < len(EMPLOYEE_TIERS) and requirements.configured[target]:
+            rows.append(position)
+            targets.append(target)
+    if not rows:
+        return []
+
+    candidates = [employees[position] for position in rows]
+    employee_ids = [employee[0] for employee in candidates]
+    targets = np.array(targets, dtype=np.intp)
+    operated = operated_tools[rows]
+
+    # Category minimums: explicit ones always apply, the default one applies
+    # to the categories the employee has ratings in
+    averages = skill_state.category_averages(employee_ids, catalog.skill_categories).astype(np.float64)
+    explicit = requirements.category_minimums[targets]
+    default = requirements.default_minimums[targets][:, np.newaxis]
+    minimums = np.where(np.isnan(explicit), np.where(np.isnan(averages), np.nan, default), explicit)
+    applicable = ~np.isnan(minimums)
+    achieved = np.nan_to_num(averages, nan=0.0)
+    with np.errstate(invalid='ignore'):
+        category_ratio = np.where(applicable, np.clip(achieved / minimums, 0, 1), 0)
+        category_met = ~applicable | (achieved >= minimums)
+
+    overall = skill_state.overall_averages(employee_ids).astype(np.float64)
+    average_minimums = requirements.average_minimums[targets]
+    average_applicable = ~np.isnan(average_minimums)
+    overall_achieved = np.nan_to_num(overall, nan=0.0)
+    with np.errstate(invalid='ignore'):
+        average_ratio = np.where(average_applicable, np.clip(overall_achieved / average_minimums, 0, 1), 0)
+        average_met = ~average_applicable | (overall_achieved >= average_minimums)
+
+    required = requirements.required_tools[targets]
+    missing_tools = required & ~operated
+
+    criteria = applicable.sum(axis=1) + average_applicable + required.sum(axis=1)
+    satisfied = category_ratio.sum(axis=1) + average_ratio + (required & operated).sum(axis=1)
+    scores = np.where(criteria > 0, satisfied / np.maximum(criteria, 1), 0)
+    ready = ~np.isnan(overall) & category_met.all(axis=1) & average_met & ~missing_tools.any(axis=1)
+
+    results = []
+    for row, (employee_id, name, tier) in enumerate(candidates):
+        gaps = []
+        if not ready[row]:
+            if np.isnan(overall[row]):
+                gaps.append({'requirement': 'ratings'})
+            if not average_met[row]:
+                gaps.append({
+                    'requirement': 'average',
+                    'minimum': _round(average_minimums[row]),
+                    'current': _round(overall[row])
+                })
+            for column in np.flatnonzero(~category_met[row]):
+                category = catalog.skill_categories[column]
+                gaps.append({
+                    'requirement': 'category',
+                    'category_id': category.category_id,
+                    'name': category.name,
+                    'minimum': _round(minimums[row, column]),
+                    'current': _round(averages[row, column])
+                })
+            for column in np.flatnonzero(missing_tools[row]):
+                tool = catalog.tools[column]
+                gaps.append({'requirement': 'tool', 'tool_id': tool.tool_id, 'name': tool.name})
+
+        results.append(PromotionResult(
+            employee_id, name, tier, EMPLOYEE_TIERS[targets[row]],
+            _round(scores[row]), bool(ready[row]), gaps
+        ))
+    return results
+
+
+def operated_tool_matrix(employee_ids, tools):
+    """
+    Return an (employees x tools) boolean matrix of the tools each employee
+    can operate according to any evaluation (one grouped query)
+    """
+    matrix = np.zeros((len(employee_ids), len(tools)), dtype=bool)
+    if not employee_ids:
+        return matrix
+
+    rows = {employee_id: position for position, employee_id in enumerate(employee_ids)}
+    columns = {tool.tool_id: position for position, tool in enumerate(tools)}
+    query = db.session.query(
+        Evaluation.employee_id,
+        ToolEvaluation.tool_id
+    ).join(
+        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id.in_(employee_ids),
+        ToolEvaluation.can_operate == True
+    ).group_by(Evaluation.employee_id, ToolEvaluation.tool_id)
+    for employee_id, tool_id in query:
+        if tool_id in columns:
+            matrix[rows[employee_id], columns[tool_id]] = True
+    return matrix
+
+
+def promotion_readiness_available():
+    """
+    Return True if the database has the promotion_readiness table (checked once per app)
+    """
+    available = current_app.extensions.get('kpi_promotion_readiness')
+    if available is None:
+        available = inspect(db.engine).has_table(PromotionReadiness.__tablename__)
+        current_app.extensions['kpi_promotion_readiness'] = available
+    return available
+
+
+def refresh_promotion_readiness(employee_ids=None, notify=True):
+    """
+    Re-score employees and store their readiness (inside the caller's session)
+
+    Args:
+        employee_ids (iterable): Employees to re-score (all when None)
+        notify (bool): Notify managers about employees who became ready
+
+    Returns:
+        list: PromotionResult of the re-scored employees
+    """
+    if not promotion_readiness_available():
+        return []
+
+    if employee_ids is not None:
+        employee_ids = [employee_id for employee_id in set(employee_ids) if employee_id]
+        if not employee_ids:
+            return []
+
+    db.session.flush()
+
+    query = db.session.query(Employee.employee_id, Employee.name, Employee.tier).filter(Employee.active == True)
+    previous = db.session.query(
+        PromotionReadiness.employee_id, PromotionReadiness.target_tier, PromotionReadiness.ready
+    )
+    if employee_ids is not None:
+        query = query.filter(Employee.employee_id.in_(employee_ids))
+        previous = previous.filter(PromotionReadiness.employee_id.in_(employee_ids))
+    employees = [tuple(row) for row in query.order_by(Employee.employee_id)]
+    previous = {employee_id: (target_tier, ready) for employee_id, target_tier, ready in previous}
+
+    scored_ids = [employee[0] for employee in employees]
+    results = score_employees(
+        employees,
+        SkillStateMatrix.load(None, scored_ids if employee_ids is not None else None),
+        operated_tool_matrix(scored_ids, get_catalog().tools)
+    )
+
+    stale = delete(PromotionReadiness)
+    if employee_ids is not None:
+        stale = stale.where(PromotionReadiness.employee_id.in_(employee_ids))
+    db.session.execute(stale)
+    if results:
+        db.session.execute(insert(PromotionReadiness), [
+            {
+                'employee_id': result.employee_id,
+                'current_tier': result.current_tier,
+                'target_tier': result.target_tier,
+                'score': result.score,
+                'ready': result.ready,
+                'gaps': json.dumps(result.gaps)
+            }
+            for result in results
+        ])
+
+    if notify:
+        notify_managers(PROMOTION_NOTIFICATION_TYPE, [
+            (
+                'Ready for promotion',
+                f'{result.name} is ready for promotion to {result.target_tier}',
+                {
+                    'employee_id': result.employee_id,
+                    'employee_name': result.name,
+                    'tier': result.target_tier,
+                    'current_tier': result.current_tier,
+                    'score': result.score
+                }
+            )
+            for result in results
+            if result.ready and previous.get(result.employee_id) != (result.target_tier, True)
+        ])
+
+    return results
+
+
+def get_promotion_readiness():
+    """
+    Return the readiness of every active employee, best scores first.
+
+    Read from the promotion_readiness table, or scored in memory from the
+    shared skill state when the table does not exist yet; cached until the
+    next data write.
+
+    Returns:
+        list: PromotionResult per employee with a configured next tier
+    """
+    return cached('promotion.readiness', (), _load_promotion_readiness)
+
+
+def _load_promotion_readiness():
+    if promotion_readiness_available():
+        rows = db.session.query(
+            PromotionReadiness.employee_id,
+            Employee.name,
+            PromotionReadiness.current_tier,
+            PromotionReadiness.target_tier,
+            PromotionReadiness.score,
+            PromotionReadiness.ready,
+            PromotionReadiness.gaps
+        ).join(
+            Employee, PromotionReadiness.employee_id == Employee.employee_id
+        ).all()
+        results = [
+            PromotionResult(employee_id, name, current_tier, target_tier, score, bool(ready),
+                            json.loads(gaps) if gaps else [])
+            for employee_id, name, current_tier, target_tier, score, ready, gaps in rows
+        ]
+    else:
+        employees = [
+            tuple(row) for row in db.session.query(
+                Employee.employee_id, Employee.name, Employee.tier
+            ).filter(Employee.active == True).order_by(Employee.employee_id)
+        ]
+        results = score_employees(
+            employees,
+            get_skill_state(),
+            operated_tool_matrix([employee[0] for employee in employees], get_catalog().tools)
+        )
+
+    return sorted(results, key=lambda result: (not result.ready, -result.score, result.employee_id))
+
+
+def _column_lookup(items, id_attribute):
+    """
+    Map ids and lower-case names of catalog items to their column
+    """
+    lookup = {}
+    for column, item in enumerate(items):
+        lookup[getattr(item, id_attribute)] = column
+        lookup[item.name.strip().lower()] = column
+    return lookup
+
+
+def _resolve(lookup, key):
+    if isinstance(key, str):
+        key = key.strip()
+        return lookup.get(int(key)) if key.isdigit() else lookup.get(key.lower())
+    return lookup.get(key)
+
+
+def _minimum(value):
+    """
+    Return a configured minimum as a float (NaN when unset or not positive)
+    """
+    if value is None:
+        return np.nan
+    value = float(value)
+    return value if value > 0 else np.nan
+
+
+def _round(value):
+    value = float(value)
+    return None if math.isnan(value) else round(value, SCORE_PRECISION)
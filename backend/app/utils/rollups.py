@@ -0,0 +1,326 @@
+"""
+Incremental maintenance of the KPI rollup tables.
+
+Rollups are keyed by (employee_id, category_id, month). A write to an
+evaluation only touches the (employee_id, month) buckets of that evaluation,
+so every write recomputes those few buckets from the raw rows instead of
+rescanning the whole evaluation history.
+
+The latest rating of every (employee, skill) pair and the promotion
+readiness of every employee are maintained alongside; a write recomputes
+them only for the employees it touched.
+
+The tables are created by migrations v1.7.0 (rollups) and v1.9.0 (latest
+ratings); databases that have not been migrated yet are skipped, whether
+or not KPI_USE_ROLLUPS is enabled.
+"""
+from flask import current_app
+from sqlalchemy import func, delete, inspect, insert, tuple_
+
+from app import db
+from app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation
+from app.models.rollup import LatestSkillRating, SkillRatingRollup, ToolRatingRollup
+from app.models.skill import Skill
+from app.models.tool import Tool
+from app.utils.cache import bump_data_version
+from app.utils.promotion import refresh_promotion_readiness
+
+# Number of rows written per executemany batch during a rebuild
+REBUILD_BATCH_SIZE = 1000
+
+
+def evaluation_rollup_keys(evaluation):
+    """
+    Return the set of (employee_id, 'YYYY-MM') rollup buckets an evaluation touches
+    """
+    if not evaluation.employee_id or not evaluation.evaluation_date:
+        return set()
+    return {(int(evaluation.employee_id), evaluation.evaluation_date.strftime('%Y-%m'))}
+
+
+def rollups_available():
+    """
+    Return True if the database has both rollup tables (checked once per app)
+    """
+    available = current_app.extensions.get('kpi_rollups')
+    if available is None:
+        inspector = inspect(db.engine)
+        available = all(
+            inspector.has_table(model.__tablename__) for model in (SkillRatingRollup, ToolRatingRollup)
+        )
+        current_app.extensions['kpi_rollups'] = available
+    return available
+
+
+def latest_ratings_available():
+    """
+    Return True if the database has the latest_skill_ratings table (checked once per app)
+    """
+    available = current_app.extensions.get('kpi_latest_ratings')
+    if available is None:
+        available = inspect(db.engine).has_table(LatestSkillRating.__tablename__)
+        current_app.extensions['kpi_latest_ratings'] = available
+    return available
+
+
+def refresh_rollups(keys, skills=True, tools=True):
+    """
+    Recompute the rollup rows for the given (employee_id, month) buckets.
+
+    Runs inside the caller's session so the rollups are committed in the
+    same transaction as the evaluation write that triggered them.
+
+    Args:
+        keys (iterable): (employee_id, 'YYYY-MM') tuples to refresh
+        skills (bool): Refresh the skill rating rollups
+        tools (bool): Refresh the tool rollups
+    """
+    keys = list(set(keys))
+    if not keys or not (skills or tools):
+        return
+
+    db.session.flush()
+
+    employee_ids = {employee_id for employee_id, month in keys}
+    if not rollups_available():
+        if skills and latest_ratings_available():
+            refresh_latest_ratings(employee_ids)
+        refresh_promotion_readiness(employee_ids)
+        return
+
+    if skills:
+        db.session.execute(
+            delete(SkillRatingRollup).where(
+                tuple_(SkillRatingRollup.employee_id, SkillRatingRollup.month).in_(keys)
+            )
+        )
+    if tools:
+        db.session.execute(
+            delete(ToolRatingRollup).where(
+                tuple_(ToolRatingRollup.employee_id, ToolRatingRollup.month).in_(keys)
+            )
+        )
+
+    month = func.strftime('%Y-%m', Evaluation.evaluation_date)
+    condition = (
+        Evaluation.employee_id.in_(employee_ids),
+        tuple_(Evaluation.employee_id, month).in_(keys)
+    )
+
+    if skills:
+        skill_rows = _aggregate_skill_rollups(condition)
+        if skill_rows:
+            db.session.execute(insert(SkillRatingRollup), skill_rows)
+
+        if latest_ratings_available():
+            refresh_latest_ratings(employee_ids)
+
+    if tools:
+        tool_rows = _aggregate_tool_rollups(condition)
+        if tool_rows:
+            db.session.execute(insert(ToolRatingRollup), tool_rows)
+
+    refresh_promotion_readiness(employee_ids)
+
+
+def rebuild_rollups():
+    """
+    Rebuild both rollup tables and the latest ratings from the raw
+    evaluation data (backfill), re-score every employee's promotion
+    readiness and invalidate cached results.
+
+    Returns:
+        dict: Number of skill and tool rollup rows written
+    """
+    db.session.execute(delete(SkillRatingRollup))
+    db.session.execute(delete(ToolRatingRollup))
+    db.session.execute(delete(LatestSkillRating))
+
+    skill_rows = _aggregate_skill_rollups()
+    for start in range(0, len(skill_rows), REBUILD_BATCH_SIZE):
+        db.session.execute(insert(SkillRatingRollup), skill_rows[start:start + REBUILD_BATCH_SIZE])
+
+    tool_rows = _aggregate_tool_rollups()
+    for start in range(0, len(tool_rows), REBUILD_BATCH_SIZE):
+        db.session.execute(insert(ToolRatingRollup), tool_rows[start:start + REBUILD_BATCH_SIZE])
+
+    latest_rows = _latest_skill_ratings()
+    for start in range(0, len(latest_rows), REBUILD_BATCH_SIZE):
+        db.session.execute(insert(LatestSkillRating), latest_rows[start:start + REBUILD_BATCH_SIZE])
+
+    refresh_promotion_readiness(notify=False)
+    db.session.commit()
+    bump_data_version()
+
+    return {
+        'skill_rollups': len(skill_rows),
+        'tool_rollups': len(tool_rows),
+        'latest_ratings': len(latest_rows)
+    }
+
+
+def refresh_latest_ratings(employee_ids):
+    """
+    Recompute the latest skill ratings of the given employees (inside the
+    caller's session)
+    """
+    employee_ids = [employee_id for employee_id in set(employee_ids) if employee_id]
+    if not employee_ids:
+        return
+
+    db.session.execute(delete(LatestSkillRating).where(LatestSkillRating.employee_id.in_(employee_ids)))
+    rows = _latest_skill_ratings(employee_ids)
+    if rows:
+        db.session.execute(insert(LatestSkillRating), rows)
+
+
+def _latest_skill_ratings(employee_ids=None):
+    """
+    Return the most recent rating per (employee, skill), newest evaluation
+    first with ties broken by id
+    """
+    position = func.row_number().over(
+        partition_by=(Evaluation.employee_id, SkillEvaluation.skill_id),
+        order_by=(
+            Evaluation.evaluation_date.desc(),
+            Evaluation.evaluation_id.desc(),
+            SkillEvaluation.skill_evaluation_id.desc()
+        )
+    ).label('position')
+
+    query = db.session.query(
+        Evaluation.employee_id.label('employee_id'),
+        SkillEvaluation.skill_id.label('skill_id'),
+        SkillEvaluation.rating.label('rating'),
+        Evaluation.evaluation_id.label('evaluation_id'),
+        Evaluation.evaluation_date.label('evaluation_date'),
+        position
+    ).join(
+        Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).filter(
+        Evaluation.employee_id.isnot(None),
+        SkillEvaluation.skill_id.isnot(None)
+    )
+    if employee_ids is not None:
+        query = query.filter(Evaluation.employee_id.in_(employee_ids))
+
+    ranked = query.subquery()
+    return [
+        {
+            'employee_id': employee_id,
+            'skill_id': skill_id,
+            'rating': rating,
+            'evaluation_id': evaluation_id,
+            'evaluation_date': evaluation_date
+        }
+        for employee_id, skill_id, rating, evaluation_id, evaluation_date in db.session.query(
+            ranked.c.employee_id,
+            ranked.c.skill_id,
+            ranked.c.rating,
+            ranked.c.evaluation_id,
+            ranked.c.evaluation_date
+        ).filter(ranked.c.position == 1)
+    ]
+
+
+def _aggregate_skill_rollups(condition=()):
+    """
+    Aggregate raw skill ratings into rollup rows.
+
+    The latest rating of a bucket is the average rating the category received
+    on the most recent evaluation in that month.
+    """
+    month = func.strftime('%Y-%m', Evaluation.evaluation_date)
+    query = db.session.query(
+        Evaluation.employee_id,
+        Skill.category_id,
+        month,
+        Evaluation.evaluation_date,
+        Evaluation.evaluation_id,
+        SkillEvaluation.rating
+    ).join(
+        Evaluation, SkillEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).join(
+        Skill, SkillEvaluation.skill_id == Skill.skill_id
+    ).filter(
+        Evaluation.employee_id.isnot(None),
+        Skill.category_id.isnot(None),
+        *condition
+    )
+
+    buckets = {}
+    for employee_id, category_id, month_key, evaluation_date, evaluation_id, rating in query.yield_per(REBUILD_BATCH_SIZE):
+        bucket = buckets.get((employee_id, category_id, month_key))
+        if bucket is None:
+            bucket = buckets[(employee_id, category_id, month_key)] = {
+                'employee_id': employee_id,
+                'category_id': category_id,
+                'month': month_key,
+                'rating_sum': 0,
+                'rating_count': 0,
+                'latest': None,
+                'latest_sum': 0,
+                'latest_count': 0
+            }
+
+        bucket['rating_sum'] += rating
+        bucket['rating_count'] += 1
+
+        marker = (evaluation_date, evaluation_id)
+        if bucket['latest'] is None or marker > bucket['latest']:
+            bucket['latest'] = marker
+            bucket['latest_sum'] = rating
+            bucket['latest_count'] = 1
+        elif marker == bucket['latest']:
+            bucket['latest_sum'] += rating
+            bucket['latest_count'] += 1
+
+    rows = []
+    for bucket in buckets.values():
+        rows.append({
+            'employee_id': bucket['employee_id'],
+            'category_id': bucket['category_id'],
+            'month': bucket['month'],
+            'rating_sum': bucket['rating_sum'],
+            'rating_count': bucket['rating_count'],
+            'latest_rating': bucket['latest_sum'] / bucket['latest_count'],
+            'latest_date': bucket['latest'][0]
+        })
+    return rows
+
+
+def _aggregate_tool_rollups(condition=()):
+    """
+    Aggregate raw tool evaluations into rollup rows
+    """
+    month = func.strftime('%Y-%m', Evaluation.evaluation_date)
+    query = db.session.query(
+        Evaluation.employee_id,
+        Tool.category_id,
+        month,
+        func.count(ToolEvaluation.tool_evaluation_id),
+        func.sum(func.cast(ToolEvaluation.can_operate, db.Integer)),
+        func.sum(func.cast(ToolEvaluation.owns_tool, db.Integer))
+    ).join(
+        Evaluation, ToolEvaluation.evaluation_id == Evaluation.evaluation_id
+    ).join(
+        Tool, ToolEvaluation.tool_id == Tool.tool_id
+    ).filter(
+        Evaluation.employee_id.isnot(None),
+        Tool.category_id.isnot(None),
+        *condition
+    ).group_by(
+        Evaluation.employee_id, Tool.category_id, month
+    )
+
+    return [
+        {
+            'employee_id': employee_id,
+            'category_id': category_id,
+            'month': month_key,
+            'tool_count': tool_count,
+            'can_operate_count': can_operate_count or 0,
+            'owns_tool_count': owns_tool_count or 0
+        }
+        for employee_id, category_id, month_key, tool_count, can_operate_count, owns_tool_count in query.all()
+    ]
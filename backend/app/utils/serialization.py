@@ -0,0 +1,176 @@
+"""
+Serialization of models and query rows for the JSON APIs.
+
+A Serializer is built once per model (or listing query) from its columns:
+values are read with a single ``operator.attrgetter`` and only date and
+datetime columns are converted, with ``isoformat`` instead of a per-row
+``strftime``. Clients can ask for a sparse fieldset (``?fields=id,name``);
+the narrowed serializer is cached, so selecting fields costs nothing per
+row and unrequested columns are never read.
+
+When orjson is installed, ``init_serialization`` replaces the application's
+JSON provider so that ``jsonify`` encodes responses with orjson. Output is
+the same as the standard provider's except that non-ASCII text is written
+as UTF-8 rather than escaped; without orjson nothing changes.
+"""
+import operator
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, inspect as sa_inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Narrowed serializers kept per serializer (one per distinct fields= value)
+MAX_CACHED_FIELDSETS = 64
+
+
+def _isoformat_date(value):
+    return value.isoformat()
+
+
+def _isoformat_datetime(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _converter(column_type):
+    """
+    Return the value converter for a column type (None for JSON-native values)
+    """
+    if isinstance(column_type, DateTime):
+        return _isoformat_datetime
+    if isinstance(column_type, Date):
+        return _isoformat_date
+    return None
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated fields argument
+
+    Returns:
+        tuple: Requested field names, or None when all fields are wanted
+    """
+    fields = tuple(field.strip() for field in (value or '').split(',') if field.strip())
+    return fields or None
+
+
+class Serializer:
+    """
+    Converts objects with column attributes to JSON-ready dictionaries
+    """
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields (iterable): (name, converter) pairs in output order; the
+                converter is applied to non-null values and may be None
+        """
+        self.fields = tuple(fields)
+        self.names = tuple(name for name, _ in self.fields)
+        self._converters = tuple(
+            (index, convert) for index, (_, convert) in enumerate(self.fields) if convert is not None
+        )
+        self._fieldsets = {}
+
+        if len(self.names) == 1:
+            getter = operator.attrgetter(self.names[0])
+            self._values = lambda obj: (getter(obj),)
+        elif self.names:
+            self._values = operator.attrgetter(*self.names)
+        else:
+            self._values = lambda obj: ()
+
+    @classmethod
+    def for_columns(cls, columns):
+        """
+        Build a serializer from mapped attributes or labelled columns
+        """
+        return cls((column.key, _converter(column.type)) for column in columns)
+
+    def __call__(self, obj):
+        values = self._values(obj)
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = convert(value)
+        return dict(zip(self.names, values))
+
+    def many(self, objects):
+        """
+        Serialize an iterable of objects to a list
+        """
+        return [self(obj) for obj in objects]
+
+    def select(self, fields):
+        """
+        Return a serializer limited to the given fields (unknown names are
+        ignored, output follows the requested order)
+        """
+        if not fields:
+            return self
+
+        fields = tuple(fields)
+        serializer = self._fieldsets.get(fields)
+        if serializer is None:
+            available = dict(self.fields)
+            serializer = Serializer((name, available[name]) for name in dict.fromkeys(fields) if name in available)
+            if len(self._fieldsets) < MAX_CACHED_FIELDSETS:
+                self._fieldsets[fields] = serializer
+        return serializer
+
+
+@lru_cache(maxsize=None)
+def model_serializer(model):
+    """
+    Return the serializer of all column attributes of a model class
+    """
+    return Serializer.for_columns(
+        getattr(model, attribute.key) for attribute in sa_inspect(model).column_attrs
+    )
+
+
+def serialize(obj, fields=None):
+    """
+    Serialize a model instance, optionally limited to some fields
+    """
+    return model_serializer(type(obj)).select(fields)(obj)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider encoding with orjson.
+
+    Dates are passed to the standard ``default`` handler so they are
+    formatted like the default provider does; unsupported arguments or values fall back
+    to the standard library encoder.
+    """
+
+    _supported_arguments = frozenset(('indent', 'separators', 'sort_keys'))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or not self._supported_arguments.issuperset(kwargs):
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+
+def init_serialization(app):
+    """
+    Use the orjson provider for JSON responses when orjson is installed
+    """
+    if orjson is not None and app.config.get('KPI_ORJSON', True):
+        app.json = ORJSONProvider(app)
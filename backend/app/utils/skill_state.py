@@ -0,0 +1,232 @@
+"""
+Current skill state of every employee.
+
+The latest_skill_ratings table is loaded into an employees x skills NumPy
+matrix of current ratings (NaN where a skill was never rated) and rating
+dates. Current-state questions such as an employee's current category
+averages or who is rated at least 4 in a skill become array operations
+instead of scans over the evaluation history.
+
+The matrix is shared per worker. When the data version changes only the
+rows of employees whose profile version changed are reloaded (writers bump
+those before the data version); a change without touched employees, or a
+matrix older than KPI_SKILL_STATE_TTL, is reloaded in full.
+"""
+import threading
+import time
+from datetime import date
+
+import numpy as np
+from flask import current_app, g
+
+from app import db
+from app.models.rollup import LatestSkillRating
+from app.utils.cache import get_cache
+from app.utils.profiles import PROFILE_VERSION_PREFIX
+
+_load_lock = threading.Lock()
+
+
+class SkillStateMatrix:
+    """
+    Latest rating and rating date per employee (rows) and skill (columns)
+    """
+
+    def __init__(self, version, rows, employee_versions=None):
+        """
+        Args:
+            version: Data version the matrix was loaded for
+            rows (iterable): (employee_id, skill_id, rating, evaluation_date) tuples
+            employee_versions (dict): Profile version counters the rows were loaded at
+        """
+        rows = list(rows)
+        self.version = version
+        self.employee_versions = employee_versions or {}
+        self.loaded_at = time.monotonic()
+        self._allocate({row[0] for row in rows}, {row[1] for row in rows})
+        self._assign(rows)
+
+    def _allocate(self, employee_ids, skill_ids):
+        self.employee_ids = sorted(employee_ids)
+        self.skill_ids = sorted(skill_ids)
+        self.employee_positions = {employee_id: position for position, employee_id in enumerate(self.employee_ids)}
+        self.skill_positions = {skill_id: position for position, skill_id in enumerate(self.skill_ids)}
+
+        shape = (len(self.employee_ids), len(self.skill_ids))
+        self.ratings = np.full(shape, np.nan, dtype=np.float32)
+        self.dates = np.full(shape, np.datetime64('NaT'), dtype='datetime64[D]')
+
+    def _assign(self, rows):
+        if rows:
+            employee_ids, skill_ids, ratings, dates = zip(*rows)
+            row_indexes = [self.employee_positions[employee_id] for employee_id in employee_ids]
+            column_indexes = [self.skill_positions[skill_id] for skill_id in skill_ids]
+            self.ratings[row_indexes, column_indexes] = ratings
+            self.dates[row_indexes, column_indexes] = np.array(dates, dtype='datetime64[D]')
+
+    def with_employees(self, version, employee_ids, rows, employee_versions):
+        """
+        Return a copy of the matrix with the rows of some employees replaced
+
+        Args:
+            version: Data version of the new matrix
+            employee_ids (iterable): Employees whose ratings are replaced
+            rows (iterable): Their (employee_id, skill_id, rating, evaluation_date) tuples
+            employee_versions (dict): Profile version counters of the new matrix
+        """
+        rows = list(rows)
+        state = SkillStateMatrix.__new__(SkillStateMatrix)
+        state.version = version
+        state.employee_versions = employee_versions
+        state.loaded_at = self.loaded_at
+        state._allocate(
+            set(self.employee_ids) | {row[0] for row in rows},
+            set(self.skill_ids) | {row[1] for row in rows}
+        )
+
+        target_rows = [state.employee_positions[employee_id] for employee_id in self.employee_ids]
+        target_columns = [state.skill_positions[skill_id] for skill_id in self.skill_ids]
+        state.ratings[np.ix_(target_rows, target_columns)] = self.ratings
+        state.dates[np.ix_(target_rows, target_columns)] = self.dates
+
+        replaced = [state.employee_positions[employee_id]
+                    for employee_id in set(employee_ids) if employee_id in state.employee_positions]
+        state.ratings[replaced] = np.nan
+        state.dates[replaced] = np.datetime64('NaT')
+        state._assign(rows)
+        return state
+
+    @classmethod
+    def load(cls, version, employee_ids=None, employee_versions=None):
+        """
+        Load the matrix from the latest_skill_ratings table (one query),
+        optionally for some employees only
+        """
+        return cls(version, _latest_ratings(employee_ids), employee_versions)
+
+    def employee_ratings(self, employee_id):
+        """
+        Return {skill_id: (rating, date)} of an employee's current ratings
+        """
+        position = self.employee_positions.get(employee_id)
+        if position is None:
+            return {}
+        ratings = self.ratings[position]
+        dates = self.dates[position]
+        return {
+            self.skill_ids[column]: (int(ratings[column]), dates[column].astype(date))
+            for column in np.flatnonzero(~np.isnan(ratings))
+        }
+
+    def ratings_for(self, employee_ids, skill_ids):
+        """
+        Return the (employees x skills) sub-matrix of current ratings for the
+        given ids, NaN where an employee or skill has no rating
+        """
+        result = np.full((len(employee_ids), len(skill_ids)), np.nan, dtype=np.float32)
+        rows = [(index, self.employee_positions[employee_id])
+                for index, employee_id in enumerate(employee_ids) if employee_id in self.employee_positions]
+        columns = [(index, self.skill_positions[skill_id])
+                   for index, skill_id in enumerate(skill_ids) if skill_id in self.skill_positions]
+        if rows and columns:
+            target_rows, source_rows = zip(*rows)
+            target_columns, source_columns = zip(*columns)
+            result[np.ix_(target_rows, target_columns)] = self.ratings[np.ix_(source_rows, source_columns)]
+        return result
+
+    def category_averages(self, employee_ids, skill_categories):
+        """
+        Return an (employees x categories) matrix of average current ratings
+        (NaN where an employee has no rated skill in a category)
+
+        Args:
+            employee_ids (list): Row order of the result
+            skill_categories (iterable): Catalog categories with their skills
+        """
+        categories = list(skill_categories)
+        averages = np.full((len(employee_ids), len(categories)), np.nan, dtype=np.float32)
+        for column, category in enumerate(categories):
+            ratings = self.ratings_for(employee_ids, [skill.skill_id for skill in category.skills])
+            rated = ~np.isnan(ratings)
+            counts = rated.sum(axis=1)
+            sums = np.where(rated, ratings, 0).sum(axis=1)
+            np.divide(sums, counts, out=averages[:, column], where=counts > 0)
+        return averages
+
+    def overall_averages(self, employee_ids):
+        """
+        Return the average current rating over all skills per employee (NaN
+        for employees without ratings)
+        """
+        ratings = self.ratings_for(employee_ids, self.skill_ids)
+        rated = ~np.isnan(ratings)
+        counts = rated.sum(axis=1)
+        averages = np.full(len(employee_ids), np.nan, dtype=np.float32)
+        np.divide(np.where(rated, ratings, 0).sum(axis=1), counts, out=averages, where=counts > 0)
+        return averages
+
+    def employees_with_rating(self, skill_id, minimum_rating):
+        """
+        Return the ids of employees whose current rating of a skill is at least minimum_rating
+        """
+        column = self.skill_positions.get(skill_id)
+        if column is None:
+            return []
+        ratings = np.nan_to_num(self.ratings[:, column], nan=0)
+        return [self.employee_ids[row] for row in np.flatnonzero(ratings >= minimum_rating)]
+
+
+def get_skill_state():
+    """
+    Return the current skill state matrix of the application.
+
+    The data version is checked once per request; when it changed, the rows
+    of the employees whose profile version moved are reloaded.
+    """
+    if 'kpi_skill_state' in g:
+        return g.kpi_skill_state
+
+    cache = get_cache()
+    version = cache.get_version('data')
+    ttl = current_app.config.get('KPI_SKILL_STATE_TTL', 300)
+
+    def current(state):
+        return state is not None and state.version == version and \
+            (ttl is None or time.monotonic() - state.loaded_at <= ttl)
+
+    state = current_app.extensions.get('kpi_skill_state')
+    if not current(state):
+        with _load_lock:
+            state = current_app.extensions.get('kpi_skill_state')
+            if not current(state):
+                # Read after the data version: writers bump the employee
+                # versions first, so every write counted in it is listed here
+                employee_versions = cache.get_versions(PROFILE_VERSION_PREFIX)
+                changed = None
+                if state is not None and state.version != version and \
+                        (ttl is None or time.monotonic() - state.loaded_at <= ttl):
+                    changed = {
+                        int(name[len(PROFILE_VERSION_PREFIX):])
+                        for name, employee_version in employee_versions.items()
+                        if state.employee_versions.get(name) != employee_version
+                    }
+                if changed:
+                    state = state.with_employees(version, changed, _latest_ratings(changed), employee_versions)
+                else:
+                    state = SkillStateMatrix.load(version, employee_versions=employee_versions)
+                current_app.extensions['kpi_skill_state'] = state
+
+    g.kpi_skill_state = state
+    return state
+
+
+def _latest_ratings(employee_ids=None):
+    query = db.session.query(
+        LatestSkillRating.employee_id,
+        LatestSkillRating.skill_id,
+        LatestSkillRating.rating,
+        LatestSkillRating.evaluation_date
+    )
+    if employee_ids is not None:
+        query = query.filter(LatestSkillRating.employee_id.in_(list(employee_ids)))
+    return query.all()
@@ -0,0 +1,293 @@
+"""
+Dense monthly time series for KPI charts and reports.
+
+A MonthIndex is a precomputed calendar shared by every series covering the
+same window. A MonthlySeries stores rating sums and counts as NumPy matrices
+(rows x months), so averages for a whole chart are derived with one
+vectorized division instead of string-keyed dictionary lookups.
+
+Long histories are downsampled before they reach a chart: monthly buckets are
+merged into quarters or years (re-averaging from the sums and counts) and the
+number of points per series is capped.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Bucket sizes in the order they are tried when downsampling
+GRANULARITIES = ('month', 'quarter', 'year')
+
+# Default maximum number of points plotted per chart series
+MAX_CHART_POINTS = 24
+
+
+class MonthIndex:
+    """
+    Immutable calendar of consecutive periods with fast key -> position lookup.
+
+    ``months`` holds the first day of every period. Keys are 'YYYY-MM' for
+    monthly indexes, 'YYYY-Qn' for quarterly and 'YYYY' for yearly ones; a
+    'YYYY-MM' key always resolves to the period that contains that month.
+    """
+
+    def __init__(self, months, granularity='month'):
+        self.months = tuple(months)
+        self.granularity = granularity
+        self.keys = tuple(period_key(month, granularity) for month in self.months)
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+
+    @classmethod
+    def between(cls, start_date, end_date):
+        """
+        Return the (shared) monthly index of every month between two dates (inclusive)
+        """
+        return _month_index(start_date.replace(day=1), end_date.replace(day=1))
+
+    def __len__(self):
+        return len(self.months)
+
+    def __iter__(self):
+        return iter(self.months)
+
+    def position(self, key):
+        """
+        Return the column of a period or 'YYYY-MM' key, or None if it is outside the index
+        """
+        position = self.positions.get(key)
+        if position is None and self.granularity != 'month' and len(key) == 7 and key[4] == '-':
+            year, month = key.split('-')
+            position = self.positions.get(period_key_for(int(year), int(month), self.granularity))
+        return position
+
+
+@lru_cache(maxsize=64)
+def _month_index(start_month, end_month):
+    return MonthIndex(month_range(start_month, end_month))
+
+
+def period_key(date, granularity='month'):
+    """
+    Return the key of the period containing a date
+    """
+    return period_key_for(date.year, date.month, granularity)
+
+
+def period_key_for(year, month, granularity='month'):
+    """
+    Return the key of the period containing a year and month
+    """
+    if granularity == 'year':
+        return f'{year:04d}'
+    if granularity == 'quarter':
+        return f'{year:04d}-Q{(month - 1) // 3 + 1}'
+    return f'{year:04d}-{month:02d}'
+
+
+def period_start(date, granularity='month'):
+    """
+    Return the first day of the period containing a date
+    """
+    if granularity == 'year':
+        return date.replace(month=1, day=1)
+    if granularity == 'quarter':
+        return date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+    return date.replace(day=1)
+
+
+def month_range(start_date, end_date):
+    """
+    Return the first day of every month between two dates (inclusive)
+    """
+    months = []
+    current_date = start_date.replace(day=1)
+    while current_date <= end_date:
+        months.append(current_date)
+        current_date = next_month(current_date)
+    return months
+
+
+def next_month(date):
+    """
+    Return the first day of the month following the given date
+    """
+    if date.month == 12:
+        return date.replace(year=date.year + 1, month=1, day=1)
+    return date.replace(month=date.month + 1, day=1)
+
+
+class MonthlySeries:
+    """
+    Rating sums and counts per row (category, skill, ...) and month.
+
+    Supports ``series.get((row_id, 'YYYY-MM'), default)`` so templates written
+    against the old dictionary of averages keep working.
+    """
+
+    def __init__(self, row_ids, month_index):
+        self.row_ids = list(row_ids)
+        self.month_index = month_index
+        self.row_positions = {row_id: position for position, row_id in enumerate(self.row_ids)}
+        self.sums = np.zeros((len(self.row_ids), len(month_index)), dtype=np.float64)
+        self.counts = np.zeros((len(self.row_ids), len(month_index)), dtype=np.int64)
+        self._averages = None
+
+    @classmethod
+    def from_totals(cls, row_ids, month_index, rows):
+        """
+        Build a series from (row_id, 'YYYY-MM', rating_sum, rating_count) rows,
+        such as the result of a single GROUP BY query. Rows outside the index
+        are ignored.
+        """
+        series = cls(row_ids, month_index)
+        series.add_totals(rows)
+        return series
+
+    @classmethod
+    def from_ratings(cls, row_ids, month_index, ratings):
+        """
+        Build a series from individual (row_id, 'YYYY-MM', rating) values
+        """
+        return cls.from_totals(
+            row_ids, month_index,
+            ((row_id, month_key, rating, 1) for row_id, month_key, rating in ratings)
+        )
+
+    def add_totals(self, rows):
+        """
+        Accumulate (row_id, 'YYYY-MM', rating_sum, rating_count) rows
+        """
+        row_indexes = []
+        column_indexes = []
+        sums = []
+        counts = []
+        for row_id, month_key, rating_sum, rating_count in rows:
+            row = self.row_positions.get(row_id)
+            column = self.month_index.position(month_key)
+            if row is None or column is None:
+                continue
+            row_indexes.append(row)
+            column_indexes.append(column)
+            sums.append(rating_sum or 0)
+            counts.append(rating_count or 0)
+
+        if row_indexes:
+            np.add.at(self.sums, (row_indexes, column_indexes), sums)
+            np.add.at(self.counts, (row_indexes, column_indexes), counts)
+        self._averages = None
+
+    @property
+    def averages(self):
+        """
+        Matrix of average ratings (0 where a month has no ratings)
+        """
+        if self._averages is None:
+            self._averages = np.divide(
+                self.sums, self.counts,
+                out=np.zeros_like(self.sums),
+                where=self.counts > 0
+            )
+        return self._averages
+
+    def row(self, row_id, precision=None):
+        """
+        Return the averages of one row as a list (zeros if unknown), optionally
+        rounded to keep chart payloads small
+        """
+        position = self.row_positions.get(row_id)
+        if position is None:
+            return [0.0] * len(self.month_index)
+        values = self.averages[position]
+        if precision is not None:
+            values = np.round(values, precision)
+        return values.tolist()
+
+    def trend(self, row_id):
+        """
+        Return [{'month', 'average'}] for the months of a row that have ratings
+        """
+        position = self.row_positions.get(row_id)
+        if position is None:
+            return []
+        columns = np.flatnonzero(self.counts[position])
+        return [
+            {'month': self.month_index.keys[column], 'average': float(self.averages[position, column])}
+            for column in columns
+        ]
+
+    def get(self, key, default=None):
+        """
+        Return the average for a (row_id, 'YYYY-MM') key
+        """
+        row_id, month_key = key
+        row = self.row_positions.get(row_id)
+        column = self.month_index.position(month_key)
+        if row is None or column is None:
+            return default
+        return float(self.averages[row, column])
+
+    def resample(self, granularity):
+        """
+        Merge the periods of this series into coarser buckets.
+
+        Sums and counts are added per bucket, so the resulting averages are
+        weighted by the number of ratings rather than averaged averages.
+        """
+        if granularity == self.month_index.granularity:
+            return self
+
+        bucket_months = []
+        columns = []
+        for month in self.month_index.months:
+            start = period_start(month, granularity)
+            if not bucket_months or bucket_months[-1] != start:
+                bucket_months.append(start)
+            columns.append(len(bucket_months) - 1)
+
+        # One-hot (periods x buckets) matrix turns the merge into a product
+        assignment = np.zeros((len(self.month_index), len(bucket_months)), dtype=np.int64)
+        assignment[np.arange(len(columns)), columns] = 1
+
+        series = MonthlySeries(self.row_ids, MonthIndex(bucket_months, granularity))
+        series.sums = self.sums @ assignment
+        series.counts = self.counts @ assignment
+        return series
+
+    def tail(self, count):
+        """
+        Return a series limited to the most recent periods
+        """
+        if len(self.month_index) <= count:
+            return self
+
+        index = MonthIndex(self.month_index.months[-count:], self.month_index.granularity)
+        series = MonthlySeries(self.row_ids, index)
+        series.sums = self.sums[:, -count:].copy()
+        series.counts = self.counts[:, -count:].copy()
+        return series
+
+    def __contains__(self, key):
+        row_id, month_key = key
+        return row_id in self.row_positions and self.month_index.position(month_key) is not None
+
+    def items(self):
+        """
+        Iterate over ((row_id, key), average) pairs like the old dictionary
+        """
+        averages = self.averages
+        for row, row_id in enumerate(self.row_ids):
+            for column, month_key in enumerate(self.month_index.keys):
+                yield (row_id, month_key), float(averages[row, column])
+
+
+def downsample(series, max_points=MAX_CHART_POINTS):
+    """
+    Return a series with at most max_points periods.
+
+    The finest granularity (month, quarter, year) that fits is used; if even
+    yearly buckets do not fit, only the most recent years are kept.
+    """
+    for granularity in GRANULARITIES:
+        resampled = series.resample(granularity)
+        if len(resampled.month_index) <= max_points:
+            return resampled
+    return resampled.tail(max_points)
@@ -0,0 +1,74 @@
+"""
+Add the employee search index.
+
+This migration adds employees_fts, an FTS5 index over employee names and
+phone numbers (as written and as bare digits), and the triggers that keep it
+in sync with the employees table.
+"""
+
+version = "1.10.0"
+description = "Add employee search index"
+
+# Phone number with punctuation removed
+PHONE_DIGITS = "{}"
+for character in ('-', ' ', '(', ')', '.', '+', '/'):
+    PHONE_DIGITS = f"replace({PHONE_DIGITS}, '{character}', '')"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts
+    USING fts5(name, phone, tokenize = 'unicode61', prefix = '2 3')
+    ''')
+
+    new_phone = PHONE_DIGITS.format("coalesce(new.phone, '')")
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS employees_fts_insert AFTER INSERT ON employees BEGIN
+        INSERT INTO employees_fts(rowid, name, phone)
+        VALUES (new.employee_id, new.name, coalesce(new.phone, '') || ' ' || {new_phone});
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS employees_fts_delete AFTER DELETE ON employees BEGIN
+        DELETE FROM employees_fts WHERE rowid = old.employee_id;
+    END
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS employees_fts_update AFTER UPDATE OF name, phone ON employees BEGIN
+        DELETE FROM employees_fts WHERE rowid = old.employee_id;
+        INSERT INTO employees_fts(rowid, name, phone)
+        VALUES (new.employee_id, new.name, coalesce(new.phone, '') || ' ' || {new_phone});
+    END
+    ''')
+
+    # Index the existing employees
+    phone = PHONE_DIGITS.format("coalesce(phone, '')")
+    cursor.execute('DELETE FROM employees_fts')
+    cursor.execute(f'''
+    INSERT INTO employees_fts(rowid, name, phone)
+    SELECT employee_id, name, coalesce(phone, '') || ' ' || {phone} FROM employees
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP TRIGGER IF EXISTS employees_fts_update')
+    cursor.execute('DROP TRIGGER IF EXISTS employees_fts_delete')
+    cursor.execute('DROP TRIGGER IF EXISTS employees_fts_insert')
+    cursor.execute('DROP TABLE IF EXISTS employees_fts')
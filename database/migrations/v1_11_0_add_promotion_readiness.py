@@ -0,0 +1,48 @@
+"""
+Add the promotion readiness table.
+
+This migration adds promotion_readiness, which holds the readiness score of
+every active employee for the next tier and is re-scored on evaluation
+writes. Run ``flask score-promotions`` after upgrading to backfill it.
+"""
+
+version = "1.11.0"
+description = "Add promotion readiness"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS promotion_readiness (
+        employee_id INTEGER PRIMARY KEY,
+        current_tier VARCHAR(20) NOT NULL,
+        target_tier VARCHAR(20) NOT NULL,
+        score FLOAT NOT NULL DEFAULT 0,
+        ready BOOLEAN NOT NULL DEFAULT 0,
+        gaps TEXT,
+        scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_promotion_readiness_score
+    ON promotion_readiness(ready, score)
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP TABLE IF EXISTS promotion_readiness')
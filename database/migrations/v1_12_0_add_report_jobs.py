@@ -0,0 +1,53 @@
+"""
+Track background report jobs in saved_reports.
+
+Reports generated by the job queue are saved_reports rows that move
+through the statuses queued, running, done and failed. This migration adds
+the status, output format, file size, error and completion time columns.
+"""
+
+version = "1.12.0"
+description = "Add report job columns"
+
+# Columns added to saved_reports
+JOB_COLUMNS = (
+    ('status', 'TEXT'),
+    ('file_format', 'TEXT'),
+    ('file_size', 'INTEGER'),
+    ('error_message', 'TEXT'),
+    ('completed_at', 'TIMESTAMP')
+)
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('PRAGMA table_info(saved_reports)')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, column_type in JOB_COLUMNS:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE saved_reports ADD COLUMN {name} {column_type}')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_saved_reports_status
+    ON saved_reports(status)
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP INDEX IF EXISTS idx_saved_reports_status')
+    for name, column_type in reversed(JOB_COLUMNS):
+        cursor.execute(f'ALTER TABLE saved_reports DROP COLUMN {name}')
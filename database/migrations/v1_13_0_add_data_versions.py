@@ -0,0 +1,46 @@
+"""
+Add the data version table.
+
+Cached dashboard panels, ETags, report files and in-memory snapshots are
+keyed by version counters that are bumped on every evaluation, employee and
+taxonomy write. Kept in the database, every worker process sees every bump.
+The 'epoch' row is a random id of the database, so counters of a recreated
+database never repeat an old version stamp.
+"""
+import secrets
+
+version = "1.13.0"
+description = "Add data versions"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    ''')
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('epoch', ?)",
+        (secrets.randbits(48),)
+    )
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP TABLE IF EXISTS data_versions')
@@ -0,0 +1,72 @@
+"""
+Add KPI rollup tables.
+
+This migration adds monthly rollup tables keyed by (employee_id, category_id,
+month) that are maintained incrementally on evaluation writes. Run
+``flask rebuild-rollups`` after upgrading to backfill them.
+"""
+
+version = "1.7.0"
+description = "Add KPI rollup tables"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    # Create skill_rating_rollups table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS skill_rating_rollups (
+        employee_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        month TEXT NOT NULL,  -- YYYY-MM
+        rating_sum INTEGER NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0,
+        latest_rating REAL,
+        latest_date DATE,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (employee_id, category_id, month)
+    )
+    ''')
+
+    # Create tool_rating_rollups table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tool_rating_rollups (
+        employee_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        month TEXT NOT NULL,  -- YYYY-MM
+        tool_count INTEGER NOT NULL DEFAULT 0,
+        can_operate_count INTEGER NOT NULL DEFAULT 0,
+        owns_tool_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (employee_id, category_id, month)
+    )
+    ''')
+
+    # Index for dashboard queries that span all employees
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_skill_rating_rollups_month
+    ON skill_rating_rollups(month, category_id)
+    ''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_tool_rating_rollups_month
+    ON tool_rating_rollups(month, category_id)
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP TABLE IF EXISTS tool_rating_rollups')
+    cursor.execute('DROP TABLE IF EXISTS skill_rating_rollups')
@@ -0,0 +1,48 @@
+"""
+Add indexes for the paginated evaluation listing.
+
+The listing is paged with a keyset cursor on (evaluation_date,
+evaluation_id) and counts each evaluation's skill and tool rows, so both
+the sort key and the child tables' evaluation_id columns are indexed.
+"""
+
+version = "1.8.0"
+description = "Add evaluation listing indexes"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_evaluations_date_id
+    ON evaluations(evaluation_date, evaluation_id)
+    ''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_skill_evaluations_evaluation_id
+    ON skill_evaluations(evaluation_id)
+    ''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_tool_evaluations_evaluation_id
+    ON tool_evaluations(evaluation_id)
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP INDEX IF EXISTS ix_tool_evaluations_evaluation_id')
+    cursor.execute('DROP INDEX IF EXISTS ix_skill_evaluations_evaluation_id')
+    cursor.execute('DROP INDEX IF EXISTS idx_evaluations_date_id')
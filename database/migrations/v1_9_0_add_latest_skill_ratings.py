@@ -0,0 +1,49 @@
+"""
+Add the latest skill rating table.
+
+This migration adds latest_skill_ratings, which holds the most recent rating
+of every skill per employee and is maintained on evaluation writes. Run
+``flask rebuild-rollups`` after upgrading to backfill it.
+"""
+
+version = "1.9.0"
+description = "Add latest skill ratings"
+
+def upgrade(conn):
+    """
+    Upgrade the database to this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS latest_skill_ratings (
+        employee_id INTEGER NOT NULL,
+        skill_id INTEGER NOT NULL,
+        rating INTEGER NOT NULL,
+        evaluation_id INTEGER NOT NULL,
+        evaluation_date DATE NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (employee_id, skill_id)
+    )
+    ''')
+
+    # Index for "who currently has skill X at rating Y" lookups
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_latest_skill_ratings_skill
+    ON latest_skill_ratings(skill_id, rating)
+    ''')
+
+
+def downgrade(conn):
+    """
+    Downgrade the database from this version.
+
+    Args:
+        conn: SQLite database connection
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('DROP TABLE IF EXISTS latest_skill_ratings')
@@ -0,0 +1,127 @@
+"""
+Unit tests for the result cache.
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from kpi_system.backend.app import db
+from kpi_system.backend.app.utils.cache import (
+    DatabaseVersionStore, LRUCache, ResultCache, SqliteCacheTier, data_etag
+)
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test that the LRU cache drops the oldest unused entry when full."""
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == (True, 1)
+    assert cache.get('b') == (False, None)
+    assert cache.get('c') == (True, 3)
+
+def test_lru_cache_expires_entries():
+    """Test that entries past their time to live are not returned."""
+    cache = LRUCache(max_entries=2, ttl=-1)
+    cache.set('a', 1)
+
+    assert cache.get('a') == (False, None)
+
+def test_result_cache_bump_version_invalidates():
+    """Test that bumping the data version forces a recompute."""
+    cache = ResultCache(max_entries=8, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute('panels', ('all',), compute) == 1
+    assert cache.get_or_compute('panels', ('all',), compute) == 1
+
+    cache.bump_version()
+
+    assert cache.get_or_compute('panels', ('all',), compute) == 2
+
+def test_shared_tier_is_visible_to_other_workers(tmp_path):
+    """Test that entries and versions in the sqlite tier are shared between caches."""
+    path = str(tmp_path / 'cache.db')
+    first = ResultCache(shared=SqliteCacheTier(path))
+    second = ResultCache(shared=SqliteCacheTier(path))
+
+    first.get_or_compute('panels', ('all',), lambda: {'total': 3})
+
+    assert second.get_or_compute('panels', ('all',), lambda: {'total': 0}) == {'total': 3}
+
+    second.bump_version()
+
+    assert first.get_or_compute('panels', ('all',), lambda: {'total': 4}) == {'total': 4}
+
+def test_version_stamp_differs_between_restarts():
+    """Test that process-local caches never repeat a version stamp."""
+    first = ResultCache(max_entries=8, ttl=60)
+    second = ResultCache(max_entries=8, ttl=60)
+
+    assert first.version_stamp() != second.version_stamp()
+    stamp = first.version_stamp()
+    first.bump_version()
+    assert first.version_stamp() != stamp
+
+def test_data_etag_requires_shared_versions():
+    """Test that no version ETag is issued while the data version is local to the process."""
+    app = Flask(__name__)
+    app.extensions['kpi_cache'] = ResultCache(max_entries=8, ttl=60)
+    with app.app_context():
+        assert data_etag('dashboard.summary', ('all',)) is None
+
+def test_data_etag_is_shared_through_the_shared_tier(tmp_path):
+    """Test that workers sharing the sqlite tier agree on ETags."""
+    path = str(tmp_path / 'cache.db')
+    etags = []
+    for _ in range(2):
+        app = Flask(__name__)
+        app.extensions['kpi_cache'] = ResultCache(shared=SqliteCacheTier(path))
+        with app.app_context():
+            etags.append(data_etag('dashboard.summary', ('all',)))
+
+    assert etags[0] == etags[1]
+
+def make_worker(path):
+    """Return an app whose result cache keeps its versions in the database at path."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    app.extensions['kpi_cache'] = ResultCache(max_entries=8, ttl=60, database=DatabaseVersionStore())
+    return app
+
+def test_database_versions_are_shared_between_workers(tmp_path):
+    """Test that a bump in one worker changes the version and ETag seen by another."""
+    path = tmp_path / 'kpi.db'
+    first, second = make_worker(path), make_worker(path)
+    with first.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'))
+            conn.execute(text("INSERT INTO data_versions (name, version) VALUES ('epoch', 42)"))
+        cache = first.extensions['kpi_cache']
+        assert cache.versions_shared
+        assert cache.version_stamp() == '2a.0'
+        etag = data_etag('dashboard.summary', ('all',))
+
+    with second.app_context():
+        assert data_etag('dashboard.summary', ('all',)) == etag
+        second.extensions['kpi_cache'].bump_version()
+        assert second.extensions['kpi_cache'].get_version() == 1
+
+    with first.app_context():
+        assert first.extensions['kpi_cache'].get_version() == 1
+        assert data_etag('dashboard.summary', ('all',)) != etag
+
+def test_database_versions_fall_back_without_table(tmp_path):
+    """Test that databases without data_versions keep process-local versions."""
+    app = make_worker(tmp_path / 'kpi.db')
+    with app.app_context():
+        cache = app.extensions['kpi_cache']
+        assert not cache.versions_shared
+        cache.bump_version()
+        assert cache.get_version() == 1
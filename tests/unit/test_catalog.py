@@ -0,0 +1,54 @@
+"""
+Unit tests for the taxonomy catalog snapshot.
+"""
+import pytest
+from flask import Flask
+from kpi_system.backend.app.utils import catalog as catalog_module
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Replace Catalog.load with a stub recording every reload."""
+    calls = []
+
+    def load(version):
+        calls.append(version)
+        return catalog_module.Catalog(version, [], [], [], [])
+
+    monkeypatch.setattr(catalog_module.Catalog, 'load', staticmethod(load))
+    return calls
+
+def test_get_catalog_reuses_snapshot_within_ttl(loads):
+    """Test that a fresh snapshot is reused by later requests."""
+    app = Flask(__name__)
+    app.config['KPI_CATALOG_TTL'] = 60
+
+    for _ in range(2):
+        with app.app_context():
+            catalog_module.get_catalog()
+
+    assert len(loads) == 1
+
+def test_get_catalog_reloads_after_ttl(loads):
+    """Test that a snapshot older than the TTL is reloaded even without a version bump."""
+    app = Flask(__name__)
+    app.config['KPI_CATALOG_TTL'] = 0
+
+    with app.app_context():
+        first = catalog_module.get_catalog()
+    first.loaded_at -= 1
+    with app.app_context():
+        second = catalog_module.get_catalog()
+
+    assert len(loads) == 2
+    assert second is not first
+
+def test_get_catalog_fresh_reloads(loads):
+    """Test that fresh=True bypasses the request and worker snapshots."""
+    app = Flask(__name__)
+    app.config['KPI_CATALOG_TTL'] = 60
+
+    with app.app_context():
+        catalog_module.get_catalog()
+        catalog_module.get_catalog(fresh=True)
+
+    assert len(loads) == 2
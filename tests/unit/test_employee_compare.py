@@ -0,0 +1,49 @@
+"""
+Unit tests for the employee comparison helpers.
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from kpi_system.backend.app import db
+from kpi_system.backend.app.utils import employee_compare as employee_compare_module
+from kpi_system.backend.app.utils.cache import DatabaseVersionStore, ResultCache, get_data_version
+from kpi_system.backend.app.utils.employee_compare import compare_employees, parse_employee_ids
+
+def test_parse_employee_ids():
+    """Test that comma-separated and repeated ids are merged in order."""
+    assert parse_employee_ids(['3,1', '2', ' 1 ,']) == [3, 1, 2]
+    assert parse_employee_ids([]) == []
+
+def test_parse_employee_ids_rejects_garbage():
+    """Test that non-numeric ids are rejected."""
+    with pytest.raises(ValueError):
+        parse_employee_ids(['1,abc'])
+
+def test_compare_employees_follows_writes_of_other_workers(tmp_path, monkeypatch):
+    """Test that a cached comparison is rebuilt after another worker bumps the data version."""
+    builds = []
+
+    def build_comparison(employee_ids):
+        builds.append(get_data_version())
+        return {'employee_ids': list(employee_ids), 'version': get_data_version()}
+
+    monkeypatch.setattr(employee_compare_module, 'build_comparison', build_comparison)
+    first, second = Flask(__name__), Flask(__name__)
+    for app in (first, second):
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'kpi.db'}"
+        db.init_app(app)
+        app.extensions['kpi_cache'] = ResultCache(max_entries=8, ttl=60, database=DatabaseVersionStore())
+
+    with first.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'))
+        assert compare_employees([1, 2]) == {'employee_ids': [1, 2], 'version': 0}
+    with first.app_context():
+        assert compare_employees([1, 2])['version'] == 0
+
+    with second.app_context():
+        second.extensions['kpi_cache'].bump_version('data')
+
+    with first.app_context():
+        assert compare_employees([1, 2]) == {'employee_ids': [1, 2], 'version': 1}
+    assert builds == [0, 1]
@@ -0,0 +1,16 @@
+"""
+Unit tests for the employee search helpers.
+"""
+import pytest
+from kpi_system.backend.app.utils.employee_search import build_match_query
+
+def test_build_match_query():
+    """Test that every word of a search becomes a prefix term."""
+    assert build_match_query('jo smi') == '"jo"* "smi"*'
+    assert build_match_query('(555) 12') == '"555"* "12"*'
+
+def test_build_match_query_without_words():
+    """Test that searches without words produce no query."""
+    assert build_match_query('') is None
+    assert build_match_query(None) is None
+    assert build_match_query('"*-') is None
@@ -0,0 +1,148 @@
+"""
+Unit tests for the evaluation import.
+"""
+import io
+import json
+import pytest
+from types import SimpleNamespace
+from flask import Flask
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+from kpi_system.backend.app import db
+from kpi_system.backend.app.models.employee import Employee
+from kpi_system.backend.app.models.evaluation import Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill
+from kpi_system.backend.app.utils import evaluation_import as evaluation_import_module
+from kpi_system.backend.app.utils.evaluation_import import (
+    detect_format, import_evaluations, iter_csv_rows, iter_json_rows
+)
+
+HEADER = 'employee_id,evaluator_id,evaluation_date,skill_id,skill,rating,tool,can_operate,special_skill\n'
+
+@pytest.fixture
+def import_app(tmp_path, monkeypatch):
+    """App with two employees, two skills and one tool."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'kpi.db'}"
+    db.init_app(app)
+
+    skills = [SimpleNamespace(skill_id=1, name='Framing'), SimpleNamespace(skill_id=2, name='Roofing')]
+    tools = [SimpleNamespace(tool_id=7, name='Nail Gun')]
+    monkeypatch.setattr(evaluation_import_module, 'get_catalog', lambda: SimpleNamespace(
+        skills=skills, tools=tools,
+        skills_by_id={skill.skill_id: skill for skill in skills},
+        tools_by_id={tool.tool_id: tool for tool in tools}
+    ))
+
+    with app.app_context():
+        tables = [model.__table__ for model in (Employee, Evaluation, SkillEvaluation, ToolEvaluation, SpecialSkill)]
+        db.metadata.create_all(db.engine, tables=tables)
+        db.session.execute(insert(Employee.__table__), [
+            {'employee_id': 1, 'name': 'Ann', 'tier': 'Apprentice'},
+            {'employee_id': 2, 'name': 'Bob', 'tier': 'Journeyman'}
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def count(model):
+    return db.session.execute(select(func.count()).select_from(model.__table__)).scalar()
+
+def test_iter_json_rows_accepts_array_and_lines():
+    """Test that JSON arrays and JSON Lines yield the same rows."""
+    rows = [{'employee_id': 1, 'skill_id': 2, 'rating': 4}, {'employee_id': 1, 'skill_id': 3, 'rating': 5}]
+
+    as_array = io.StringIO('[{"employee_id": 1, "skill_id": 2, "rating": 4},\n{"employee_id": 1, "skill_id": 3, "rating": 5}]')
+    as_lines = io.StringIO('{"employee_id": 1, "skill_id": 2, "rating": 4}\n\n{"employee_id": 1, "skill_id": 3, "rating": 5}\n')
+
+    assert list(iter_json_rows(as_array)) == rows
+    assert list(iter_json_rows(as_lines)) == rows
+
+def test_iter_csv_rows():
+    """Test that CSV rows are keyed by the header."""
+    rows = list(iter_csv_rows(io.StringIO('employee_id,skill,rating\n1,Framing,4\n')))
+
+    assert rows == [{'employee_id': '1', 'skill': 'Framing', 'rating': '4'}]
+
+def test_detect_format():
+    """Test format detection from file names and content types."""
+    assert detect_format('ratings.CSV') == 'csv'
+    assert detect_format('ratings.jsonl') == 'json'
+    assert detect_format(content_type='application/x-ndjson') == 'json'
+    assert detect_format('ratings.txt') is None
+
+def test_iter_json_rows_streams_long_arrays(monkeypatch):
+    """Test that arrays longer than the read block, with items split across blocks, are parsed."""
+    monkeypatch.setattr(evaluation_import_module, 'JSON_READ_SIZE', 8)
+    rows = [{'employee_id': n, 'rating': n * 1000, 'notes': 'a, b ] c'} for n in range(50)]
+
+    assert list(iter_json_rows(io.StringIO(json.dumps(rows, indent=1)))) == rows
+    with pytest.raises(ValueError):
+        list(iter_json_rows(io.StringIO('[{"employee_id": 1} {"employee_id": 2}]')))
+    with pytest.raises(ValueError):
+        list(iter_json_rows(io.StringIO('[{"employee_id": 1},')))
+
+def test_import_reports_invalid_rows(import_app):
+    """Test that invalid rows are reported with their row number and valid rows are written."""
+    rows = [
+        '1,2,2024-05-01,1,,4,,,',
+        '1,2,2024-05-01,,Roofing,5,Nail Gun,yes,Stairs',
+        '1,2,2024-05-01,1,,3,,,',
+        '9,2,2024-05-01,1,,4,,,',
+        '2,,2024-13-01,1,,4,,,',
+        '2,,2024-05-01,2,,9,,,',
+        '2,,2024-05-01,,Plumbing,3,,,',
+        '2,,2024-05-01,,,,,,',
+        '2,,2024-05-02,2,,2,,,'
+    ]
+
+    result = import_evaluations(io.StringIO(HEADER + '\n'.join(rows)), 'csv')
+
+    assert result['rows_read'] == 9
+    assert result['records_imported'] == 3
+    assert result['evaluations_created'] == 2
+    assert not result['success']
+    assert [(error['row'], error['error']) for error in result['errors']] == [
+        (3, 'Duplicate rating for skill 1 in this evaluation'),
+        (4, 'Unknown employee_id 9'),
+        (5, "Invalid evaluation_date '2024-13-01' (expected YYYY-MM-DD)"),
+        (6, 'Rating 9 is outside 1-5'),
+        (7, "Unknown skill 'Plumbing'"),
+        (8, 'Row has no skill, tool or special skill')
+    ]
+    assert count(Evaluation) == 2
+    assert count(SkillEvaluation) == 3
+    assert count(ToolEvaluation) == 1
+    assert count(SpecialSkill) == 1
+
+def test_failed_chunk_is_rolled_back(import_app, monkeypatch):
+    """Test that a chunk rejected by the database is rolled back and reported while later chunks are written."""
+    refresh_calls = []
+
+    def refresh_rollups(keys):
+        refresh_calls.append(keys)
+        if len(refresh_calls) == 2:
+            raise OperationalError('UPDATE skill_rating_rollups', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(evaluation_import_module, 'refresh_rollups', refresh_rollups)
+    rows = [
+        {'employee_id': 1, 'evaluation_date': '2024-05-01', 'skill_id': 1, 'rating': 4},
+        {'employee_id': 1, 'evaluation_date': '2024-05-01', 'skill_id': 2, 'rating': 3},
+        {'employee_id': 2, 'evaluation_date': '2024-05-01', 'skill_id': 1, 'rating': 5},
+        {'employee_id': 2, 'evaluation_date': '2024-05-01', 'skill_id': 2, 'rating': 2},
+        {'employee_id': 2, 'evaluation_date': '2024-05-01', 'skill_id': 1, 'rating': 5},
+        {'employee_id': 2, 'evaluation_date': '2024-05-01', 'skill_id': 2, 'rating': 2}
+    ]
+    stream = io.StringIO('\n'.join(json.dumps(row) for row in rows))
+
+    result = import_evaluations(stream, 'json', chunk_size=2)
+
+    assert result['records_imported'] == 4
+    assert result['evaluations_created'] == 2
+    assert [error['row'] for error in result['errors']] == [3, 4]
+    assert 'database is locked' in result['errors'][0]['error']
+    evaluations = db.session.execute(select(Evaluation.__table__.c.employee_id)).scalars().all()
+    assert sorted(evaluations) == [1, 2]
+    ratings = db.session.execute(
+        select(SkillEvaluation.__table__.c.skill_id, SkillEvaluation.__table__.c.rating)
+    ).all()
+    assert sorted(ratings) == [(1, 4), (1, 5), (2, 2), (2, 3)]
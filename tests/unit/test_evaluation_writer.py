@@ -0,0 +1,66 @@
+"""
+Unit tests for the evaluation writer.
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from kpi_system.backend.app.utils.evaluation_writer import EvaluationDiff, parse_evaluation_form
+
+@pytest.fixture
+def catalog():
+    """Minimal catalog with two skills and two tools."""
+    return SimpleNamespace(
+        skills=[SimpleNamespace(skill_id=1), SimpleNamespace(skill_id=2)],
+        tools=[SimpleNamespace(tool_id=1), SimpleNamespace(tool_id=2)]
+    )
+
+def test_parse_evaluation_form(catalog):
+    """Test that ratings, tool flags and special skills are parsed from the form."""
+    data, error = parse_evaluation_form({
+        'employee_id': '3',
+        'evaluator_id': '',
+        'evaluation_date': '2024-05-01',
+        'notes': 'Good work',
+        'skill_1': '4',
+        'skill_2': 'x',
+        'tool_own_2': 'on',
+        'special_skills': 'Welding, , Tiling '
+    }, catalog)
+
+    assert error is None
+    assert data.employee_id == 3
+    assert data.evaluator_id is None
+    assert data.evaluation_date == date(2024, 5, 1)
+    assert data.skill_ratings == {1: 4}
+    assert data.tool_flags == {2: (False, True)}
+    assert data.special_skills == ['Welding', 'Tiling']
+
+def test_parse_evaluation_form_requires_employee_and_date(catalog):
+    """Test that missing required fields are reported."""
+    assert parse_evaluation_form({'evaluation_date': '2024-05-01'}, catalog) == (None, 'Employee is required.')
+    assert parse_evaluation_form({'employee_id': '1'}, catalog) == (None, 'Evaluation date is required.')
+
+def test_parse_evaluation_form_rejects_invalid_ids(catalog):
+    """Test that non-numeric employee and evaluator ids are reported instead of raising."""
+    form = {'employee_id': 'abc', 'evaluation_date': '2024-05-01'}
+    assert parse_evaluation_form(form, catalog) == (None, 'Employee is invalid.')
+
+    form = {'employee_id': '1', 'evaluator_id': '2x', 'evaluation_date': '2024-05-01'}
+    assert parse_evaluation_form(form, catalog) == (None, 'Evaluator is invalid.')
+
+def test_evaluation_diff():
+    """Test that the diff reports which rollups and audit details are affected."""
+    diff = EvaluationDiff()
+    assert not diff
+
+    diff.skills_changed[3] = (4, 1)
+    diff.special_skills_added.append('Tiling')
+
+    assert diff
+    assert diff.skills_modified
+    assert not diff.tools_modified
+    assert not diff.moved
+    assert diff.to_dict() == {'skills_changed': {3: (4, 1)}, 'special_skills_added': ['Tiling']}
+
+    diff.header['evaluation_date'] = (date(2024, 5, 1), date(2024, 6, 1))
+    assert diff.moved
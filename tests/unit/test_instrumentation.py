@@ -0,0 +1,35 @@
+"""
+Unit tests for the request metrics window.
+"""
+import pytest
+from datetime import datetime, timedelta
+from kpi_system.backend.app.utils.instrumentation import RequestMetrics
+
+def test_endpoint_percentiles():
+    """Test that percentiles are reported per endpoint, slowest first."""
+    metrics = RequestMetrics()
+    for duration in range(1, 101):
+        metrics.record('dashboard.index', float(duration), 200, query_count=4)
+    metrics.record('employees.index', 5.0, 200, query_count=2)
+
+    stats = metrics.endpoint_stats()
+
+    assert [item['endpoint'] for item in stats] == ['dashboard.index', 'employees.index']
+    assert stats[0]['count'] == 100
+    assert stats[0]['p50'] == 50.5
+    assert stats[0]['p99'] == 99.0
+    assert stats[0]['avg_queries'] == 4.0
+
+def test_summary_counts_recent_requests_and_errors():
+    """Test the hourly/daily counters used by the admin pages."""
+    now = datetime(2025, 3, 20, 15, 30)
+    metrics = RequestMetrics()
+    metrics.record('dashboard.index', 10.0, 200, timestamp=now - timedelta(days=2))
+    metrics.record('dashboard.index', 20.0, 500, timestamp=now - timedelta(hours=3))
+    metrics.record('dashboard.index', 30.0, 200, timestamp=now - timedelta(minutes=5))
+
+    summary = metrics.summary(now=now)
+
+    assert summary['requests_last_hour'] == 1
+    assert summary['errors_last_day'] == 1
+    assert summary['avg_response_time'] == 25.0
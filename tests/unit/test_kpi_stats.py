@@ -0,0 +1,46 @@
+"""
+Unit tests for the KPI aggregation helpers.
+"""
+import pytest
+from datetime import date
+from kpi_system.backend.app.utils.kpi_stats import KPIFilters, month_range, next_month, average_rating
+
+def test_month_range_spans_year_boundary():
+    """Test that month_range returns the first day of every month in the window."""
+    months = month_range(date(2024, 11, 15), date(2025, 2, 3))
+
+    assert months == [
+        date(2024, 11, 1),
+        date(2024, 12, 1),
+        date(2025, 1, 1),
+        date(2025, 2, 1)
+    ]
+
+def test_next_month_december():
+    """Test that next_month rolls over into January."""
+    assert next_month(date(2024, 12, 31)) == date(2025, 1, 1)
+
+def test_filters_normalize_unknown_date_range():
+    """Test that unknown date ranges fall back to all dates."""
+    filters = KPIFilters(date_range='decade', today=date(2025, 3, 20))
+
+    assert filters.date_range == 'all'
+    assert filters.start_date is None
+
+def test_filters_progress_window_leap_day():
+    """Test that the twelve month progress window handles February 29th."""
+    filters = KPIFilters(date_range='year', today=date(2024, 2, 29))
+
+    start_date, end_date = filters.progress_window()
+
+    assert start_date == date(2023, 2, 1)
+    assert end_date == date(2024, 2, 29)
+    assert len(month_range(start_date, end_date)) == 13
+
+def test_average_rating_by_category():
+    """Test deriving overall and per-category averages from category totals."""
+    totals = {1: (12, 3), 2: (6, 3), None: (2, 2)}
+
+    assert average_rating(totals) == pytest.approx(20 / 8)
+    assert average_rating(totals, 1) == pytest.approx(4)
+    assert average_rating(totals, 99) == 0
@@ -0,0 +1,29 @@
+"""
+Unit tests for the keyset pagination helpers.
+"""
+import pytest
+from datetime import date
+from kpi_system.backend.app.utils.pagination import (
+    MAX_PAGE_SIZE, decode_cursor, encode_cursor, parse_page_size
+)
+
+def test_cursor_round_trip():
+    """Test that a sort key survives encoding and decoding."""
+    token = encode_cursor((date(2024, 5, 1), 42))
+
+    assert '=' not in token
+    assert decode_cursor(token, (date, int)) == (date(2024, 5, 1), 42)
+
+def test_invalid_cursor_is_ignored():
+    """Test that malformed cursors start from the first page."""
+    assert decode_cursor(None, (date, int)) is None
+    assert decode_cursor('garbage', (date, int)) is None
+    assert decode_cursor(encode_cursor((42,)), (date, int)) is None
+
+def test_parse_page_size():
+    """Test that requested page sizes are clamped."""
+    assert parse_page_size(None) == 50
+    assert parse_page_size('abc') == 50
+    assert parse_page_size('0') == 1
+    assert parse_page_size('20') == 20
+    assert parse_page_size('100000') == MAX_PAGE_SIZE
@@ -0,0 +1,42 @@
+"""
+Unit tests for the PDF rendering pool.
+"""
+import threading
+
+import pytest
+from flask import Flask
+from kpi_system.backend.app.reports.pdf_renderer import PDFRenderer, PDFRendererBusy, get_pdf_renderer
+
+def test_render_fails_fast_when_queue_is_full():
+    """Test that a full queue rejects new PDFs without starting a process."""
+    renderer = PDFRenderer(max_workers=1, queue_size=0)
+    assert renderer._slots.acquire(blocking=False)
+    with pytest.raises(PDFRendererBusy):
+        renderer.render('<html></html>')
+    assert renderer._executor is None
+
+def test_renderer_limits():
+    """Test that worker count is at least one and zero disables limits."""
+    renderer = PDFRenderer(max_workers=0, queue_size=3, timeout=0, max_jobs_per_worker=0)
+    assert renderer.max_workers == 1
+    assert renderer.timeout is None
+    assert renderer.max_jobs_per_worker is None
+
+def test_get_pdf_renderer_creates_one_renderer():
+    """Test that concurrent first calls share a single renderer."""
+    app = Flask(__name__)
+    app.config['KPI_PDF_WORKERS'] = 1
+    renderers = []
+
+    def get():
+        with app.app_context():
+            renderers.append(get_pdf_renderer())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(renderer) for renderer in renderers}) == 1
+    assert renderers[0]._executor is None
@@ -0,0 +1,45 @@
+"""
+Unit tests for the promotion readiness scoring.
+"""
+import numpy as np
+from datetime import date
+from types import SimpleNamespace
+from kpi_system.backend.app.utils.promotion import compile_requirements, score_employees
+from kpi_system.backend.app.utils.skill_state import SkillStateMatrix
+
+def make_catalog():
+    skills = [SimpleNamespace(skill_id=1), SimpleNamespace(skill_id=2), SimpleNamespace(skill_id=3)]
+    return SimpleNamespace(
+        skill_categories=[
+            SimpleNamespace(category_id=1, name='Plumbing', skills=skills[:2]),
+            SimpleNamespace(category_id=2, name='Carpentry', skills=skills[2:])
+        ],
+        tools=[SimpleNamespace(tool_id=1, name='Pipe Threader'), SimpleNamespace(tool_id=2, name='Router')]
+    )
+
+def test_score_employees():
+    """Test that employees are scored against their next tier in one pass."""
+    catalog = make_catalog()
+    requirements = compile_requirements({
+        'Handyman': {'min_average': 3.0, 'required_tools': ['pipe threader']},
+        'Craftsman': {'min_average': 3.0, 'category_minimums': {'Carpentry': 4}}
+    }, catalog)
+    day = date(2024, 1, 1)
+    state = SkillStateMatrix(None, [
+        (1, 1, 4, day), (1, 2, 3, day),
+        (2, 1, 5, day), (2, 3, 2, day),
+        (3, 1, 5, day)
+    ])
+    employees = [(1, 'Ann', 'Apprentice'), (2, 'Bo', 'Handyman'), (3, 'Cy', 'Lead Craftsman'), (4, 'Di', 'Apprentice')]
+    operated = np.array([[True, False], [False, False], [False, False], [True, True]])
+
+    results = {result.employee_id: result for result in
+               score_employees(employees, state, operated, requirements, catalog)}
+
+    assert set(results) == {1, 2, 4}
+    assert results[1].ready and results[1].target_tier == 'Handyman' and results[1].score == 1.0
+    assert not results[2].ready and results[2].target_tier == 'Craftsman'
+    assert results[2].gaps == [{'requirement': 'category', 'category_id': 2, 'name': 'Carpentry',
+                                'minimum': 4.0, 'current': 2.0}]
+    assert results[2].score == 0.75
+    assert not results[4].ready and results[4].gaps[0] == {'requirement': 'ratings'}
@@ -0,0 +1,93 @@
+"""
+Unit tests for the report file cache.
+"""
+import os
+from flask import Flask
+from kpi_system.backend.app.reports.artifact_cache import (
+    ReportArtifactCache, get_report_artifact, get_report_cache, report_cache_key
+)
+from kpi_system.backend.app.utils.cache import ResultCache, SqliteCacheTier
+
+def writer(content):
+    """Return a function writing content to the path it is given."""
+    def write(path):
+        with open(path, 'wb') as report_file:
+            report_file.write(content)
+    return write
+
+def test_report_cache_key_depends_on_every_input():
+    """Test that the key changes with the type, parameters, format and data version."""
+    key = report_cache_key('team', {'tier': 'Handyman'}, 'pdf', 'a.1')
+
+    assert key == report_cache_key('team', {'tier': 'Handyman'}, 'pdf', 'a.1')
+    assert key != report_cache_key('skills', {'tier': 'Handyman'}, 'pdf', 'a.1')
+    assert key != report_cache_key('team', {'tier': 'Craftsman'}, 'pdf', 'a.1')
+    assert key != report_cache_key('team', {'tier': 'Handyman'}, 'excel', 'a.1')
+    assert key != report_cache_key('team', {'tier': 'Handyman'}, 'pdf', 'a.2')
+
+def test_report_cache_stores_and_returns_files(tmp_path):
+    """Test that a stored file is found again under its key."""
+    cache = ReportArtifactCache(str(tmp_path), max_bytes=1024)
+    key = report_cache_key('tools', {}, 'pdf', 'a.1')
+
+    assert cache.get(key, 'pdf') is None
+    path = cache.put(key, 'pdf', writer(b'%PDF'))
+
+    assert cache.get(key, 'pdf') == path
+    with open(path, 'rb') as cached_file:
+        assert cached_file.read() == b'%PDF'
+
+def test_report_cache_evicts_least_recently_used(tmp_path):
+    """Test that the oldest unused files are removed once the size cap is exceeded."""
+    cache = ReportArtifactCache(str(tmp_path), max_bytes=35)
+    paths = {}
+    for age, key in enumerate(['aa', 'bb', 'cc']):
+        paths[key] = cache.put(key, 'pdf', writer(b'x' * 10))
+        os.utime(paths[key], (1000 + age, 1000 + age))
+
+    cache.get('aa', 'pdf')
+    cache.put('dd', 'pdf', writer(b'x' * 10))
+
+    assert cache.get('aa', 'pdf') is not None
+    assert cache.get('dd', 'pdf') is not None
+    assert cache.get('cc', 'pdf') is not None
+    assert not os.path.exists(paths['bb'])
+
+def make_worker(tmp_path, shared=None):
+    """Return an app with a report cache in tmp_path and its own result cache."""
+    app = Flask(__name__, instance_path=str(tmp_path / 'instance'))
+    app.config['KPI_REPORT_CACHE_MAX_BYTES'] = 1024
+    app.extensions['kpi_cache'] = ResultCache(max_entries=8, ttl=60, shared=shared)
+    return app
+
+def test_report_cache_follows_version_bumps_of_other_workers(tmp_path):
+    """Test that a data version bump in another worker's cache changes the report key."""
+    path = str(tmp_path / 'cache.db')
+    first = make_worker(tmp_path, SqliteCacheTier(path))
+    second = make_worker(tmp_path, SqliteCacheTier(path))
+    written = []
+
+    def write(path):
+        written.append(path)
+        writer(b'%PDF')(path)
+
+    with first.app_context():
+        before = get_report_artifact('tools', {}, 'pdf', 'pdf', write)
+        assert get_report_artifact('tools', {}, 'pdf', 'pdf', write).key == before.key
+    assert len(written) == 1
+
+    second.extensions['kpi_cache'].bump_version()
+
+    with first.app_context():
+        after = get_report_artifact('tools', {}, 'pdf', 'pdf', write)
+    assert after.key != before.key
+    assert len(written) == 2
+
+def test_report_cache_disabled_with_process_local_versions(tmp_path):
+    """Test that report files are not cached when other workers could not invalidate them."""
+    app = make_worker(tmp_path)
+    with app.app_context():
+        assert get_report_cache() is None
+        artifact = get_report_artifact('tools', {}, 'pdf', 'pdf', writer(b'%PDF'))
+        assert artifact.temporary
+        artifact.discard()
@@ -0,0 +1,51 @@
+"""
+Unit tests for the streaming Excel report writer.
+"""
+import math
+
+import openpyxl
+import pandas as pd
+from kpi_system.backend.app.reports.base import ReportGenerator
+
+class SheetReport(ReportGenerator):
+    """Report generator returning fixed sheets."""
+
+    def __init__(self, sheets):
+        super().__init__('Test Report', 'Sheets for testing', 'team')
+        self.sheets = sheets
+
+    def collect_data(self, **kwargs):
+        return {}
+
+    def prepare_template_data(self):
+        return {}
+
+    def prepare_excel_data(self):
+        return self.sheets
+
+def test_write_excel_writes_rows_below_the_title(tmp_path):
+    """Test that headers and rows are written and missing values are blank."""
+    path = str(tmp_path / 'report.xlsx')
+    frame = pd.DataFrame({'Name': ['Ann', 'Bob'], 'Score': [4.5, math.nan]})
+    SheetReport({'Summary': frame}).write_excel(path)
+
+    sheet = openpyxl.load_workbook(path)['Summary']
+    assert sheet['A1'].value == 'Test Report'
+    assert [cell.value for cell in sheet[4][:2]] == ['Name', 'Score']
+    assert [cell.value for cell in sheet[5][:2]] == ['Ann', 4.5]
+    assert [cell.value for cell in sheet[6][:2]] == ['Bob', None]
+
+def test_write_excel_sizes_columns_to_the_longest_value(tmp_path):
+    """Test that column widths follow the longest header or value."""
+    path = str(tmp_path / 'report.xlsx')
+    frame = pd.DataFrame({'Name': ['A much longer name'], 'N': [1]})
+    SheetReport({'Summary': frame}).write_excel(path)
+
+    sheet = openpyxl.load_workbook(path)['Summary']
+    assert round(sheet.column_dimensions['A'].width) == len('A much longer name') + 3
+    assert round(sheet.column_dimensions['B'].width) == len('N') + 3
+
+def test_generate_excel_returns_workbook_bytes():
+    """Test that generate_excel still returns the document as bytes."""
+    data = SheetReport({'Summary': pd.DataFrame({'N': [1]})}).generate_excel()
+    assert data[:2] == b'PK'
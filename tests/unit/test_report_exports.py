@@ -0,0 +1,53 @@
+"""
+Unit tests for the CSV and Parquet report exports.
+"""
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from kpi_system.backend.app.reports.base import ReportGenerator
+
+class SheetReport(ReportGenerator):
+    """Report generator returning fixed sheets."""
+
+    def __init__(self, sheets):
+        super().__init__('Test Report', 'Sheets for testing', 'tools')
+        self.sheets = sheets
+
+    def collect_data(self, **kwargs):
+        return {}
+
+    def prepare_template_data(self):
+        return {}
+
+    def prepare_excel_data(self):
+        return self.sheets
+
+SHEETS = {
+    'Tool Summary': pd.DataFrame({'Tool': ['Drill', 'Saw'], 'Operators': [3, 1]}),
+    'Owners/Tier': pd.DataFrame({'Tier': ['Handyman'], 'Owners': [2]})
+}
+
+def test_write_csv_zips_one_file_per_sheet(tmp_path):
+    """Test that every sheet becomes a CSV file in the archive."""
+    path = str(tmp_path / 'report.csv.zip')
+    SheetReport(SHEETS).write_csv(path)
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ['tool_summary.csv', 'owners_tier.csv']
+        assert archive.read('tool_summary.csv').decode('utf-8') == 'Tool,Operators\nDrill,3\nSaw,1\n'
+
+def test_write_parquet_zips_one_file_per_sheet(tmp_path):
+    """Test that every sheet becomes a Parquet file with its column types."""
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'report.parquet.zip')
+    SheetReport(SHEETS).write_parquet(path)
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ['tool_summary.parquet', 'owners_tier.parquet']
+        frame = pd.read_parquet(io.BytesIO(archive.read('tool_summary.parquet')))
+
+    assert frame['Tool'].tolist() == ['Drill', 'Saw']
+    assert frame['Operators'].tolist() == [3, 1]
+    assert frame['Operators'].dtype == 'int64'
@@ -0,0 +1,91 @@
+"""
+Unit tests for the report job helpers.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+from sqlalchemy import select
+from werkzeug.datastructures import MultiDict
+from kpi_system.backend.app import db
+from kpi_system.backend.app.models.report import SavedReport
+from kpi_system.backend.app.reports.jobs import (
+    JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, check_report_format, get_report_jobs, parse_report_parameters,
+    report_file_name
+)
+
+def test_parse_report_parameters_normalizes_values():
+    """Test that empty values are dropped and ids are parsed."""
+    values = MultiDict([('employee_id', '7'), ('start_date', '2024-01-05'), ('end_date', '2024-06-30'), ('tier', 'x')])
+    assert parse_report_parameters('employee', values) == {
+        'employee_id': 7, 'start_date': '2024-01-05', 'end_date': '2024-06-30'
+    }
+
+def test_parse_report_parameters_team_ids():
+    """Test that team employee ids are de-duplicated and sorted."""
+    values = MultiDict([('employee_ids', '3'), ('employee_ids', '1'), ('employee_ids', '3'), ('tier', ' ')])
+    assert parse_report_parameters('team', values)['employee_ids'] == [1, 3]
+    assert parse_report_parameters('team', {'employee_ids': [2, '1']})['employee_ids'] == [1, 2]
+    assert 'tier' not in parse_report_parameters('team', values)
+
+def test_parse_report_parameters_resolves_default_period():
+    """Test that a missing period becomes the last twelve months up to today."""
+    today = date.today()
+    parameters = parse_report_parameters('skills', {})
+    assert parameters['end_date'] == today.strftime('%Y-%m-%d')
+    assert parameters['start_date'] == (today - timedelta(days=365)).strftime('%Y-%m-%d')
+
+    parameters = parse_report_parameters('tools', {'end_date': '2024-06-30'})
+    assert parameters['start_date'] == '2023-07-01'
+
+def test_parse_report_parameters_rejects_invalid_input():
+    """Test that unknown types, missing employees and bad dates are rejected."""
+    with pytest.raises(ValueError):
+        parse_report_parameters('payroll', {})
+    with pytest.raises(ValueError):
+        parse_report_parameters('employee', {})
+    with pytest.raises(ValueError):
+        parse_report_parameters('skills', {'start_date': '05/01/2024'})
+    with pytest.raises(ValueError):
+        parse_report_parameters('tools', {'category_id': 'abc'})
+
+def test_report_file_name():
+    """Test that file names carry the template stem, timestamp and extension."""
+    when = datetime(2024, 3, 1, 8, 30, 0)
+    assert report_file_name('team', 'excel', when) == 'team_performance_20240301_083000.xlsx'
+    assert report_file_name('tools', 'pdf', when) == 'tool_inventory_20240301_083000.pdf'
+
+def test_check_report_format():
+    """Test that unknown output formats are rejected."""
+    check_report_format('csv')
+    with pytest.raises(ValueError):
+        check_report_format('xml')
+
+def test_report_pool_fails_interrupted_jobs(tmp_path):
+    """Test that jobs left queued or running past the timeout are failed when the pool starts."""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'jobs.db'}",
+        KPI_REPORT_WORKERS=1,
+        KPI_REPORT_JOB_TIMEOUT=60
+    )
+    db.init_app(app)
+    saved_reports = SavedReport.__table__
+
+    with app.app_context():
+        saved_reports.create(db.engine)
+        old = datetime.utcnow() - timedelta(hours=1)
+        db.session.execute(saved_reports.insert(), [
+            {'name': 'Skills', 'report_type': 'skills', 'status': status, 'created_at': created_at}
+            for status, created_at in [(JOB_QUEUED, old), (JOB_RUNNING, old), (JOB_RUNNING, datetime.utcnow()),
+                                       (JOB_DONE, old)]
+        ])
+        db.session.commit()
+
+        get_report_jobs().shutdown()
+
+        rows = db.session.execute(
+            select(saved_reports.c.status, saved_reports.c.completed_at).order_by(saved_reports.c.id)
+        ).all()
+        assert [status for status, _ in rows] == [JOB_FAILED, JOB_FAILED, JOB_RUNNING, JOB_DONE]
+        assert [completed_at is not None for _, completed_at in rows] == [True, True, False, False]
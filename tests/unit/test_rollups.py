@@ -0,0 +1,17 @@
+"""
+Unit tests for the rollup maintenance guards.
+"""
+from flask import Flask
+from kpi_system.backend.app import db
+from kpi_system.backend.app.utils.rollups import latest_ratings_available, refresh_rollups, rollups_available
+
+def test_refresh_rollups_skips_unmigrated_database(tmp_path):
+    """Test that evaluation writes do not fail before the rollup migrations ran."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'kpi.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        assert not rollups_available()
+        assert not latest_ratings_available()
+        refresh_rollups({(1, '2024-05')})
@@ -0,0 +1,40 @@
+"""
+Unit tests for the serialization layer.
+"""
+import pytest
+from datetime import date, datetime
+from types import SimpleNamespace
+from kpi_system.backend.app.utils.serialization import Serializer, parse_fields
+
+@pytest.fixture
+def serializer():
+    return Serializer([
+        ('employee_id', None),
+        ('name', None),
+        ('hire_date', date.isoformat),
+        ('created_at', lambda value: value.isoformat(timespec='seconds'))
+    ])
+
+def test_serializer_converts_dates(serializer):
+    """Test that dates and timestamps are written in ISO format."""
+    employee = SimpleNamespace(employee_id=7, name='Jo', hire_date=None,
+                               created_at=datetime(2024, 5, 1, 8, 30, 15, 1234))
+
+    assert serializer(employee) == {
+        'employee_id': 7, 'name': 'Jo', 'hire_date': None, 'created_at': '2024-05-01T08:30:15'
+    }
+
+def test_select_fields(serializer):
+    """Test that a fieldset keeps the requested order and ignores unknown names."""
+    employee = SimpleNamespace(employee_id=7, name='Jo', hire_date=date(2020, 2, 3), created_at=None)
+    selected = serializer.select(('hire_date', 'bogus', 'employee_id'))
+
+    assert list(selected(employee).items()) == [('hire_date', '2020-02-03'), ('employee_id', 7)]
+    assert serializer.select(('hire_date', 'bogus', 'employee_id')) is selected
+    assert serializer.select(None) is serializer
+
+def test_parse_fields():
+    """Test parsing of the fields argument."""
+    assert parse_fields(None) is None
+    assert parse_fields(' , ') is None
+    assert parse_fields('name, employee_id') == ('name', 'employee_id')
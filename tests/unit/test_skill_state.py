@@ -0,0 +1,92 @@
+"""
+Unit tests for the current skill state matrix.
+"""
+import pytest
+import numpy as np
+from datetime import date
+from types import SimpleNamespace
+from flask import Flask
+from kpi_system.backend.app.utils import skill_state as skill_state_module
+from kpi_system.backend.app.utils.cache import ResultCache, SqliteCacheTier
+from kpi_system.backend.app.utils.skill_state import SkillStateMatrix, get_skill_state
+
+@pytest.fixture
+def state():
+    """Matrix with two employees and three skills."""
+    return SkillStateMatrix(1, [
+        (10, 1, 4, date(2024, 1, 5)),
+        (10, 2, 2, date(2024, 3, 1)),
+        (20, 1, 5, date(2024, 2, 1)),
+        (20, 3, 3, date(2024, 2, 1))
+    ])
+
+def test_employee_ratings(state):
+    """Test that an employee's current ratings and dates are returned."""
+    assert state.employee_ratings(10) == {1: (4, date(2024, 1, 5)), 2: (2, date(2024, 3, 1))}
+    assert state.employee_ratings(99) == {}
+
+def test_ratings_for_unknown_ids(state):
+    """Test that unknown employees and skills are NaN."""
+    ratings = state.ratings_for([20, 99], [3, 1, 7])
+
+    assert ratings[0, :2].tolist() == [3.0, 5.0]
+    assert np.isnan(ratings[0, 2])
+    assert np.isnan(ratings[1]).all()
+
+def test_category_averages(state):
+    """Test that category averages only count rated skills."""
+    categories = [
+        SimpleNamespace(skills=[SimpleNamespace(skill_id=1), SimpleNamespace(skill_id=2)]),
+        SimpleNamespace(skills=[SimpleNamespace(skill_id=3)])
+    ]
+
+    averages = state.category_averages([10, 20], categories)
+
+    assert averages[0, 0] == pytest.approx(3.0)
+    assert np.isnan(averages[0, 1])
+    assert averages[1].tolist() == [5.0, 3.0]
+
+def test_employees_with_rating(state):
+    """Test lookup of employees by minimum current rating."""
+    assert state.employees_with_rating(1, 5) == [20]
+    assert state.employees_with_rating(1, 4) == [10, 20]
+    assert state.employees_with_rating(7, 1) == []
+
+def test_with_employees_replaces_rows(state):
+    """Test that only the given employees' rows change and new ids get rows and columns."""
+    updated = state.with_employees(2, [10, 30], [(10, 4, 5, date(2024, 4, 1)), (30, 1, 1, date(2024, 4, 2))], {})
+
+    assert updated.version == 2
+    assert updated.employee_ratings(10) == {4: (5, date(2024, 4, 1))}
+    assert updated.employee_ratings(20) == state.employee_ratings(20)
+    assert updated.employee_ratings(30) == {1: (1, date(2024, 4, 2))}
+    assert state.employee_ratings(10) == {1: (4, date(2024, 1, 5)), 2: (2, date(2024, 3, 1))}
+
+def test_get_skill_state_reloads_touched_employees(tmp_path, monkeypatch):
+    """Test that a write announced by another worker reloads only the touched employee."""
+    loads = []
+    rows = {10: [(10, 1, 4, date(2024, 1, 5))], 20: [(20, 1, 5, date(2024, 2, 1))]}
+
+    def latest_ratings(employee_ids=None):
+        loads.append(None if employee_ids is None else sorted(employee_ids))
+        return [row for employee_id in sorted(employee_ids or rows) for row in rows[employee_id]]
+
+    monkeypatch.setattr(skill_state_module, '_latest_ratings', latest_ratings)
+    path = str(tmp_path / 'cache.db')
+    first, second = Flask(__name__), Flask(__name__)
+    for app in (first, second):
+        app.extensions['kpi_cache'] = ResultCache(max_entries=8, ttl=60, shared=SqliteCacheTier(path))
+
+    with first.app_context():
+        assert get_skill_state().employee_ratings(20) == {1: (5, date(2024, 2, 1))}
+
+    rows[20] = [(20, 1, 2, date(2024, 5, 1))]
+    cache = second.extensions['kpi_cache']
+    cache.bump_version('employee:20')
+    cache.bump_version('data')
+
+    with first.app_context():
+        state = get_skill_state()
+    assert state.employee_ratings(20) == {1: (2, date(2024, 5, 1))}
+    assert state.employee_ratings(10) == {1: (4, date(2024, 1, 5))}
+    assert loads == [None, [20]]
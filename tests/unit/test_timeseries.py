@@ -0,0 +1,68 @@
+"""
+Unit tests for the monthly time series helpers.
+"""
+import pytest
+from datetime import date
+from kpi_system.backend.app.utils.timeseries import MonthIndex, MonthlySeries, downsample
+
+def test_month_index_is_shared_between_windows():
+    """Test that windows covering the same months reuse one calendar."""
+    first = MonthIndex.between(date(2024, 11, 15), date(2025, 2, 3))
+    second = MonthIndex.between(date(2024, 11, 1), date(2025, 2, 28))
+
+    assert first is second
+    assert first.keys == ('2024-11', '2024-12', '2025-01', '2025-02')
+    assert first.position('2025-01') == 2
+    assert first.position('2025-03') is None
+
+def test_monthly_series_from_totals():
+    """Test that sums and counts are combined into monthly averages."""
+    index = MonthIndex.between(date(2025, 1, 1), date(2025, 3, 1))
+    series = MonthlySeries.from_totals([1, 2], index, [
+        (1, '2025-01', 9, 3),
+        (1, '2025-03', 4, 1),
+        (2, '2025-02', 5, 2),
+        (3, '2025-02', 5, 1),   # unknown row
+        (1, '2024-12', 5, 1)    # outside the index
+    ])
+
+    assert series.row(1) == [3.0, 0.0, 4.0]
+    assert series.get((2, '2025-02'), 0) == 2.5
+    assert series.get((3, '2025-02'), 0) == 0
+    assert series.trend(1) == [
+        {'month': '2025-01', 'average': 3.0},
+        {'month': '2025-03', 'average': 4.0}
+    ]
+
+def test_monthly_series_from_ratings():
+    """Test that individual ratings accumulate in the same cell."""
+    index = MonthIndex.between(date(2025, 1, 1), date(2025, 1, 31))
+    series = MonthlySeries.from_ratings(['a'], index, [('a', '2025-01', 2), ('a', '2025-01', 5)])
+
+    assert series.get(('a', '2025-01')) == 3.5
+
+def test_resample_to_quarters_weights_by_count():
+    """Test that quarterly buckets are averaged from sums and counts."""
+    index = MonthIndex.between(date(2025, 1, 1), date(2025, 6, 1))
+    series = MonthlySeries.from_totals([1], index, [
+        (1, '2025-01', 4, 1),
+        (1, '2025-02', 6, 3),
+        (1, '2025-05', 3, 1)
+    ])
+
+    quarterly = series.resample('quarter')
+
+    assert quarterly.month_index.keys == ('2025-Q1', '2025-Q2')
+    assert quarterly.row(1) == [2.5, 3.0]
+    assert quarterly.get((1, '2025-02')) == 2.5
+
+def test_downsample_caps_points():
+    """Test that long histories fall back to quarters, then recent years."""
+    index = MonthIndex.between(date(2015, 1, 1), date(2024, 12, 1))
+    series = MonthlySeries(['a'], index)
+
+    assert downsample(series, max_points=40).month_index.granularity == 'quarter'
+    assert len(downsample(series, max_points=12).month_index) == 10
+
+    capped = downsample(series, max_points=5)
+    assert capped.month_index.keys == ('2020', '2021', '2022', '2023', '2024')